@@ -15,12 +15,19 @@ Val:
 3) Studieplan
 4) Statistik
 5) Generera flashcards
-6) Avsluta
+6) Sök kort
+7) Avsluta
 """
-from src.flashcards import add_card, quiz_once
-from src.plan import set_goal, mark_done, progress, get_week, list_weeks
-from src.stats import totals
-from src.generator import generate_questions
+from src.flashcards import add_card, QuizSession
+from src.adaptive import AdaptiveQuiz
+from src.plan import (set_goal, mark_done, progress, goal_status, list_weeks,
+                      semester_summary, find_week, week_key)
+from src.stats import totals, breakdown
+from src.generator import generate_questions, CONCEPTS_PATH
+from src.search import search
+from src import instrument
+import os
+import sys
 
 # ---------------- Hjälpfunktioner ----------------
 
@@ -45,6 +52,21 @@ def prompt_int(label: str, default: int | None = None) -> int:
         print("Måste vara ett heltal.")
         return prompt_int(label, default)
 
+
+def prompt_week(label: str, existing: bool = False) -> str:
+    """
+    Fråga efter en vecka (35 eller 2025-W35) tills den går att tolka.
+
+    Med existing=True pekar ett bara veckonummer på den senaste befintliga
+    veckan med det numret (35 → 2025-W35 om den finns), inte innevarande år.
+    """
+    s = input(label).strip()
+    try:
+        return find_week(s) if existing else week_key(s)
+    except ValueError as e:
+        print(e)
+        return prompt_week(label, existing)
+
 # ---------------- Flashcards-handlers ----------------
 
 
@@ -54,26 +76,57 @@ def handle_add_card():
     a = prompt_nonempty("Svar: ")
     tags_raw = input("Taggar (valfritt, separera med mellanslag): ").strip()
     tags = [t for t in tags_raw.split() if t] if tags_raw else []
-    card = add_card(q, a, tags=tags)
+    try:
+        card = add_card(q, a, tags=tags, check_similar=True)
+    except ValueError as e:
+        print(f"⚠️  {e}")
+        if input("Lägg till ändå? (j/n, default n): ").strip().lower() != "j":
+            return
+        card = add_card(q, a, tags=tags)
     print(f"Lagt till: {card}")
 
 
 def handle_quiz():
     print("\n--- Quiz ---")
     n = prompt_int("Hur många frågor? (t.ex. 3): ", default=3)
+    print("Läge: 1) Spaced repetition  2) Slumpat  3) Drilla svaga kort")
+    mode = input("Val (default 1): ").strip()
+    tags = input("Taggfilter (valfritt, t.ex. 'sql AND NOT auto'): ").strip() or None
     correct = 0
-    for i in range(1, n + 1):
-        print(f"\n({i}/{n})")
-        if quiz_once():
-            correct += 1
+    # En session = leken läses in en gång och resultaten skrivs i klump
+    try:
+        if mode == "3":
+            session = AdaptiveQuiz(tags=tags)
+        else:
+            session = QuizSession(spaced=(mode != "2"), tags=tags)
+    except ValueError as e:
+        print(f"Ogiltigt taggfilter: {e}")
+        return
+    with session:
+        if not session.cards:
+            print("Inga kort matchar taggfiltret." if tags else
+                  "Inga kort ännu. Lägg till med add_card(...).")
+            return
+        for i in range(1, n + 1):
+            print(f"\n({i}/{n})")
+            if session.ask():
+                correct += 1
     print(f"\n Klart! Rätt: {correct}/{n}")
 
 # ---------------- Studieplan-handlers ----------------
 
 
+def _print_goals(status, indent="  "):
+    # Mätbara mål visar räknaren, t.ex. "(7/10)", och bockas av automatiskt
+    for i, s in enumerate(status):
+        mark = "✔" if s["done"] else "·"
+        count = f" ({s['count']}/{s['goal']['target']})" if s["goal"] else ""
+        print(f"{indent}{i}: [{mark}] {s['item']}{count}")
+
+
 def handle_studyplan_set():
     print("\n--- Studieplan: Sätt mål ---")
-    week = prompt_int("Vecka (t.ex. 35): ")
+    week = prompt_week("Vecka (t.ex. 35 eller 2025-W35): ")
     raw = input("Mål (kommaseparerade): ").strip()
     items = [x.strip() for x in raw.split(",") if x.strip()]
     if not items:
@@ -85,14 +138,12 @@ def handle_studyplan_set():
 
 def handle_studyplan_mark():
     print("\n--- Studieplan: Markera klar ---")
-    week = prompt_int("Vecka: ")
-    wk = get_week(week)
-    if not wk:
+    week = prompt_week("Vecka: ", existing=True)
+    status = goal_status(week)
+    if not status:
         print("Vecka finns inte. Sätt mål först.")
         return
-    for i, item in enumerate(wk["items"]):
-        status = "✔" if wk["done"][i] else "·"
-        print(f"{i}: [{status}] {item}")
+    _print_goals(status, indent="")
     idx = prompt_int("Vilket index ska markeras? (0-baserat): ")
     val = input("Klarmarkera? (j/n, default j): ").strip().lower()
     value = (val != "n")
@@ -107,16 +158,29 @@ def handle_studyplan_progress():
         print("Inga veckor finns.")
         return
     print("Tillgängliga veckor:", ", ".join(weeks))
-    week = prompt_int("Vecka att visa: ")
+    week = prompt_week("Vecka att visa: ", existing=True)
     pct = progress(week)
-    wk = get_week(week)
-    if not wk:
+    status = goal_status(week)
+    if not status:
         print("Veckan saknas.")
         return
     print(f"Vecka {week}: {pct}% klart")
-    for i, item in enumerate(wk["items"]):
-        status = "✔" if wk["done"][i] else "·"
-        print(f"  {i}: [{status}] {item}")
+    _print_goals(status)
+
+
+def handle_studyplan_semester():
+    print("\n--- Studieplan: Termin ---")
+    name = input("Termin (t.ex. HT2025, tomt = pågående): ").strip()
+    try:
+        s = semester_summary(name or None)
+    except ValueError as e:
+        print(e)
+        return
+    print(f"{s['semester']} ({s['start']}–{s['end']}): {s['done']}/{s['total']} klart, {s['progress']}%")
+    for week, c in s["weeks"].items():
+        print(f"  {week}: {c['done']}/{c['total']} ({c['progress']}%)")
+    if not s["weeks"]:
+        print("  Inga mål satta under terminen.")
 
 
 def handle_studyplan_menu():
@@ -125,7 +189,8 @@ def handle_studyplan_menu():
         print("1) Sätt mål för vecka")
         print("2) Markera punkt som klar")
         print("3) Visa progress")
-        print("4) Tillbaka")
+        print("4) Terminsöversikt")
+        print("5) Tillbaka")
         choice = input("Val: ").strip()
         if choice == "1":
             handle_studyplan_set()
@@ -134,6 +199,8 @@ def handle_studyplan_menu():
         elif choice == "3":
             handle_studyplan_progress()
         elif choice == "4":
+            handle_studyplan_semester()
+        elif choice == "5":
             break
         else:
             print("Ogiltigt val.")
@@ -149,6 +216,49 @@ def handle_stats():
     print(f"Fel:    {t['incorrect']}")
     print(f"Träffsäkerhet:  {t['accuracy']}%")
 
+
+def _fmt(t: dict) -> str:
+    return f"{t['correct']}/{t['total']} ({t['accuracy']}%)"
+
+
+def handle_stats_breakdown():
+    print("\n--- Statistik: Detaljer ---")
+    b = breakdown()
+    if not b["cards"]:
+        print("Inga resultat ännu.")
+        return
+    print(f"Senaste 7 dagarna:  {_fmt(b['rolling']['7'])}")
+    print(f"Senaste 30 dagarna: {_fmt(b['rolling']['30'])}")
+    print("\nPer tagg:")
+    for tag, t in b["tags"].items():
+        print(f"  {tag:<15} {_fmt(t)}")
+    print("\nPer dag (senaste 7 med resultat):")
+    for day, t in list(b["days"].items())[-7:]:
+        print(f"  {day}  {_fmt(t)}")
+    print("\nPer timme på dygnet:")
+    for hour, t in b["hours"].items():
+        print(f"  {hour}:00  {_fmt(t)}")
+    print("\nSvagaste korten:")
+    for c in b["cards"][:5]:
+        print(f"  {_fmt(c)}  {c['question']}")
+
+
+def handle_stats_menu():
+    while True:
+        print("\n====== STATISTIK ======")
+        print("1) Totalt")
+        print("2) Per kort/tagg/dag/timme")
+        print("3) Tillbaka")
+        choice = input("Val: ").strip()
+        if choice == "1":
+            handle_stats()
+        elif choice == "2":
+            handle_stats_breakdown()
+        elif choice == "3":
+            break
+        else:
+            print("Ogiltigt val.")
+
 # ---------------- Generator ----------------
 
 
@@ -158,16 +268,47 @@ def handle_generate():
         "Hur många frågor per begrepp? (1–2, default 1): ", default=1)
     # Håll per_term inom [1, 2] för enkla, korta kort
     per_term = 1 if n <= 1 else 2
-    added = generate_questions(per_term=per_term)
+    source = input("Källa (fil, mapp eller glob, default data/concepts.json): ").strip()
+    try:
+        added = generate_questions(source or CONCEPTS_PATH, per_term=per_term)
+    except ValueError as e:
+        print(f"⚠️  {e}")
+        return
     if added == 0:
         print("Inga nya kort lades till (kan vara dubbletter).")
     else:
-        print(f"Lade till {added} nya kort från concepts.json.")
+        print(f"Lade till {added} nya kort från {source or CONCEPTS_PATH}.")
+
+# ---------------- Sökning ----------------
+
+
+def handle_search():
+    print("\n--- Sök kort ---")
+    print("Ord = alla måste finnas, OR = något av, ord* = prefix, tag:namn = filter")
+    query = prompt_nonempty("Sök: ")
+    hits = search(query, limit=20)
+    if not hits:
+        print("Inga träffar.")
+        return
+    for c in hits:
+        tags = ", ".join(c.get("tags") or [])
+        print(f"- [{c['id']}] {c['q']} → {c['a']}" + (f"  ({tags})" if tags else ""))
+    if len(hits) == 20:
+        print("(visar de 20 första träffarna)")
 
 # ---------------- Huvudmeny ----------------
 
 
 def main():
+    # Valfri mätning (STUDIE_PROFILE eller --profile); sammanfattas vid avslut
+    instrument.enable_from_env()
+    try:
+        _menu_loop()
+    finally:
+        instrument.finish()
+
+
+def _menu_loop():
     while True:
         print("\n====== FLASHCARDS ======")
         print("1) Lägg till kort")
@@ -175,27 +316,35 @@ def main():
         print("3) Studieplan")
         print("4) Statistik")
         print("5) Generera flashcards")
-        print("6) Avsluta")
+        print("6) Sök kort")
+        print("7) Avsluta")
         choice = input("Val: ").strip()
 
         if choice == "1":
             handle_add_card()
         elif choice == "2":
             handle_quiz()
-        elif choice == "6":
+        elif choice == "7":
             print("Hejdå!")
             break
         elif choice == "3":
             handle_studyplan_menu()
         elif choice == "4":
-            handle_stats()
+            handle_stats_menu()
         elif choice == "5":
             handle_generate()
+        elif choice == "6":
+            handle_search()
         else:
-            print("Ogiltigt val. Skriv 1, 2, 3, 4, 5 eller 6.")
+            print("Ogiltigt val. Skriv 1, 2, 3, 4, 5, 6 eller 7.")
 
 
 if __name__ == "__main__":
+    if "--profile" in sys.argv:
+        # --profile [fil.json]: som STUDIE_PROFILE=1 resp. STUDIE_PROFILE=fil.json
+        i = sys.argv.index("--profile")
+        target = sys.argv[i + 1] if i + 1 < len(sys.argv) else "1"
+        os.environ[instrument.PROFILE_ENV] = target
     try:
         main()
     except KeyboardInterrupt:
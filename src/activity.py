@@ -0,0 +1,239 @@
+"""
+activity.py – aktivitet per ISO-vecka: besvarade frågor, rätta svar och nya kort.
+
+Räknarna används av studieplanens mätbara mål (se plan.py), t.ex.
+"Kör 10 quiz-frågor" eller "Lägg till 5 kort #sql".
+
+De uppdateras inkrementellt av flashcards: när resultat loggas (quiz_once,
+QuizSession, servern) och när kort läggs till (add_card, add_cards, import,
+generator) läggs en rad per vecka till i data/activity.jsonl – en låsfri
+O_APPEND-skrivning, precis som results.csv.
+
+Saknas loggen (t.ex. första gången efter uppdateringen) byggs den en gång
+ur resultaten (results.csv eller sqlite), så att svar och rätt svar från
+tidigare veckor räknas. Nya kort kan inte räknas i efterhand – kortfilen
+sparar inte när ett kort lades till – så "kort" börjar på noll.
+
+Summorna per vecka hålls i data/activity.stats.json tillsammans med hur
+långt loggen är läst (samma checkpoint som stats.totals). weekly() läser
+bara rader som tillkommit sedan förra anropet, aldrig hela historiken.
+Cachen kan raderas när som helst; den byggs då om från loggen.
+
+Rad i loggen (tags: tagg → [svar, rätt, kort]):
+    {"week": "2025-W35", "answers": 3, "correct": 2, "cards": 0, "tags": {"sql": [3, 2, 0]}}
+"""
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import io
+import json
+
+from src.io_utils import append_bytes, file_lock, read_json, replace_bytes, write_json
+from src.stats import _iter_result_tuples, _probe
+from src.workspace import in_workspace
+
+ACTIVITY_LOG = Path("data/activity.jsonl")
+ACTIVITY_CACHE = Path("data/activity.stats.json")
+
+METRICS = ("answers", "correct", "cards")
+
+
+def _week_of(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _entry() -> Dict[str, Any]:
+    return {"answers": 0, "correct": 0, "cards": 0, "tags": {}}
+
+
+def _lines(deltas: Dict[str, Dict[str, Any]]) -> bytes:
+    # En rad per vecka
+    return "".join(json.dumps({"week": w, **d}, ensure_ascii=False) + "\n"
+                   for w, d in deltas.items()).encode("utf-8")
+
+
+def _append(deltas: Dict[str, Dict[str, Any]]) -> None:
+    # En skrivning för hela batchen; loggen byggs ur resultaten först om den saknas
+    if not ACTIVITY_LOG.exists():
+        _seed()
+    append_bytes(ACTIVITY_LOG, _lines(deltas))
+
+
+def _seed() -> None:
+    """
+    Skapa loggen ur resultaten som redan finns (en gång).
+
+    Körs innan första raden skrivs och innan första läsningen. Anroparna
+    loggar aktiviteten före själva resultatet, så ett svar som håller på
+    att sparas räknas inte två gånger. Nya kort kan inte räknas i efterhand.
+    """
+    from src.flashcards import _card_tags, card_key  # undvik cirkulär import
+
+    with file_lock(ACTIVITY_LOG):
+        if ACTIVITY_LOG.exists():  # en annan process hann före
+            return
+        # [svar, rätt] per (vecka, kort) – taggarna slås sedan upp en gång per kort
+        counts: Dict[Tuple[str, str], List[int]] = {}
+        legacy_ids: Dict[Tuple[str, str], str] = {}
+        for ts, q, a, ok, cid in _iter_result_tuples():
+            try:
+                week = _week_of(date.fromisoformat(str(ts)[:10]))
+            except ValueError:
+                continue
+            if not cid:
+                cid = legacy_ids.get((q, a))
+                if cid is None:
+                    cid = legacy_ids[(q, a)] = card_key({"q": q, "a": a})
+            c = counts.get((week, cid))
+            if c is None:
+                c = counts[(week, cid)] = [0, 0]
+            c[0] += 1
+            c[1] += ok
+        tags = _card_tags({cid for _, cid in counts})
+        deltas: Dict[str, Dict[str, Any]] = {}
+        for (week, cid), (n, ok) in counts.items():
+            d = deltas.get(week)
+            if d is None:
+                d = deltas[week] = _entry()
+            d["answers"] += n
+            d["correct"] += ok
+            for tag in set(tags.get(cid) or []):
+                t = d["tags"].setdefault(tag, [0, 0, 0])
+                t[0] += n
+                t[1] += ok
+        # Tom logg också: den markerar att historiken redan är inräknad
+        replace_bytes(ACTIVITY_LOG, _lines(deltas))
+
+
+def record_answers(rows: Iterable[Tuple[str, bool, List[str]]]) -> None:
+    """
+    Räkna besvarade frågor i veckan för varje svars tidsstämpel.
+
+    Args:
+        rows (Iterable[tuple]): (tidsstämpel "YYYY-MM-DDT...", rätt, kortets taggar)
+    """
+    deltas: Dict[str, Dict[str, Any]] = {}
+    for ts, ok, tags in rows:
+        try:
+            week = _week_of(date.fromisoformat(str(ts)[:10]))
+        except ValueError:
+            continue
+        d = deltas.get(week)
+        if d is None:
+            d = deltas[week] = _entry()
+        ok = int(bool(ok))
+        d["answers"] += 1
+        d["correct"] += ok
+        for tag in set(tags or []):
+            c = d["tags"].setdefault(tag, [0, 0, 0])
+            c[0] += 1
+            c[1] += ok
+    if deltas:
+        _append(deltas)
+
+
+def record_cards(cards: List[Dict], day: Optional[date] = None) -> None:
+    """
+    Räkna nya kort i veckan de lades till.
+
+    Args:
+        cards (list[dict]): korten som just sparats
+        day (date, optional): dagen de lades till. Standard: i dag
+    """
+    if not cards:
+        return
+    d = _entry()
+    d["cards"] = len(cards)
+    for card in cards:
+        for tag in set(card.get("tags") or []):
+            d["tags"].setdefault(tag, [0, 0, 0])[2] += 1
+    _append({_week_of(day or date.today()): d})
+
+
+def _merge(into: Dict[str, Any], d: Dict[str, Any]) -> None:
+    for m in METRICS:
+        into[m] += int(d.get(m, 0))
+    for tag, counts in (d.get("tags") or {}).items():
+        cur = into["tags"].setdefault(tag, [0, 0, 0])
+        for i in range(3):
+            cur[i] += int(counts[i])
+
+
+def _update_cache() -> Dict[str, Any]:
+    """
+    Läs bara nya rader i loggen sedan senaste checkpoint och uppdatera summorna.
+
+    Returns:
+        dict[str, Any]: {"offset", "probe", "weeks": {vecka: räknare}}
+    """
+    if not ACTIVITY_LOG.exists():
+        _seed()
+
+    cache = read_json(ACTIVITY_CACHE, default=None)
+    with ACTIVITY_LOG.open("rb") as f:
+        size = f.seek(0, io.SEEK_END)
+        valid = (
+            isinstance(cache, dict)
+            and 0 <= cache.get("offset", -1) <= size
+            and cache.get("probe") == _probe(f, cache["offset"])
+        )
+        if not valid:
+            # Ingen cache, eller loggen har kortats/skrivits om → bygg om
+            cache = {"offset": 0, "weeks": {}}
+
+        if cache["offset"] == size:
+            return cache
+
+        f.seek(cache["offset"])
+        chunk = f.read(size - cache["offset"])
+        # Bara hela rader – en halvskriven sista rad räknas nästa gång
+        chunk = chunk[:chunk.rfind(b"\n") + 1]
+        if not chunk:
+            return cache
+        weeks = cache["weeks"]
+        for line in chunk.splitlines():
+            try:
+                d = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(d, dict) and isinstance(d.get("week"), str):
+                _merge(weeks.setdefault(d["week"], _entry()), d)
+        cache["offset"] += len(chunk)
+        cache["probe"] = _probe(f, cache["offset"])
+
+    # Cachen kan alltid byggas om – ingen fsync behövs
+    write_json(ACTIVITY_CACHE, cache, durable=False)
+    return cache
+
+
+@in_workspace
+def weekly() -> Dict[str, Dict[str, Any]]:
+    """
+    Aktivitet per vecka.
+
+    Returns:
+        dict[str, dict]: {"2025-W35": {"answers", "correct", "cards",
+            "tags": {tagg: [svar, rätt, kort]}}}
+    """
+    return _update_cache()["weeks"]
+
+
+def count(week_data: Optional[Dict[str, Any]], metric: str, tag: Optional[str] = None) -> int:
+    """
+    Ett mått ur en veckas räknare (från weekly()).
+
+    Args:
+        week_data (dict | None): veckans räknare, None = ingen aktivitet
+        metric (str): "answers", "correct" eller "cards"
+        tag (str, optional): räkna bara kort med taggen
+
+    Returns:
+        int: antal
+    """
+    if not week_data:
+        return 0
+    if tag is None:
+        return int(week_data.get(metric, 0))
+    counts = (week_data.get("tags") or {}).get(tag)
+    return int(counts[METRICS.index(metric)]) if counts else 0
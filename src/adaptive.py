@@ -0,0 +1,208 @@
+"""
+adaptive.py – "drilla mina svaga kort": viktad slumpning efter felfrekvens.
+
+Varje kort får en vikt som växer med andelen fel bland de senaste svaren
+och med tiden sedan kortet senast visades. Korten dras med sannolikhet
+proportionell mot vikten.
+
+Vikterna ligger i ett Fenwick-träd (binary indexed tree), så både att dra
+ett kort och att uppdatera ett korts vikt efter ett svar är O(log n).
+Ingen kumulativ summa behöver byggas om per fråga, även för stora lekar.
+
+Startvikterna räknas fram från historiken i data/results.csv (eller
+sqlite-backenden) med en genomläsning.
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict, List, Optional
+import random
+import time
+
+from src.flashcards import QuizSession, card_key
+from src.stats import _iter_result_tuples
+
+# Hur många av de senaste svaren per kort som räknas i felfrekvensen
+RECENT = 5
+# Vikt för kort som aldrig besvarats (behandlas som "osäkra")
+UNSEEN_ERROR = 0.5
+# Tid (sekunder) då "tid sedan senast" har gett full effekt
+AGE_FULL = 7 * 86400
+
+
+class FenwickTree:
+    """
+    Fenwick-träd över icke-negativa vikter.
+
+    Stöder punktuppdatering, prefixsumma och "hitta index för en given
+    kumulativ vikt" – allt i O(log n).
+    """
+
+    def __init__(self, weights: List[float]):
+        """
+        Args:
+            weights (list[float]): startvikter (byggs i O(n))
+        """
+        n = len(weights)
+        self.n = n
+        self.weights = list(weights)
+        self.tree = [0.0] * (n + 1)
+        for i, w in enumerate(weights, start=1):
+            self.tree[i] += w
+            parent = i + (i & -i)
+            if parent <= n:
+                self.tree[parent] += self.tree[i]
+
+    def total(self) -> float:
+        """Summan av alla vikter."""
+        return self.prefix(self.n)
+
+    def prefix(self, i: int) -> float:
+        """Summan av vikterna för index 0..i-1."""
+        s = 0.0
+        while i > 0:
+            s += self.tree[i]
+            i -= i & -i
+        return s
+
+    def set(self, index: int, weight: float) -> None:
+        """
+        Sätt vikten för ett index.
+
+        Args:
+            index (int): 0-baserat index
+            weight (float): ny vikt (>= 0)
+        """
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def find(self, target: float) -> int:
+        """
+        Index vars kumulativa intervall innehåller target.
+
+        Args:
+            target (float): värde i [0, total())
+
+        Returns:
+            int: 0-baserat index
+        """
+        pos = 0
+        step = 1 << self.n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= target:
+                target -= self.tree[nxt]
+                pos = nxt
+            step >>= 1
+        return min(pos, self.n - 1)
+
+    def sample(self, rng: random.Random = random) -> int:
+        """Dra ett index med sannolikhet proportionell mot vikten."""
+        return self.find(rng.random() * self.total())
+
+
+def _ts(value: str) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def weight(recent: List[int], last_seen: Optional[float], now: float) -> float:
+    """
+    Vikt för ett kort: felfrekvens bland senaste svaren + tid sedan senast.
+
+    Args:
+        recent (list[int]): senaste svaren (1 = rätt, 0 = fel), äldst först
+        last_seen (float | None): senast besvarat (epoch), None = aldrig
+        now (float): nuvarande tid (epoch)
+
+    Returns:
+        float: vikt > 0
+    """
+    if not recent:
+        error = UNSEEN_ERROR
+    else:
+        error = 1 - sum(recent) / len(recent)
+    age = 1.0 if last_seen is None else min(1.0, max(0.0, now - last_seen) / AGE_FULL)
+    # Liten basvikt så att även "klara" kort dyker upp ibland
+    return 0.05 + error + 0.5 * age
+
+
+class AdaptiveQuiz(QuizSession):
+    """
+    QuizSession som drar kort viktat efter svaghet i stället för jämnt.
+
+    Exempel:
+        with AdaptiveQuiz() as quiz:
+            for _ in range(10):
+                quiz.ask()
+    """
+
+    def __init__(self, cards: Optional[List[Dict]] = None, flush_every: int = 20,
+                 now: Optional[float] = None, tags: Optional[str] = None,
+                 workspace=None):
+        """
+        Args:
+            cards (list[dict], optional): kort att quiza på. Standard: hela leken
+            flush_every (int): antal svar mellan skrivningar till resultatloggen
+            now (float, optional): nuvarande tid (epoch), för tester
+            tags (str, optional): tagguttryck, t.ex. "sql AND NOT auto"
+            workspace (Workspace, optional): arbetsyta att läsa och logga i
+        """
+        super().__init__(cards, flush_every=flush_every, tags=tags, workspace=workspace)
+        self.now = time.time() if now is None else now
+        self.keys = [card_key(c) for c in self.cards]
+        index = {k: i for i, k in enumerate(self.keys)}
+
+        # Historik: senaste RECENT svaren och senast sedd per kort (en genomläsning)
+        self.recent: List[List[int]] = [[] for _ in self.cards]
+        self.last_seen: List[Optional[float]] = [None] * len(self.cards)
+        legacy: Dict[tuple, Optional[int]] = {}
+        with self._active():
+            for ts, q, a, ok, cid in _iter_result_tuples():
+                if cid:
+                    i = index.get(cid)
+                else:
+                    if (q, a) not in legacy:
+                        legacy[(q, a)] = index.get(card_key({"q": q, "a": a}))
+                    i = legacy[(q, a)]
+                if i is None:
+                    continue
+                r = self.recent[i]
+                r.append(ok)
+                if len(r) > RECENT:
+                    del r[0]
+                self.last_seen[i] = ts
+
+        self.last_seen = [None if t is None else _ts(t) for t in self.last_seen]
+        self.tree = FenwickTree([
+            weight(self.recent[i], self.last_seen[i], self.now) for i in range(len(self.cards))
+        ])
+
+    def _draw(self) -> int:
+        # Viktad dragning (O(log n)) i stället för jämn utan återläggning
+        return self.tree.sample()
+
+    def answer(self, given: str) -> bool:
+        """
+        Rätta svaret och uppdatera kortets vikt (O(log n)).
+
+        Args:
+            given (str): användarens svar
+
+        Returns:
+            bool: True om svaret var rätt
+        """
+        correct = super().answer(given)
+        i = self._current
+        r = self.recent[i]
+        r.append(int(correct))
+        if len(r) > RECENT:
+            del r[0]
+        self.last_seen[i] = time.time()
+        self.tree.set(i, weight(r, self.last_seen[i], self.last_seen[i]))
+        return correct
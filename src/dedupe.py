@@ -0,0 +1,480 @@
+"""
+dedupe.py – hitta nästan-dubbletter bland korten med MinHash + LSH.
+
+Exakta dubbletter (samma fråga/svar efter normalisering) fångas redan av
+generatorn. Den här modulen hittar även omformuleringar, t.ex.
+"Vad är str i Python?" och "Vad betyder str i python?".
+
+Så fungerar det:
+1. Shingling – kortets text (normaliserad fråga + svar) delas upp i
+   överlappande teckensekvenser om SHINGLE tecken.
+2. MinHash – NUM_PERM hashfunktioner; för var och en sparas minsta
+   hashvärdet över kortets shinglar. Andelen lika positioner i två
+   signaturer skattar Jaccard-likheten mellan korten.
+3. LSH – signaturen delas i BANDS band om ROWS värden. Kort som delar
+   minst ett helt band blir kandidater; bara de jämförs parvis.
+
+Alla kort behöver alltså inte jämföras parvis. Arbetet blir ungefär
+linjärt i antalet kort (plus en sortering per band).
+
+Användning:
+    python -m src.dedupe report            # lista kluster av liknande kort
+    python -m src.dedupe merge             # slå ihop varje kluster till ett kort
+
+flashcards.add_card(..., check_similar=True) använder find_similar() för
+att stoppa nya kort som liknar ett befintligt.
+"""
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+import hashlib
+import random
+import re
+import sys
+
+from src.flashcards import _load_cards, _normalize, delete_card, get_card, update_card
+from src.workspace import in_workspace
+
+try:  # valfritt: vektoriserade signaturer för stora lekar
+    import numpy as np
+except ImportError:  # pragma: no cover - beror på miljön
+    np = None
+
+SHINGLE = 4
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Jaccard-likhet (på shinglar) från vilken två kort räknas som dubbletter
+THRESHOLD = 0.5
+
+_MASK = (1 << 64) - 1
+# Id som skapats av flashcards (16 hex-tecken) lagras direkt som heltal
+_HEX_ID = re.compile(r"[0-9a-f]{16}")
+_FNV = 0x100000001B3
+# Fast frö – samma hashfunktioner vid varje körning
+_rng = random.Random(20240823)
+_A = [_rng.getrandbits(64) | 1 for _ in range(NUM_PERM)]
+_B = [_rng.getrandbits(64) for _ in range(NUM_PERM)]
+
+# ---------------- Shinglar och signaturer ----------------
+
+
+def shingles(card: Dict) -> Set[int]:
+    """
+    Kortets shinglar som 32-bitars hashvärden.
+
+    Pythons inbyggda hash() används (snabbast). Den slumpas per process,
+    så signaturer jämförs bara inom samma process och sparas aldrig.
+
+    Args:
+        card (dict): kort med "q" och "a"
+
+    Returns:
+        set[int]: hashade teckensekvenser
+    """
+    text = _normalize(card.get("q", "")) + " | " + _normalize(card.get("a", ""))
+    last = max(1, len(text) - SHINGLE + 1)
+    return {hash(text[i:i + SHINGLE]) & 0xFFFFFFFF for i in range(last)}
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    """Jaccard-likhet mellan två mängder (0–1)."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def signature(sh: Iterable[int]) -> List[int]:
+    """
+    MinHash-signatur för en mängd shinglar.
+
+    Args:
+        sh (Iterable[int]): shinglar (se shingles())
+
+    Returns:
+        list[int]: NUM_PERM värden
+    """
+    xs = list(sh)
+    # Multiply-shift-hashning: (a*x + b) mod 2^64, övre 32 bitarna
+    return [min(((a * x + b) & _MASK) >> 32 for x in xs) for a, b in zip(_A, _B)]
+
+
+def band_hashes(sig: List[int]) -> List[int]:
+    """
+    Slå ihop varje band (ROWS värden) till ett 64-bitars hashvärde.
+
+    Args:
+        sig (list[int]): MinHash-signatur
+
+    Returns:
+        list[int]: BANDS hashvärden
+    """
+    out = []
+    for band in range(BANDS):
+        h = band + 1
+        for v in sig[band * ROWS:(band + 1) * ROWS]:
+            h = ((h * _FNV) & _MASK) ^ v
+        out.append(h)
+    return out
+
+
+def id_key(card_id) -> int:
+    """
+    Kort-id som 64-bitars heltal för LSH-indexet.
+
+    Id som flashcards skapar (16 hex-tecken) blir sitt eget värde; andra id
+    (t.ex. från en importerad eller handredigerad lek) hashas stabilt.
+
+    Args:
+        card_id: kortets id
+
+    Returns:
+        int: heltal i [0, 2**64)
+    """
+    if isinstance(card_id, str) and _HEX_ID.fullmatch(card_id):
+        return int(card_id, 16)
+    return int.from_bytes(hashlib.sha1(str(card_id).encode("utf-8")).digest()[:8], "big")
+
+
+def _band_matrix(cards: List[Dict], sigs: Optional[array] = None) -> List[array]:
+    # Bandhashar för alla kort: en array("Q") per band (kolumnvis, kompakt).
+    # Om sigs ges fylls den med signaturerna, NUM_PERM värden per kort.
+    cols = [array("Q") for _ in range(BANDS)]
+    if np is None:
+        for card in cards:
+            sig = signature(shingles(card))
+            if sigs is not None:
+                sigs.extend(sig)
+            for col, h in zip(cols, band_hashes(sig)):
+                col.append(h)
+        return cols
+
+    A = np.array(_A, dtype=np.uint64)
+    B = np.array(_B, dtype=np.uint64)
+    fnv = np.uint64(_FNV)
+    chunk = 20_000
+    for start in range(0, len(cards), chunk):
+        sets = [shingles(c) for c in cards[start:start + chunk]]
+        lengths = np.fromiter((len(s) for s in sets), dtype=np.int64, count=len(sets))
+        xs = np.fromiter((x for s in sets for x in s), dtype=np.uint64, count=int(lengths.sum()))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        sig = np.empty((len(sets), NUM_PERM), dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for i in range(NUM_PERM):
+                # Samma multiply-shift som signature(); uint64 räknar mod 2^64
+                sig[:, i] = np.minimum.reduceat((A[i] * xs + B[i]) >> np.uint64(32), offsets)
+            if sigs is not None:
+                sigs.frombytes(sig.astype(np.uint32).tobytes())
+            for band in range(BANDS):
+                h = np.full(len(sets), band + 1, dtype=np.uint64)
+                for r in range(ROWS):
+                    h = (h * fnv) ^ sig[:, band * ROWS + r]
+                cols[band].extend(h.tolist())
+    return cols
+
+# ---------------- LSH-index ----------------
+
+
+class LSHIndex:
+    """
+    LSH-index över kortens bandhashar.
+
+    Varje band lagras som två sorterade arrayer (hash, kort-id), så uppslag
+    är binärsökning. Nya kort hamnar i en liten dict som slås ihop med de
+    sorterade arrayerna när den vuxit; borttagna kort markeras och filtreras.
+
+    Exempel:
+        idx = LSHIndex(cards)
+        ids = idx.candidates({"q": "Vad är str?", "a": "text"})
+    """
+
+    MERGE_EVERY = 50_000
+
+    def __init__(self, cards: Iterable[Dict] = (), sigs: Optional[array] = None):
+        """
+        Args:
+            cards (Iterable[dict]): kort med id
+            sigs (array, optional): array("I") som fylls med kortens signaturer
+        """
+        # Heltal → id för kort vars id inte är 16 hex-tecken (importerade, handskrivna)
+        self._names: Dict[int, object] = {}
+        cards = [c for c in cards if c.get("id")]
+        ids = [self._key(c["id"]) for c in cards]
+        self._keys: List[array] = []
+        self._ids: List[array] = []
+        id_arr = array("Q", ids)
+        for col in _band_matrix(cards, sigs):
+            if np is not None and ids:
+                order = np.argsort(np.frombuffer(col, dtype=np.uint64), kind="stable")
+                self._keys.append(array("Q", np.frombuffer(col, dtype=np.uint64)[order].tobytes()))
+                self._ids.append(array("Q", np.frombuffer(id_arr, dtype=np.uint64)[order].tobytes()))
+                continue
+            order = sorted(range(len(ids)), key=col.__getitem__)
+            self._keys.append(array("Q", (col[i] for i in order)))
+            self._ids.append(array("Q", (id_arr[i] for i in order)))
+        self._delta: Dict[tuple, List[int]] = {}
+        self._delta_cards = 0
+        self._removed: Set[int] = set()
+
+    def _key(self, card_id) -> int:
+        # Kortets id som heltal i arrayerna; andra id än hex får en stabil hash
+        key = id_key(card_id)
+        if not (isinstance(card_id, str) and _HEX_ID.fullmatch(card_id)):
+            self._names[key] = card_id
+        return key
+
+    def add(self, card: Dict) -> None:
+        """Lägg till ett kort (med id) i indexet."""
+        cid = self._key(card["id"])
+        self._removed.discard(cid)
+        for band, h in enumerate(band_hashes(signature(shingles(card)))):
+            self._delta.setdefault((band, h), []).append(cid)
+        self._delta_cards += 1
+        if self._delta_cards >= self.MERGE_EVERY:
+            self._merge()
+
+    def remove(self, card_id: str) -> None:
+        """Markera ett kort som borttaget."""
+        self._removed.add(id_key(card_id))
+
+    def _merge(self) -> None:
+        # Slå ihop delta med de sorterade arrayerna (O(n log n), sällan)
+        for band in range(BANDS):
+            pairs = list(zip(self._keys[band], self._ids[band]))
+            pairs += [(h, cid) for (b, h), cids in self._delta.items() if b == band for cid in cids]
+            pairs.sort()
+            self._keys[band] = array("Q", (h for h, _ in pairs))
+            self._ids[band] = array("Q", (cid for _, cid in pairs))
+        self._delta.clear()
+        self._delta_cards = 0
+
+    def candidates(self, card: Dict) -> Set[str]:
+        """
+        Kort som delar minst ett band med det givna kortet.
+
+        Args:
+            card (dict): kort med "q" och "a" (behöver inte finnas i indexet)
+
+        Returns:
+            set[str]: kort-id för kandidater (ej verifierade)
+        """
+        found: Set[int] = set()
+        for band, h in enumerate(band_hashes(signature(shingles(card)))):
+            keys, ids = self._keys[band], self._ids[band]
+            i = bisect_left(keys, h)
+            while i < len(keys) and keys[i] == h:
+                found.add(ids[i])
+                i += 1
+            found.update(self._delta.get((band, h), ()))
+        found -= self._removed
+        return {self._names.get(cid) or f"{cid:016x}" for cid in found}
+
+    def buckets(self) -> Iterator[List[int]]:
+        """
+        Grupper av kort-id som delar ett band (kandidatkluster).
+
+        Yields:
+            list[int]: minst två kort-id (som heltal)
+        """
+        for band in range(BANDS):
+            keys, ids = self._keys[band], self._ids[band]
+            i, n = 0, len(keys)
+            while i < n:
+                j = i + 1
+                while j < n and keys[j] == keys[i]:
+                    j += 1
+                if j - i > 1:
+                    yield [cid for cid in ids[i:j] if cid not in self._removed]
+                i = j
+        for cids in self._delta.values():
+            if len(cids) > 1:
+                yield [cid for cid in cids if cid not in self._removed]
+
+# ---------------- Kluster ----------------
+
+
+@in_workspace
+def find_duplicates(cards: Optional[List[Dict]] = None,
+                    threshold: float = THRESHOLD) -> List[List[Dict]]:
+    """
+    Hitta kluster av nästan-dubbletter i leken.
+
+    Args:
+        cards (list[dict], optional): kort att undersöka. Standard: hela leken
+        threshold (float): minsta Jaccard-likhet (skattad ur signaturerna)
+
+    Returns:
+        list[list[dict]]: kluster (minst två kort), korten i lekens ordning
+    """
+    cards = [c for c in (_load_cards() if cards is None else cards) if c.get("id")]
+    by_id = {id_key(c["id"]): i for i, c in enumerate(cards)}
+    sigs = array("I")
+    index = LSHIndex(cards, sigs)
+
+    # Kandidatpar: varje medlem paras med hinkens första kort och med
+    # föregående medlem – linjärt per hink även när många kort delar ett band.
+    # Samma grupp återkommer ofta i flera band, så paren samlas i en mängd.
+    pairs: Set[tuple] = set()
+    for bucket in index.buckets():
+        members = sorted(by_id[cid] for cid in bucket if cid in by_id)
+        for k in range(1, len(members)):
+            pairs.add((members[0], members[k]))
+            pairs.add((members[k - 1], members[k]))
+
+    # Verifiera med signaturerna: andelen lika positioner skattar Jaccard.
+    # Det slipper räkna om shinglarna för varje kandidat.
+    if np is not None and pairs:
+        mat = np.frombuffer(sigs, dtype=np.uint32).reshape(len(cards), NUM_PERM)
+        left, right = np.array(sorted(pairs), dtype=np.int64).T
+        score = np.empty(len(left))
+        for start in range(0, len(left), 100_000):
+            part = slice(start, start + 100_000)
+            score[part] = (mat[left[part]] == mat[right[part]]).mean(axis=1)
+        keep = score >= threshold
+        matches = zip(left[keep].tolist(), right[keep].tolist())
+    else:
+        def similar(i: int, j: int) -> bool:
+            a, b = i * NUM_PERM, j * NUM_PERM
+            same = sum(x == y for x, y in zip(sigs[a:a + NUM_PERM], sigs[b:b + NUM_PERM]))
+            return same / NUM_PERM >= threshold
+        matches = (p for p in sorted(pairs) if similar(*p))
+
+    # Union-find över kortpositioner
+    parent = list(range(len(cards)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in matches:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    clusters: Dict[int, List[Dict]] = {}
+    for i in range(len(cards)):
+        clusters.setdefault(find(i), []).append(cards[i])
+    return [group for group in clusters.values() if len(group) > 1]
+
+
+@in_workspace
+def merge_duplicates(threshold: float = THRESHOLD) -> int:
+    """
+    Slå ihop varje kluster av nästan-dubbletter till ett kort.
+
+    Det första (äldsta) kortet behålls och får alla taggar från klustret;
+    övriga kort tas bort.
+
+    Args:
+        threshold (float): minsta Jaccard-likhet för att räknas som dubblett
+
+    Returns:
+        int: antal borttagna kort
+    """
+    removed = 0
+    for group in find_duplicates(threshold=threshold):
+        keep, rest = group[0], group[1:]
+        tags = list(dict.fromkeys(t for c in group for t in (c.get("tags") or [])))
+        if tags != list(keep.get("tags") or []):
+            update_card(keep["id"], tags=tags)
+        for c in rest:
+            delete_card(c["id"])
+            removed += 1
+    return removed
+
+# ---------------- Kontroll av nya kort ----------------
+
+# Index över leken för find_similar (byggs vid första anropet i processen
+# och hålls uppdaterat av flashcards via index_cards/remove_cards)
+def _empty_online() -> Dict:
+    return {"index": None}
+
+
+_online: Dict = _empty_online()
+
+
+def index_cards(cards: Iterable[Dict]) -> None:
+    """Lägg till (eller indexera om) kort i indexet för find_similar."""
+    index = _online["index"]
+    if index is not None:
+        for c in cards:
+            if c.get("id"):
+                index.add(c)
+
+
+def remove_cards(card_ids: Iterable[str]) -> None:
+    """Ta bort kort ur indexet för find_similar."""
+    index = _online["index"]
+    if index is not None:
+        for cid in card_ids:
+            index.remove(cid)
+
+
+def invalidate_index() -> None:
+    """Släng indexet för find_similar; det byggs om vid nästa anrop."""
+    _online["index"] = None
+
+
+@in_workspace
+def find_similar(question: str, answer: str,
+                 threshold: float = THRESHOLD) -> List[Dict]:
+    """
+    Befintliga kort som liknar ett (nytt) kort.
+
+    Args:
+        question (str): frågetext
+        answer (str): svar
+        threshold (float): minsta Jaccard-likhet
+
+    Returns:
+        list[dict]: liknande kort, mest lika först
+    """
+    if _online["index"] is None:
+        _online["index"] = LSHIndex(_load_cards())
+    card = {"q": question, "a": answer}
+    sh = shingles(card)
+    hits = []
+    for cid in _online["index"].candidates(card):
+        other = get_card(cid)
+        if other is None:
+            continue
+        score = jaccard(sh, shingles(other))
+        if score >= threshold:
+            hits.append((score, other))
+    hits.sort(key=lambda h: -h[0])
+    return [c for _, c in hits]
+
+# ---------------- Kommandorad ----------------
+
+
+def report(threshold: float = THRESHOLD) -> int:
+    """
+    Skriv ut kluster av nästan-dubbletter.
+
+    Args:
+        threshold (float): minsta Jaccard-likhet
+
+    Returns:
+        int: antal kluster
+    """
+    groups = find_duplicates(threshold=threshold)
+    for n, group in enumerate(groups, start=1):
+        print(f"\nKluster {n} ({len(group)} kort):")
+        for c in group:
+            print(f"  [{c['id']}] {c['q']} → {c['a']}")
+    print(f"\n{len(groups)} kluster hittades.")
+    return len(groups)
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    limit = float(sys.argv[2]) if len(sys.argv) > 2 else THRESHOLD
+    if cmd == "report":
+        report(limit)
+    elif cmd == "merge":
+        print(f"Tog bort {merge_duplicates(limit)} dubbletter.")
+    else:
+        print("Användning: python -m src.dedupe report|merge [tröskel]")
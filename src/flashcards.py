@@ -4,73 +4,631 @@ flashcards.py – hantering av frågekort (Q/A) och quiz.
 Denna modul lagrar kort i data/flashcards.json, kan lägga till nya kort,
 och köra quiz där frågor slumpas fram. Svar loggas i data/results.csv
 för att möjliggöra statistik.
+
+Varje kort har ett stabilt id (16 hex-tecken, hash av innehållet när kortet
+skapades) som inte ändras när kortet redigeras:
+    {"id": "5b4f1926405e9d8f", "q": "...", "a": "...", "tags": [...]}
+Kort utan id (äldre filer) får ett id automatiskt en gång vid inläsning.
+get_card/update_card/delete_card slår upp kortet via ett id → position-index
+i minnet i stället för att söka igenom listan.
+
+Lagring:
+    data/flashcards.json           – snapshot (lista av kort)
+    data/flashcards.journal.jsonl  – append-only logg av ändringar sedan
+                                     senaste snapshot, en operation per rad:
+        {"op": "base", "snapshot": "9c1e..."}   (första raden)
+        {"op": "add", "card": {...}}
+        {"op": "edit", "id": "5b4f...", "card": {...}}
+        {"op": "delete", "id": "5b4f..."}
+
+Nya kort blir alltså en append på en rad i stället för en omskrivning av
+hela leken. Snapshot + journal spelas upp till en vy i minnet som hålls
+uppdaterad inkrementellt. compact_cards() skriver vyn som ny snapshot och
+tömmer journalen (sker även automatiskt efter COMPACT_EVERY operationer).
+
+Journalens första rad anger vilken snapshot den bygger på (hash av filens
+innehåll). Avbryts en kompaktering efter att snapshoten skrivits men innan
+journalen tömts, hör journalen till den gamla snapshoten och alla dess rader
+hoppas över – de finns redan i den nya. Nästa skrivning tömmer den då.
+
+Flera processer kan dela data/: alla ändringar av snapshot/journal görs
+under ett fillås (io_utils.file_lock på flashcards.json), medan läsare
+och resultatloggen (O_APPEND, en skrivning per batch) klarar sig utan lås.
+
+Med STUDIE_BACKEND=sqlite (se src/storage.py) går kort och resultat i
+stället till data/studie.db via src/sqlite_store.py.
 """
 from __future__ import annotations
 from pathlib import Path
+from collections import ChainMap
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
+import hashlib
+import json
 import random
 import csv
+import io
+import os
 from typing import List, Dict, Optional
-from src.io_utils import read_json, write_json
+from src.io_utils import (append_bytes, file_digest, file_lock, flush_pending,
+                          read_json_digest, write_json)
+from src.storage import use_sqlite
+from src import activity, sqlite_store
+from src.stats import _is_correct, update_day_index
+from src.tagfilter import TagIndex
+from src.workspace import in_workspace
 
 # Filvägar
 FLASHCARDS_PATH = Path("data/flashcards.json")
+FLASHCARDS_JOURNAL = Path("data/flashcards.journal.jsonl")
 RESULTS_CSV = Path("data/results.csv")
 
+# Antal journal-operationer innan vi automatiskt kompakterar till snapshot.
+# För stora lekar väntar vi tills journalen är en fjärdedel av leken, så att
+# massimport inte skriver om hela snapshoten var tusende kort (O(n²)).
+COMPACT_EVERY = 1000
+
+# Materialiserad vy: snapshot + uppspelad journal.
+# "snapshot" = (mtime_ns, size) för flashcards.json när vyn byggdes,
+# "base" = file_digest av samma snapshot, "stale" = journalen hör till en
+# äldre snapshot (dess rader hoppas över),
+# "offset" = hur många bytes av journalen som redan är applicerade,
+# "pos" = id → position i "cards". Borttagna kort lämnar None på sin plats
+# (räknas i "holes") tills nästa kompaktering, så delete blir O(1).
+# "tags" = TagIndex (bitmängder per tagg) över "cards"; byggs först när ett
+# taggfilter används och hålls sedan uppdaterat av _apply_op.
+def _empty_view() -> Dict:
+    return {"snapshot": None, "base": "", "stale": False, "cards": [], "pos": {},
+            "holes": 0, "missing": 0, "offset": 0, "ops": 0, "tags": None}
+
+
+_view: Dict = _empty_view()
+
+# Nästlingsdjup för deferred_compaction(); > 0 = ingen automatisk kompaktering
+_defer = {"depth": 0}
+
 # ----- Hjälpare för att läsa/spara kort -----
 
 
+def _file_key(path: Path) -> Optional[tuple[int, int]]:
+    # (mtime_ns, size) eller None om filen saknas
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _new_id(card: Dict, taken) -> str:
+    """
+    Ge ett kort ett id: hash av innehållet, med räknare vid krock (dubbletter).
+
+    Args:
+        card (dict): kort med "q" och "a"
+        taken: något som stödjer `in` (t.ex. dict/set med upptagna id)
+
+    Returns:
+        str: 16 hex-tecken som inte finns i taken
+    """
+    raw = _normalize(card.get("q", "")) + "\x1f" + _normalize(card.get("a", ""))
+    cid = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+    n = 0
+    while cid in taken:
+        n += 1
+        cid = hashlib.sha1(f"{raw}\x1f{n}".encode("utf-8")).hexdigest()[:16]
+    return cid
+
+
+def _with_id(card: Dict, taken) -> Dict:
+    # Kortet med "id" först; nytt id om det saknas eller redan är upptaget
+    cid = card.get("id")
+    if not cid or cid in taken:
+        cid = _new_id(card, taken)
+    return {"id": cid, **{k: v for k, v in card.items() if k != "id"}}
+
+
+def _set_view(cards: List[Dict]) -> None:
+    # Bygg om vyn och id-indexet från en lista (kort utan id räknas i "missing")
+    pos: Dict[str, int] = {}
+    missing = 0
+    for i, c in enumerate(cards):
+        cid = c.get("id")
+        if cid and cid not in pos:
+            pos[cid] = i
+        else:
+            missing += 1
+    _view.update(cards=cards, pos=pos, holes=0, missing=missing, tags=None)
+
+
+def _apply_op(op: Dict) -> None:
+    """
+    Applicera en journal-operation på vyn i minnet.
+
+    Args:
+        op (dict): {"op": "add" | "edit" | "delete", ...}
+    """
+    cards, pos, tags = _view["cards"], _view["pos"], _view["tags"]
+    kind = op.get("op")
+    if kind == "add":
+        card = op["card"]
+        i = pos.get(card.get("id"))
+        if i is not None and cards[i] == card:
+            # Redan med i snapshoten (äldre journal utan base-rad, avbrott
+            # mellan ny snapshot och tömd journal)
+            return
+        if not card.get("id") or card["id"] in pos:
+            card = _with_id(card, pos)
+            _view["missing"] += 1  # id:t finns bara i minnet tills nästa snapshot
+        pos[card["id"]] = len(cards)
+        cards.append(card)
+        if tags is not None:
+            tags.add(len(cards) - 1, card)
+    elif kind in ("edit", "delete") and "id" in op:
+        i = pos.get(op["id"])
+        if i is None:
+            return
+        if kind == "edit":
+            new = {**op["card"], "id": op["id"]}
+            if tags is not None:
+                tags.replace(i, cards[i], new)
+            cards[i] = new
+        else:
+            if tags is not None:
+                tags.remove(i, cards[i])
+            cards[i] = None
+            del pos[op["id"]]
+            _view["holes"] += 1
+    elif kind in ("edit", "delete"):
+        # Äldre journalrader (före id) pekar ut kortet med position
+        live = [c for c in cards if c is not None]
+        i = op.get("index", -1)
+        if 0 <= i < len(live):
+            if kind == "edit":
+                live[i] = op["card"]
+            else:
+                del live[i]
+        _set_view(live)
+
+
+def _refresh_view() -> None:
+    """
+    Se till att vyn i minnet motsvarar snapshot + journal på disk.
+
+    Läser bara om snapshoten om den har ändrats (t.ex. efter kompaktering
+    i en annan process) och applicerar annars bara de journalrader som
+    tillkommit sedan förra anropet. Saknar några kort id (äldre filer)
+    tilldelas de id och en ny snapshot skrivs – en engångsmigrering.
+
+    Raises:
+        ValueError: om flashcards.json inte innehåller en lista
+    """
+    key = _file_key(FLASHCARDS_PATH)
+    journal_size = _file_key(FLASHCARDS_JOURNAL)
+    journal_size = journal_size[1] if journal_size else 0
+
+    if key != _view["snapshot"] or journal_size < _view["offset"]:
+        # Vyn håller redan leken i minnet – ingen extra kopia i läs-cachen
+        cards, base = read_json_digest(FLASHCARDS_PATH, default=[])
+        if not isinstance(cards, list):
+            raise ValueError("flashcards.json måste vara en lista av kort.")
+        _set_view(cards)
+        _view.update(snapshot=key, base=base, stale=False, offset=0, ops=0)
+
+    if journal_size > _view["offset"]:
+        with FLASHCARDS_JOURNAL.open("rb") as f:
+            f.seek(_view["offset"])
+            chunk = f.read(journal_size - _view["offset"])
+        # Bara hela rader räknas – en halvskriven sista rad tas nästa gång
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                op = json.loads(line)
+            except ValueError:
+                continue  # trasig rad (t.ex. avbruten skrivning) hoppas över
+            if op.get("op") == "base":
+                # Journal från en äldre snapshot: raderna finns redan i den nya
+                _view["stale"] = op.get("snapshot") != _view["base"]
+                continue
+            if not _view["stale"]:
+                _apply_op(op)
+                _view["ops"] += 1
+        _view["offset"] += len(complete)
+
+    if _view["missing"]:
+        migrate_card_ids()
+
+
+def _append_ops(ops: List[Dict]) -> None:
+    """
+    Lägg till operationer sist i journalen med en enda skrivning.
+
+    Args:
+        ops (list[dict]): journal-operationer
+    """
+    if not ops:
+        return
+    payload = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops).encode("utf-8")
+    with file_lock(FLASHCARDS_PATH):
+        # Under låset: vyn ikapp med andra processers rader, sedan vår append
+        _refresh_view()
+        if _view["stale"]:
+            # Kvarlämnad journal efter en avbruten kompaktering: skriv om
+            # snapshoten (ny nyckel för andra processer) och töm journalen
+            compact_cards()
+        journal = _file_key(FLASHCARDS_JOURNAL)
+        if not journal or not journal[1]:
+            # Tom journal: första raden knyter den till nuvarande snapshot
+            header = {"op": "base", "snapshot": _view["base"]}
+            payload = (json.dumps(header) + "\n").encode("utf-8") + payload
+        append_bytes(FLASHCARDS_JOURNAL, payload)
+        # Applicera direkt på vyn så att vi slipper läsa tillbaka våra egna rader
+        for op in ops:
+            _apply_op(op)
+        _view["ops"] += len(ops)
+        _view["offset"] += len(payload)
+        if not _defer["depth"] and _should_compact():
+            compact_cards()
+
+
+def _should_compact() -> bool:
+    return _view["ops"] >= max(COMPACT_EVERY, len(_view["cards"]) // 4)
+
+
+@contextmanager
+def deferred_compaction():
+    """
+    Skjut upp automatisk kompaktering tills blocket lämnas.
+
+    För massimport: varje batch blir en append i journalen, och snapshoten
+    skrivs om en gång på slutet i stället för flera gånger under importen.
+
+    Exempel:
+        with deferred_compaction():
+            for chunk in chunks:
+                add_cards(chunk)
+    """
+    _defer["depth"] += 1
+    try:
+        yield
+    finally:
+        _defer["depth"] -= 1
+        if not _defer["depth"] and not use_sqlite():
+            with file_lock(FLASHCARDS_PATH):
+                _refresh_view()
+                if _view["ops"] and _should_compact():
+                    compact_cards()
+
+
+def _live_cards() -> List[Dict]:
+    # Vyn utan hål efter borttagna kort
+    if _view["holes"]:
+        return [c for c in _view["cards"] if c is not None]
+    return list(_view["cards"])
+
+
+def _load_json_cards() -> List[Dict]:
+    """
+    Läs in alla flashcards från json-filerna (snapshot + journal).
+
+    Returns:
+        list[dict]: en lista med kort-objekt
+
+    Raises:
+        ValueError: om filen inte innehåller en lista
+    """
+    _refresh_view()
+    return _live_cards()
+
+
 def _load_cards() -> List[Dict]:
     """
-    Läs in alla flashcards från data/flashcards.json.
+    Läs in alla flashcards från aktiv backend.
 
     Returns:
-        list[dict]: en lista med kort-objekt ({"q": fråga, "a": svar, "tags": []})
+        list[dict]: en lista med kort-objekt
+            ({"id": ..., "q": fråga, "a": svar, "tags": []})
 
     Raises:
         ValueError: om filen inte innehåller en lista
     """
-    cards = read_json(FLASHCARDS_PATH, default=[])
-    if not isinstance(cards, list):
-        raise ValueError("flashcards.json måste vara en lista av kort.")
-    return cards
+    if use_sqlite():
+        return sqlite_store.load_cards()
+    return _load_json_cards()
 
 
-def _save_cards(cards: List[Dict]) -> None:
+def _save_cards(cards: List[Dict], reindex: bool = True) -> None:
     """
-    Spara hela listan av kort till data/flashcards.json.
+    Spara hela listan av kort som ny snapshot och töm journalen.
+
+    Kort utan id (eller med ett id som redan används) får ett nytt id.
 
     Args:
         cards (list[dict]): korten som ska sparas
+        reindex (bool): släng sekundära index (sökning, dubblettkoll) så att de byggs om.
+            Kompaktering sparar samma kort och slipper det.
 
     Returns:
         None
     """
-    write_json(FLASHCARDS_PATH, cards)
+    taken: Dict[str, int] = {}
+    with_ids = []
+    for c in cards:
+        c = _with_id(c, taken)
+        taken[c["id"]] = len(with_ids)
+        with_ids.append(c)
+    cards = with_ids
+    if reindex:
+        _invalidate_indexes()
+    if use_sqlite():
+        sqlite_store.replace_cards(cards)
+        return
+    with file_lock(FLASHCARDS_PATH):
+        # Vyn håller leken – ingen djupkopia i läs-cachen (som vid läsning)
+        write_json(FLASHCARDS_PATH, cards, cache=False)
+        # Journalen får bara tömmas när snapshoten faktiskt ligger på disk,
+        # även om vi är inne i en group_commit()
+        flush_pending()
+        # Snapshoten innehåller nu allt – journalen kan tömmas
+        if FLASHCARDS_JOURNAL.exists():
+            FLASHCARDS_JOURNAL.write_bytes(b"")
+        _set_view(list(cards))
+        _view.update(snapshot=_file_key(FLASHCARDS_PATH), base=file_digest(FLASHCARDS_PATH),
+                     stale=False, offset=0, ops=0)
+
+
+@in_workspace
+def compact_cards() -> int:
+    """
+    Kompaktera journalen: skriv nuvarande vy som snapshot och töm journalen.
+
+    Returns:
+        int: antal kort i den nya snapshoten
+    """
+    if use_sqlite():
+        return len(sqlite_store.load_cards())  # inget att kompaktera
+    # Låset hålls från inläsning till tömd journal – inga andras rader tappas
+    with file_lock(FLASHCARDS_PATH):
+        cards = _load_cards()
+        _save_cards(cards, reindex=False)
+    return len(cards)
+
+
+@in_workspace
+def migrate_card_ids() -> int:
+    """
+    Engångsmigrering: ge alla kort som saknar id ett id och spara en snapshot.
+
+    Körs automatiskt när leken läses in och kort utan id hittas.
+
+    Returns:
+        int: antal kort i leken
+    """
+    if use_sqlite():
+        return len(sqlite_store.load_cards())  # sqlite_store migrerar i connect()
+    with file_lock(FLASHCARDS_PATH):
+        _view["missing"] = 0  # undvik rekursion via _refresh_view
+        _refresh_view()  # ta med rader som andra processer hunnit lägga till
+        cards = _live_cards()
+        _view["missing"] = 0
+        _save_cards(cards)
+    return len(cards)
+
+
+def _notify_indexes(added: Optional[List[Dict]] = None,
+                    removed: Optional[List[str]] = None) -> None:
+    # Sekundära index (sökning, dubblettkoll) uppdateras inkrementellt när leken ändras
+    from src import dedupe, search  # undvik cirkulär import
+    for index in (search, dedupe):
+        index.remove_cards(removed or [])
+        index.index_cards(added or [])
+
+
+def _invalidate_indexes() -> None:
+    # Släng sekundära index; de byggs om från leken när de behövs nästa gång
+    from src import dedupe, search  # undvik cirkulär import
+    for index in (search, dedupe):
+        index.invalidate_index()
+
+
+def _store_new_cards(cards: List[Dict]) -> List[Dict]:
+    # Nya kort får id och sparas: en transaktion i sqlite, annars add-rader i journalen
+    if not cards:
+        return []
+    if use_sqlite():
+        cards = sqlite_store.add_cards(cards)
+    else:
+        cards = _append_new_cards(cards)
+    _notify_indexes(added=cards)
+    # Veckans räknare för studieplanens mål (en append, ingen omräkning)
+    activity.record_cards(cards)
+    return cards
+
+
+def _append_new_cards(cards: List[Dict]) -> List[Dict]:
+    # Id:n väljs under låset så att två processer inte ger ut samma id
+    with file_lock(FLASHCARDS_PATH):
+        _refresh_view()
+        # Upptagna id = leken + tidigare kort i samma batch (ingen kopia av indexet)
+        batch: Dict[str, int] = {}
+        taken = ChainMap(batch, _view["pos"])
+        with_ids = []
+        for c in cards:
+            c = _with_id(c, taken)
+            batch[c["id"]] = 1
+            with_ids.append(c)
+        cards = with_ids
+        _append_ops([{"op": "add", "card": c} for c in cards])
+    return cards
 
-# ----- Publik funktion: lägg till kort -----
+# ----- Publika funktioner: lägg till / hämta / ändra / ta bort kort -----
 
 
-def add_card(question: str, answer: str, tags: Optional[List[str]] = None) -> Dict:
+@in_workspace
+def add_card(question: str, answer: str, tags: Optional[List[str]] = None,
+             check_similar: bool = False) -> Dict:
     """
-    Lägg till ett nytt kort.
+    Lägg till ett nytt kort (en append i journalen).
 
     Args:
         question (str): frågetext
         answer (str): korrekt svar
         tags (list[str], optional): kategorier (t.ex. ["python","bas"])
+        check_similar (bool): stoppa kortet om ett liknande kort redan finns
+            (MinHash/LSH, se src/dedupe.py)
 
     Returns:
-        dict: kortet som lades till
+        dict: kortet som lades till (med id)
+
+    Raises:
+        ValueError: om fråga/svar saknas eller ett liknande kort finns
     """
     q = (question or "").strip()
     a = (answer or "").strip()
     if not q or not a:
         raise ValueError("Både fråga och svar måste ha innehåll.")
+    if check_similar:
+        from src.dedupe import find_similar  # undvik cirkulär import
+        similar = find_similar(q, a)
+        if similar:
+            raise ValueError(f"Liknande kort finns redan: [{similar[0]['id']}] {similar[0]['q']}")
     card = {"q": q, "a": a, "tags": tags or []}
-    cards = _load_cards()
-    cards.append(card)
-    _save_cards(cards)
+    return _store_new_cards([card])[0]
+
+
+@in_workspace
+def add_cards(new_cards: List[Dict]) -> List[Dict]:
+    """
+    Lägg till flera kort på en gång med en enda skrivning.
+
+    Används av batch-flöden (t.ex. generatorn) där add_card per kort
+    annars skulle ge en skrivning per kort.
+
+    Args:
+        new_cards (list[dict]): kort med nycklarna "q", "a" och valfritt "tags"
+
+    Returns:
+        list[dict]: korten som lades till (trimmade, med id)
+
+    Raises:
+        ValueError: om något kort saknar fråga eller svar
+    """
+    clean: List[Dict] = []
+    for c in new_cards:
+        q = (c.get("q") or "").strip()
+        a = (c.get("a") or "").strip()
+        if not q or not a:
+            raise ValueError("Både fråga och svar måste ha innehåll.")
+        clean.append({"q": q, "a": a, "tags": c.get("tags") or []})
+    return _store_new_cards(clean)
+
+
+@in_workspace
+def get_card(card_id: str) -> Optional[Dict]:
+    """
+    Hämta ett kort via id (O(1) uppslag i id-indexet).
+
+    Args:
+        card_id (str): kortets id
+
+    Returns:
+        dict | None: kortet, eller None om det inte finns
+    """
+    if use_sqlite():
+        return sqlite_store.get_card(card_id)
+    _refresh_view()
+    i = _view["pos"].get(card_id)
+    return dict(_view["cards"][i]) if i is not None else None
+
+
+@in_workspace
+def filter_cards(expr: str) -> List[Dict]:
+    """
+    Kort som matchar ett tagguttryck, t.ex. "sql AND NOT auto".
+
+    Urvalet räknas ut med bitoperationer på bitmängder per tagg (se
+    src/tagfilter.py). Bitmängderna byggs vid första anropet och hålls
+    sedan uppdaterade när kort läggs till, ändras eller tas bort.
+
+    Args:
+        expr (str): tagguttryck (AND, OR, NOT, parenteser). Tomt = alla kort
+
+    Returns:
+        list[dict]: matchande kort
+
+    Raises:
+        ValueError: om uttrycket inte går att tolka
+    """
+    if use_sqlite():
+        cards = sqlite_store.load_cards()
+        index = TagIndex(cards)
+    else:
+        _refresh_view()
+        cards = _view["cards"]
+        if _view["tags"] is None:
+            _view["tags"] = TagIndex(cards)
+        index = _view["tags"]
+    return [cards[i] for i in index.positions(index.select(expr))]
+
+
+@in_workspace
+def update_card(card_id: str, question: Optional[str] = None, answer: Optional[str] = None,
+                tags: Optional[List[str]] = None) -> Dict:
+    """
+    Ändra ett befintligt kort (en edit-rad i journalen). Id:t behålls.
+
+    Args:
+        card_id (str): kortets id
+        question (str, optional): ny frågetext
+        answer (str, optional): nytt svar
+        tags (list[str], optional): nya taggar
+
+    Returns:
+        dict: det uppdaterade kortet
+
+    Raises:
+        KeyError: om kortet inte finns
+    """
+    card = get_card(card_id)
+    if card is None:
+        raise KeyError(f"Kort {card_id} finns inte.")
+    if question is not None and question.strip():
+        card["q"] = question.strip()
+    if answer is not None and answer.strip():
+        card["a"] = answer.strip()
+    if tags is not None:
+        card["tags"] = tags
+    if use_sqlite():
+        sqlite_store.update_card(card)
+    else:
+        _append_ops([{"op": "edit", "id": card_id, "card": card}])
+    _notify_indexes(added=[card])
+    return card
+
+
+@in_workspace
+def delete_card(card_id: str) -> Dict:
+    """
+    Ta bort ett kort (en delete-rad i journalen).
+
+    Args:
+        card_id (str): kortets id
+
+    Returns:
+        dict: kortet som togs bort
+
+    Raises:
+        KeyError: om kortet inte finns
+    """
+    card = get_card(card_id)
+    if card is None:
+        raise KeyError(f"Kort {card_id} finns inte.")
+    if use_sqlite():
+        sqlite_store.delete_card(card_id)
+    else:
+        _append_ops([{"op": "delete", "id": card_id}])
+    _notify_indexes(removed=[card_id])
     return card
 
 # ----- Hjälpare för quiz -----
@@ -81,22 +639,273 @@ def _normalize(s: str) -> str:
     return " ".join((s or "").strip().lower().split())
 
 
+def card_key(card: Dict) -> str:
+    """
+    Stabil nyckel för ett kort: kortets id, annars hash av fråga och svar.
+
+    Används för att koppla t.ex. schemaläggning och resultat till kort utan
+    att bero på kortets position i listan. Id:t för ett kort som fått id
+    vid migreringen är samma hash, så äldre nycklar fortsätter att gälla.
+
+    Args:
+        card (dict): kort med "id" eller "q" och "a"
+
+    Returns:
+        str: 16 hex-tecken
+    """
+    return card.get("id") or _new_id(card, ())
+
+
+def _csv_bytes(rows) -> bytes:
+    # Formatera CSV-rader i minnet så att de kan skrivas med en enda write()
+    buf = io.StringIO(newline="")
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
 def _ensure_results_header():
-    # Skapa mapp/fil och skriv header om results.csv inte finns
+    # Skapa mapp/fil och skriv header om results.csv inte finns.
+    # Filen skapas färdig med header (temporär fil + os.link, som misslyckas
+    # om filen redan finns), så samtidiga processer aldrig ser en tom fil.
+    if RESULTS_CSV.exists():
+        return
     RESULTS_CSV.parent.mkdir(parents=True, exist_ok=True)
-    if not RESULTS_CSV.exists():
-        with RESULTS_CSV.open("w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["timestamp", "question",
-                       "expected", "given", "correct"])
+    tmp = RESULTS_CSV.with_name(f".{RESULTS_CSV.name}.{os.getpid()}.{random.getrandbits(32):08x}.tmp")
+    tmp.write_bytes(_csv_bytes([["timestamp", "question",
+                                 "expected", "given", "correct", "card_id"]]))
+    try:
+        os.link(tmp, RESULTS_CSV)
+    except FileExistsError:
+        pass  # en annan process hann före
+    finally:
+        tmp.unlink()
+
+
+def _pick_card(tags: Optional[str] = None) -> Optional[Dict]:
+    # Slumpa ett kort; sqlite slår upp via primärnyckeln i stället för att läsa allt
+    if tags:
+        cards = filter_cards(tags)
+        return random.choice(cards) if cards else None
+    if use_sqlite():
+        return sqlite_store.random_card()
+    cards = _load_cards()
+    return random.choice(cards) if cards else None
+
+
+def _card_tags(card_ids) -> Dict[str, List[str]]:
+    # Taggar per kort-id, för aktivitetsräknarna (uppslag, ingen genomläsning)
+    ids = {cid for cid in card_ids if cid}
+    if not ids:
+        return {}
+    if use_sqlite():
+        cards = (sqlite_store.get_card(cid) for cid in ids)
+        return {c["id"]: c.get("tags") or [] for c in cards if c}
+    _refresh_view()
+    pos, cards = _view["pos"], _view["cards"]
+    return {cid: cards[pos[cid]].get("tags") or [] for cid in ids if cid in pos}
+
+
+def _record_activity(rows: List[Dict]) -> None:
+    tags = _card_tags(r.get("card_id") for r in rows)
+    activity.record_answers(
+        (r["timestamp"], _is_correct(r["correct"]), tags.get(r.get("card_id"), []))
+        for r in rows)
+
+
+def _log_results(rows: List[Dict]) -> None:
+    """
+    Spara quiz-resultat i aktiv backend med en enda skrivning.
+
+    Args:
+        rows (list[dict]): timestamp, question, expected, given, correct ("1"/"0")
+            och card_id
+    """
+    if not rows:
+        return
+    _record_activity(rows)
+    if use_sqlite():
+        sqlite_store.log_results(rows)
+        return
+    _ensure_results_header()
+    # Låsfritt: en O_APPEND-skrivning per batch, så rader från olika
+    # processer aldrig blandas ihop
+    append_bytes(RESULTS_CSV, _csv_bytes(
+        [r["timestamp"], r["question"], r["expected"],
+         r["given"], r["correct"], r.get("card_id") or ""] for r in rows))
+    # Håll dag-indexet för tidsintervall-statistik i takt med loggen
+    update_day_index()
+
+# ----- Quiz-session -----
+
+
+class QuizSession:
+    """
+    En quiz-omgång som läser in leken en gång.
+
+    - Korten laddas och svaren normaliseras en gång när sessionen skapas.
+    - Korten dras utan återläggning, så ingen fråga upprepas innan hela
+      leken har gåtts igenom.
+    - Resultaten buffras och skrivs när sessionen avslutas eller efter
+      flush_every svar.
+    - Med spaced=True väljs korten av SM-2-schemaläggaren (src/scheduler.py)
+      i stället för slumpmässigt: det kort som förfallit först kommer först.
+
+    Exempel:
+        with QuizSession() as s:
+            for _ in range(10):
+                s.ask()
+    """
+
+    def __init__(self, cards: Optional[List[Dict]] = None, flush_every: int = 20,
+                 spaced: bool = False, tags: Optional[str] = None,
+                 workspace=None):
+        """
+        Args:
+            cards (list[dict], optional): kort att quiza på. Standard: hela leken
+            flush_every (int): antal svar mellan skrivningar till resultatloggen
+            spaced (bool): välj kort med spaced repetition (SM-2)
+            tags (str, optional): tagguttryck, t.ex. "sql AND NOT auto"
+                (används när cards inte anges)
+            workspace (Workspace, optional): arbetsyta att läsa och logga i.
+                Standard: den som är aktiv vid varje anrop
+        """
+        self.workspace = workspace
+        with self._active():
+            if cards is None:
+                cards = filter_cards(tags) if tags else _load_cards()
+        self.cards = cards
+        self.expected = [_normalize(c.get("a", "")) for c in self.cards]
+        self.flush_every = max(1, flush_every)
+        self.asked = 0
+        self.correct = 0
+        self._buffer: List[Dict] = []
+        # Gles Fisher–Yates: bara flyttade positioner sparas, så varje drag är O(1)
+        self._swapped: Dict[int, int] = {}
+        self._drawn = 0
+        self._current: Optional[int] = None
+        self.scheduler = None
+        if spaced:
+            from src.scheduler import Scheduler  # undvik cirkulär import
+            with self._active():
+                self.scheduler = Scheduler(self.cards)
+            self._index = {card_key(c): i for i, c in reversed(list(enumerate(self.cards)))}
+
+    def __enter__(self) -> "QuizSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _active(self):
+        # Sessionens arbetsyta, eller ingen växling alls
+        return self.workspace if self.workspace is not None else nullcontext()
+
+    def _draw(self) -> int:
+        # Dra nästa index utan återläggning; börja om när leken är slut
+        n = len(self.cards)
+        if self._drawn >= n:
+            self._swapped.clear()
+            self._drawn = 0
+        i = self._drawn
+        j = random.randrange(i, n)
+        picked = self._swapped.get(j, j)
+        self._swapped[j] = self._swapped.get(i, i)
+        self._drawn += 1
+        return picked
+
+    def next_card(self) -> Optional[Dict]:
+        """
+        Dra nästa kort i sessionen.
+
+        Returns:
+            dict | None: kortet, eller None om leken är tom
+        """
+        if not self.cards:
+            return None
+        if self.scheduler is not None:
+            self._current = self._index[card_key(self.scheduler.next_card())]
+        else:
+            self._current = self._draw()
+        return self.cards[self._current]
+
+    def answer(self, given: str) -> bool:
+        """
+        Rätta ett svar på senast dragna kort och buffra resultatet.
+
+        Args:
+            given (str): användarens svar
+
+        Returns:
+            bool: True om svaret var rätt
+        """
+        idx = self._current
+        if idx is None:
+            raise ValueError("Dra ett kort med next_card() innan du svarar.")
+        card = self.cards[idx]
+        correct = _normalize(given) == self.expected[idx]
+        self.asked += 1
+        self.correct += int(correct)
+        if self.scheduler is not None:
+            self.scheduler.review(card, correct=correct)
+        self._buffer.append({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "question": card["q"],
+            "expected": card["a"],
+            "given": given,
+            "correct": "1" if correct else "0",
+            "card_id": card.get("id"),
+        })
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+        return correct
+
+    def ask(self) -> bool:
+        """
+        Ställ en fråga i terminalen, ta in svaret och rätta det.
+
+        Returns:
+            bool: True om användaren svarade rätt, False annars
+        """
+        card = self.next_card()
+        if card is None:
+            print("Inga kort ännu. Lägg till med add_card(...).")
+            return False
+
+        print("\nFRÅGA:")
+        print(card["q"])
+        given = input("\nDitt svar: ").strip()
+
+        correct = self.answer(given)
+        if correct:
+            print("Rätt!")
+        else:
+            print(f"Fel. Rätt svar: {card['a']}")
+        return correct
+
+    def flush(self) -> None:
+        """Skriv buffrade resultat till resultatloggen."""
+        rows, self._buffer = self._buffer, []
+        with self._active():
+            _log_results(rows)
+
+    def close(self) -> None:
+        """Avsluta sessionen (skriver kvarvarande resultat)."""
+        self.flush()
 
 # ----- Publik funktion: kör ett quiz -----
 
 
-def quiz_once() -> bool:
+@in_workspace
+def quiz_once(tags: Optional[str] = None) -> bool:
     """
     Ställ en slumpmässig fråga, ta in användarens svar och jämför med facit.
 
+    Tunn wrapper runt QuizSession för bakåtkompatibilitet. För flera frågor
+    i rad, använd QuizSession direkt så att leken bara läses in en gång.
+
+    Args:
+        tags (str, optional): tagguttryck, t.ex. "sql AND NOT auto"
+
     Returns:
         bool: True om användaren svarade rätt, False annars
 
@@ -104,33 +913,10 @@ def quiz_once() -> bool:
         - Loggar frågan, rätt svar, användarens svar och om det var rätt/fel
           till data/results.csv
     """
-    cards = _load_cards()
-    if not cards:
-        print("Inga kort ännu. Lägg till med add_card(...).")
+    card = _pick_card(tags)
+    if card is None:
+        print("Inga kort matchar taggfiltret." if tags else
+              "Inga kort ännu. Lägg till med add_card(...).")
         return False
-
-    card = random.choice(cards)
-
-    print("\nFRÅGA:")
-    print(card["q"])
-    given = input("\nDitt svar: ").strip()
-
-    expected = card["a"]
-    correct = _normalize(given) == _normalize(expected)
-
-    if correct:
-        print("Rätt!")
-    else:
-        print(f"Fel. Rätt svar: {expected}")
-
-    _ensure_results_header()
-    with RESULTS_CSV.open("a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow([
-            datetime.now().isoformat(timespec="seconds"),
-            card["q"],
-            expected,
-            given,
-            "1" if correct else "0",
-        ])
-    return correct
+    with QuizSession(cards=[card], flush_every=1) as session:
+        return session.ask()
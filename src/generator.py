@@ -5,16 +5,35 @@ generator.py – skapa flashcards automatiskt från data/concepts.json.
 För varje begrepp i concepts.json genereras enkla Q/A-kort, t.ex.:
 "Vad är <term> i Python?" -> "<def>"
 
+Källan kan vara en fil, en mapp eller ett glob-mönster (t.ex.
+"kurser/*/begrepp.jsonl"). Filerna får vara JSON-listor eller JSONL (ett
+begrepp per rad). JSON-listor avkodas ett element i taget
+(json.JSONDecoder.raw_decode), så en stor fil behöver inte läsas in hel.
+
+Med flera filer fördelas inläsning och frågebygge på en processpool, en
+fil per uppgift. Resultaten slås sedan ihop i filordning.
+
 Dubbletter undviks genom jämförelse av (fråga, svar) efter normalisering.
-Nya kort läggs till via flashcards.add_card och taggas med ["<lang>", "auto"].
+Nya kort samlas i minnet och läggs till med en enda skrivning via
+flashcards.add_cards. De taggas med ["<lang>", "auto"].
 """
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
 from pathlib import Path
-from typing import List, Dict, Any
-from src.io_utils import read_json
-from src.flashcards import add_card, FLASHCARDS_PATH
+from typing import Iterator, List, Dict, Any, Optional, Tuple
+import json
+import os
+from src.flashcards import add_cards, _load_cards
+from src.workspace import in_workspace
 
 CONCEPTS_PATH = Path("data/concepts.json")
 
+# Filändelser som räknas som begreppsfiler när källan är en mapp
+CONCEPT_SUFFIXES = (".json", ".jsonl")
+
+# Storlek på läsblocken vid stegvis avkodning av en JSON-lista
+_READ_CHUNK = 1 << 16
+
 
 def _norm(s: str) -> str:
     """
@@ -29,25 +48,17 @@ def _norm(s: str) -> str:
     return " ".join((s or "").strip().lower().split())
 
 
-def _card_exists(q: str, a: str) -> bool:
+def _existing_keys() -> set[tuple[str, str]]:
     """
-    Kontrollera om ett kort (q, a) redan finns (case/whitespace-okänsligt).
+    Bygg mängden av normaliserade (fråga, svar)-nycklar för alla befintliga kort.
 
-    Args:
-        q (str): frågetext
-        a (str): svarstext
+    Läses en gång per generering så att dubblettkollen blir O(1) per kandidat
+    i stället för att läsa om hela flashcards.json för varje begrepp.
 
     Returns:
-        bool: True om kortet finns, annars False
+        set[tuple[str, str]]: {(norm(q), norm(a)), ...}
     """
-    cards = read_json(FLASHCARDS_PATH, default=[])
-    if not isinstance(cards, list):
-        return False
-    nq, na = _norm(q), _norm(a)
-    for c in cards:
-        if _norm(c.get("q", "")) == nq and _norm(c.get("a", "")) == na:
-            return True
-    return False
+    return {(_norm(c.get("q", "")), _norm(c.get("a", ""))) for c in _load_cards()}
 
 
 def _build_question(term: str, lang: str) -> str:
@@ -70,27 +81,117 @@ def _build_question(term: str, lang: str) -> str:
     return ""
 
 
-def generate_questions(concepts_path: Path = CONCEPTS_PATH, per_term: int = 1) -> int:
+def concept_files(source) -> List[Path]:
     """
-    Generera frågor från concepts.json och lägg dem i flashcards.
+    Lista begreppsfilerna för en källa.
 
     Args:
-        concepts_path (Path): sökväg till concepts.json
-        per_term (int): antal frågor per begrepp (1–2 rekommenderas)
+        source (str | Path): fil, mapp (alla .json/.jsonl, rekursivt) eller glob-mönster
 
     Returns:
-        int: antal NYA kort som lades till (dubbletter räknas ej)
+        list[Path]: filerna i sorterad ordning (tom om inget matchar)
+    """
+    p = Path(source)
+    if p.is_dir():
+        return sorted(f for f in p.rglob("*") if f.suffix.lower() in CONCEPT_SUFFIXES and f.is_file())
+    if p.is_file():
+        return [p]
+    return sorted(Path(f) for f in glob(str(source), recursive=True) if Path(f).is_file())
+
+
+def iter_concepts(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Läs begrepp ur en fil, ett i taget.
+
+    JSONL läses rad för rad. En JSON-lista läses i block och avkodas
+    element för element med raw_decode, så minnet begränsas till ett
+    block plus det element som avkodas.
+
+    Args:
+        path (Path): .json (lista av objekt) eller .jsonl
+
+    Yields:
+        dict: ett begrepp
+
+    Raises:
+        ValueError: om en .json-fil inte innehåller en lista
+    """
+    with open(path, encoding="utf-8-sig") as f:
+        if path.suffix.lower() == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buf, i, eof = "", 0, False
+
+        def fill() -> bool:
+            # Släng det som redan avkodats och läs nästa block
+            nonlocal buf, i, eof
+            chunk = f.read(_READ_CHUNK)
+            buf, i = buf[i:] + chunk, 0
+            eof = not chunk
+            return not eof
+
+        def skip_ws() -> str:
+            # Nästa tecken som inte är blanktecken ("" vid filslut)
+            nonlocal i
+            while True:
+                while i < len(buf) and buf[i].isspace():
+                    i += 1
+                if i < len(buf) or not fill():
+                    return buf[i] if i < len(buf) else ""
+
+        if skip_ws() != "[":
+            raise ValueError(f"{path.name} måste vara en lista av objekt.")
+        i += 1
+        if skip_ws() == "]":
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, i)
+            except json.JSONDecodeError:
+                # Elementet kan fortsätta i nästa block
+                if fill():
+                    continue
+                raise
+            # Ett tal i slutet av blocket kan vara avklippt – läs mer och försök igen
+            if end == len(buf) and not eof and fill():
+                continue
+            i = end
+            yield item
+            sep = skip_ws()
+            i += 1
+            if sep == "]":
+                return
+            if sep != ",":
+                raise ValueError(f"{path.name}: ogiltig JSON efter element (väntade ',' eller ']').")
+            skip_ws()
+
+
+def _cards_from_concepts(concepts, per_term: int) -> List[Tuple[Tuple[str, str], Dict[str, Any]]]:
     """
-    data = read_json(concepts_path, default=[])
-    if not isinstance(data, list):
-        raise ValueError("concepts.json måste vara en lista av objekt.")
+    Bygg kort (med normaliserad nyckel) från begrepp.
 
-    added = 0
-    for item in data:
+    Args:
+        concepts (Iterable[dict]): begrepp med term, lang, def, hint
+        per_term (int): antal frågor per begrepp
+
+    Returns:
+        list[tuple]: [((norm(q), norm(a)), kort), ...]
+    """
+    out = []
+
+    def _emit(q: str, a: str, tags: List[str]) -> None:
+        out.append(((_norm(q), _norm(a)), {"q": q, "a": a, "tags": tags}))
+
+    for item in concepts:
+        if not isinstance(item, dict):
+            continue
         term = (item.get("term") or "").strip()
         lang = (item.get("lang") or "").strip()
         definition = (item.get("def") or "").strip()
-        hint = (item.get("hint") or "").strip()
 
         if not term or not definition:
             continue
@@ -98,16 +199,64 @@ def generate_questions(concepts_path: Path = CONCEPTS_PATH, per_term: int = 1) -
         # Fråga 1: "Vad är <term> i Python?"
         q1 = _build_question(term, lang)
         a1 = definition  # håll kort för exakt rättning
-        if q1 and not _card_exists(q1, a1):
-            add_card(q1, a1, tags=[lang or "okänd", "auto"])
-            added += 1
+        if q1:
+            _emit(q1, a1, [lang or "okänd", "auto"])
 
         # Valfri extra-variant (per_term > 1): en neutral formulering
         if per_term > 1:
-            q2 = f"Beskriv {term} kort"
-            a2 = definition
-            if not _card_exists(q2, a2):
-                add_card(q2, a2, tags=[lang or "okänd", "auto"])
-                added += 1
+            _emit(f"Beskriv {term} kort", definition, [lang or "okänd", "auto"])
+    return out
+
+
+def _cards_from_file(args: Tuple[Path, int]) -> List[Tuple[Tuple[str, str], Dict[str, Any]]]:
+    # En uppgift i processpoolen: läs en fil och bygg dess kort
+    path, per_term = args
+    return _cards_from_concepts(iter_concepts(path), per_term)
+
+
+@in_workspace
+def generate_questions(concepts_path=CONCEPTS_PATH, per_term: int = 1,
+                       workers: Optional[int] = None) -> int:
+    """
+    Generera frågor från begreppsfiler och lägg dem i flashcards.
+
+    Args:
+        concepts_path (str | Path): fil, mapp eller glob-mönster med
+            begreppsfiler (JSON-listor eller JSONL)
+        per_term (int): antal frågor per begrepp (1–2 rekommenderas)
+        workers (int, optional): antal processer när det finns flera filer.
+            Standard: antal kärnor. 1 = allt i den här processen
+
+    Returns:
+        int: antal NYA kort som lades till (dubbletter räknas ej)
+
+    Raises:
+        ValueError: om en .json-fil inte innehåller en lista
+    """
+    files = concept_files(concepts_path)
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    tasks = [(f, per_term) for f in files]
+
+    seen = _existing_keys()
+    new_cards: List[Dict[str, Any]] = []
+
+    def _merge(built) -> None:
+        # Lägg bara till om (q, a) inte redan finns – varken i leken eller i batchen
+        for key, card in built:
+            if key in seen:
+                continue
+            seen.add(key)
+            new_cards.append(card)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() ger resultaten i filordning, så utfallet är deterministiskt
+            for built in pool.map(_cards_from_file, tasks):
+                _merge(built)
+    else:
+        for task in tasks:
+            _merge(_cards_from_file(task))
 
-    return added
+    # En enda skrivning för hela batchen
+    add_cards(new_cards)
+    return len(new_cards)
@@ -0,0 +1,242 @@
+"""
+importer.py – massimport av kort från CSV, TSV (Anki-export) och JSONL.
+
+Filen läses som en ström, rad för rad, så även mycket stora filer (miljontals
+rader) går att importera utan att läsas in hela i minnet:
+
+- CSV/TSV: kolumnerna fråga, svar och valfritt taggar (separerade med
+  mellanslag). En rubrikrad (t.ex. "q,a,tags" eller "question,answer") hoppas
+  över. Anki-exportens rader som börjar med "#" (t.ex. "#separator:tab",
+  "#html:true", "#tags column:3") läses som inställningar.
+- JSONL: ett objekt per rad med "q"/"a" (eller "question"/"answer",
+  "front"/"back") och valfritt "tags" (lista eller sträng).
+
+Varje rad normaliseras och jämförs med leken och tidigare rader i filen
+(normaliserad fråga + svar). Nya kort samlas i batchar om CHUNK och sparas
+med flashcards.add_cards – en journalskrivning (eller en sqlite-transaktion)
+per batch. Efter varje batch rapporteras framsteg och hastighet.
+
+Användning:
+    python -m src.importer kort.tsv [taggar ...]
+"""
+from __future__ import annotations
+from html import unescape
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+import csv
+import json
+import re
+import sys
+import time
+
+from src.flashcards import _invalidate_indexes, _load_cards, _normalize, add_cards, deferred_compaction
+from src.workspace import in_workspace
+
+# Antal nya kort per skrivning
+CHUNK = 10_000
+
+FORMATS = ("csv", "tsv", "jsonl")
+_SUFFIX_FORMATS = {".csv": "csv", ".tsv": "tsv", ".txt": "tsv",
+                   ".jsonl": "jsonl", ".ndjson": "jsonl"}
+_SEPARATORS = {"tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|",
+               "space": " ", "colon": ":"}
+_HEADER_WORDS = {"q", "a", "question", "answer", "fråga", "svar", "front", "back", "tags", "taggar"}
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def _key(q: str, a: str) -> int:
+    # Hash av den normaliserade nyckeln i stället för strängarna själva:
+    # ett int per kort håller mängden liten även för miljontals kort.
+    # hash() varierar mellan processer, men mängden lever bara under importen.
+    return hash((_normalize(q), _normalize(a)))
+
+
+def _split_tags(raw) -> Optional[List[str]]:
+    # None betyder att fältet har fel typ (t.ex. "tags": 5) – raden hoppas över
+    if isinstance(raw, list):
+        return [str(t).strip() for t in raw if str(t).strip()]
+    if raw is None or isinstance(raw, str):
+        return (raw or "").split()
+    return None
+
+
+def _detect_format(path: Path) -> str:
+    fmt = _SUFFIX_FORMATS.get(path.suffix.lower())
+    if fmt is None:
+        raise ValueError(f"Okänt filformat '{path.suffix}'. Välj en av: {', '.join(FORMATS)}.")
+    return fmt
+
+
+def _read_delimited(f, delimiter: str) -> Iterator[Dict]:
+    """
+    Läs kort ur en CSV/TSV-fil, rad för rad.
+
+    Args:
+        f: öppen textfil (newline="")
+        delimiter (str): kolumnavgränsare (kan ändras av "#separator:")
+
+    Yields:
+        dict: {"q", "a", "tags"}; None för rader som inte går att tolka
+    """
+    html = False
+    tags_col = 2
+    # Inställningsrader (Anki) ligger först i filen
+    line = f.readline()
+    while line.startswith("#"):
+        name, _, value = line[1:].strip().partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "separator":
+            delimiter = _SEPARATORS.get(value, value[:1] or delimiter)
+        elif name == "html":
+            html = value == "true"
+        elif name == "tags column" and value.isdigit():
+            tags_col = int(value) - 1
+        line = f.readline()
+
+    first = True
+    rows = csv.reader(chain([line], f), delimiter=delimiter)
+    while True:
+        # En trasig rad (t.ex. ett fält över csv.field_size_limit()) räknas som
+        # ogiltig; läsaren fortsätter sedan med nästa rad i stället för att
+        # avbryta importen halvvägs
+        try:
+            row = next(rows)
+        except StopIteration:
+            break
+        except csv.Error:
+            yield None
+            continue
+        if first:
+            first = False
+            if row and {c.strip().lower() for c in row if c.strip()} <= _HEADER_WORDS:
+                continue
+        if len(row) < 2:
+            yield None
+            continue
+        q, a = row[0], row[1]
+        if html:
+            q, a = unescape(_HTML_TAG.sub(" ", q)), unescape(_HTML_TAG.sub(" ", a))
+        tags = row[tags_col] if tags_col < len(row) else ""
+        yield {"q": q, "a": a, "tags": _split_tags(tags)}
+
+
+def _read_jsonl(f) -> Iterator[Dict]:
+    """
+    Läs kort ur en JSONL-fil, rad för rad.
+
+    Args:
+        f: öppen textfil
+
+    Yields:
+        dict: {"q", "a", "tags"}; None för rader som inte går att tolka
+    """
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            yield None
+            continue
+        if not isinstance(obj, dict):
+            yield None
+            continue
+        q = obj.get("q") or obj.get("question") or obj.get("front") or ""
+        a = obj.get("a") or obj.get("answer") or obj.get("back") or ""
+        tags = _split_tags(obj.get("tags"))
+        # Fråga och svar ska vara text (eller tal); listor, objekt o.d. är ogiltiga
+        if tags is None or not isinstance(q, (str, int, float)) or not isinstance(a, (str, int, float)):
+            yield None
+            continue
+        yield {"q": str(q), "a": str(a), "tags": tags}
+
+
+def _print_progress(summary: Dict) -> None:
+    print(f"  {summary['rows']:>10,} rader | {summary['added']:>10,} nya | "
+          f"{summary['rows'] / max(summary['seconds'], 1e-9):>9,.0f} rader/s".replace(",", " "))
+
+
+@in_workspace
+def import_cards(path, fmt: Optional[str] = None, tags: Optional[List[str]] = None,
+                 chunk: int = CHUNK,
+                 progress: Optional[Callable[[Dict], None]] = _print_progress) -> Dict:
+    """
+    Importera kort från en CSV-, TSV- eller JSONL-fil.
+
+    Args:
+        path (str | Path): filen som ska importeras
+        fmt (str, optional): "csv", "tsv" eller "jsonl". Standard: från filändelsen
+            (.txt räknas som TSV, som Ankis export)
+        tags (list[str], optional): taggar som läggs till på alla importerade kort
+        chunk (int): antal nya kort per skrivning
+        progress (callable, optional): anropas med sammanställningen efter
+            varje batch. None = tyst
+
+    Returns:
+        dict: {"rows", "added", "duplicates", "skipped", "seconds"}. Rader som
+        inte går att tolka (fel typ, för stora fält, saknad fråga/svar) räknas
+        som "skipped"
+
+    Raises:
+        ValueError: om formatet är okänt
+    """
+    path = Path(path)
+    fmt = (fmt or _detect_format(path)).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Okänt filformat '{fmt}'. Välj en av: {', '.join(FORMATS)}.")
+    extra = [t for t in (tags or []) if t]
+
+    # Nycklar för leken + allt som redan lästs ur filen
+    seen = {_key(c.get("q", ""), c.get("a", "")) for c in _load_cards()}
+    # Sökindex och dubblettindex byggs om en gång efteråt i stället för kort för kort
+    _invalidate_indexes()
+
+    summary = {"rows": 0, "added": 0, "duplicates": 0, "skipped": 0, "seconds": 0.0}
+    start = time.perf_counter()
+    batch: List[Dict] = []
+
+    def commit() -> None:
+        add_cards(batch)
+        summary["added"] += len(batch)
+        summary["seconds"] = time.perf_counter() - start
+        batch.clear()
+        if progress is not None:
+            progress(summary)
+
+    # Snapshoten skrivs om (högst) en gång, när importen är klar
+    with deferred_compaction(), path.open(encoding="utf-8-sig", newline="") as f:
+        reader = _read_jsonl(f) if fmt == "jsonl" else _read_delimited(f, "," if fmt == "csv" else "\t")
+        for card in reader:
+            summary["rows"] += 1
+            if card is None:
+                summary["skipped"] += 1
+                continue
+            q, a = " ".join(card["q"].split()), " ".join(card["a"].split())
+            if not q or not a:
+                summary["skipped"] += 1
+                continue
+            key = _key(q, a)
+            if key in seen:
+                summary["duplicates"] += 1
+                continue
+            seen.add(key)
+            card_tags = card["tags"] + [t for t in extra if t not in card["tags"]]
+            batch.append({"q": q, "a": a, "tags": card_tags})
+            if len(batch) >= chunk:
+                commit()
+        if batch:
+            commit()
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Användning: python -m src.importer fil.csv|fil.tsv|fil.jsonl [taggar ...]")
+        raise SystemExit(1)
+    result = import_cards(sys.argv[1], tags=sys.argv[2:])
+    print(f"Klart: {result['added']} nya kort, {result['duplicates']} dubbletter, "
+          f"{result['skipped']} ogiltiga rader av {result['rows']} "
+          f"({result['seconds']:.1f} s).")
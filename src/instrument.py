@@ -0,0 +1,214 @@
+"""
+instrument.py – valfri mätning av tid och I/O under en session.
+
+Avstängd som standard och kostar då ingenting: inga funktioner byts ut.
+Slå på med miljövariabeln STUDIE_PROFILE eller flaggan --profile till menyn:
+
+    STUDIE_PROFILE=1 python menu.py              # sammanfattning vid avslut
+    STUDIE_PROFILE=profil.json python menu.py    # spara som JSON i stället
+    python menu.py --profile [profil.json]
+
+enable() lindar in de publika funktionerna i flashcards, plan, stats,
+generator och io_utils med en timer. Per funktion räknas anrop, total tid,
+max och ett histogram över tiden (tvåpotens-hinkar i mikrosekunder).
+Tiden är inklusive anrop till andra inlindade funktioner.
+
+io_utils rapporterar dessutom via en krok (io_utils._probe) hur många
+JSON-filer som parsas och hur många bytes som läses, skrivs om och läggs
+till (append).
+"""
+from __future__ import annotations
+from functools import wraps
+from typing import Dict, List, Optional
+import importlib
+import inspect
+import json
+import os
+import sys
+import time
+
+PROFILE_ENV = "STUDIE_PROFILE"
+MODULES = ("src.flashcards", "src.plan", "src.stats", "src.generator", "src.io_utils")
+# Rekursiva hjälpare som anropas per element – en timer där skulle dominera
+SKIP = {"io_utils.thaw"}
+
+# Funktion → {"calls", "total", "max", "hist"}; hist[i] = antal anrop med
+# tid (µs) i [2^(i-1), 2^i)
+_stats: Dict[str, Dict] = {}
+# Händelse från io_utils._probe → {"count", "bytes"}
+_io: Dict[str, Dict[str, int]] = {}
+# Originalfunktioner, för disable()
+_originals: Dict[str, tuple] = {}
+_state = {"enabled": False, "since": None}
+
+
+def _timed(name: str, fn):
+    entry = _stats.setdefault(name, {"calls": 0, "total": 0.0, "max": 0.0, "hist": []})
+    hist = entry["hist"]
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            entry["calls"] += 1
+            entry["total"] += elapsed
+            if elapsed > entry["max"]:
+                entry["max"] = elapsed
+            bucket = int(elapsed * 1e6).bit_length()
+            if bucket >= len(hist):
+                hist.extend([0] * (bucket + 1 - len(hist)))
+            hist[bucket] += 1
+
+    return wrapper
+
+
+def _record_io(kind: str, nbytes: int) -> None:
+    entry = _io.get(kind)
+    if entry is None:
+        entry = _io[kind] = {"count": 0, "bytes": 0}
+    entry["count"] += 1
+    entry["bytes"] += nbytes
+
+
+def enable() -> None:
+    """
+    Slå på mätningen: linda in publika funktioner och koppla in I/O-kroken.
+
+    Även referenser som andra moduler redan importerat (from x import f)
+    byts ut, så enable() kan anropas efter att menyn importerats.
+    """
+    if _state["enabled"]:
+        return
+    replaced: Dict[int, object] = {}
+    for modname in MODULES:
+        mod = importlib.import_module(modname)
+        short = modname.rsplit(".", 1)[-1]
+        for name, fn in list(vars(mod).items()):
+            if name.startswith("_") or not inspect.isfunction(fn) or fn.__module__ != modname:
+                continue
+            # @contextmanager-funktioner mäts inte: anropet skapar bara ett
+            # objekt, arbetet sker senare
+            wrapped = getattr(fn, "__wrapped__", None)
+            if f"{short}.{name}" in SKIP or (wrapped is not None and inspect.isgeneratorfunction(wrapped)):
+                continue
+            wrapper = _timed(f"{short}.{name}", fn)
+            _originals[f"{modname}.{name}"] = (mod, name, fn)
+            setattr(mod, name, wrapper)
+            replaced[id(fn)] = wrapper
+    # Byt även ut redan importerade referenser i övriga moduler (t.ex. menu)
+    for mod in list(sys.modules.values()):
+        name = getattr(mod, "__name__", "")
+        if not (name == "__main__" or name == "menu" or name.startswith("src.")):
+            continue
+        for attr, value in list(vars(mod).items()):
+            wrapper = replaced.get(id(value))
+            if wrapper is not None and wrapper is not value:
+                _originals[f"{name}.{attr}"] = (mod, attr, value)
+                setattr(mod, attr, wrapper)
+    from src import io_utils  # undvik cirkulär import
+    io_utils._probe = _record_io
+    _state.update(enabled=True, since=time.perf_counter())
+
+
+def disable() -> None:
+    """Slå av mätningen och återställ originalfunktionerna (statistiken sparas)."""
+    for mod, name, fn in _originals.values():
+        setattr(mod, name, fn)
+    _originals.clear()
+    from src import io_utils  # undvik cirkulär import
+    io_utils._probe = None
+    _state["enabled"] = False
+
+
+def is_enabled() -> bool:
+    """True om mätningen är påslagen."""
+    return _state["enabled"]
+
+
+def _hist_percentile(hist: List[int], calls: int, p: float) -> float:
+    # Övre gränsen (ms) för hinken där p procent av anropen har passerats
+    need = p / 100 * calls
+    seen = 0
+    for bucket, count in enumerate(hist):
+        seen += count
+        if seen >= need:
+            return (1 << bucket) / 1000
+    return (1 << len(hist)) / 1000
+
+
+def report() -> Dict:
+    """
+    Sammanställ mätningarna.
+
+    Returns:
+        dict: {"wall_s", "functions": {namn: {...}}, "io": {händelse: {...}}}
+    """
+    functions = {}
+    for name, e in _stats.items():
+        if not e["calls"]:
+            continue
+        functions[name] = {
+            "calls": e["calls"],
+            "total_ms": e["total"] * 1000,
+            "mean_ms": e["total"] * 1000 / e["calls"],
+            "p50_ms": _hist_percentile(e["hist"], e["calls"], 50),
+            "p99_ms": _hist_percentile(e["hist"], e["calls"], 99),
+            "max_ms": e["max"] * 1000,
+            "hist_us": {f"<{1 << i}": n for i, n in enumerate(e["hist"]) if n},
+        }
+    since = _state["since"]
+    return {
+        "wall_s": time.perf_counter() - since if since is not None else 0.0,
+        "functions": dict(sorted(functions.items(), key=lambda kv: -kv[1]["total_ms"])),
+        "io": {k: dict(v) for k, v in sorted(_io.items())},
+    }
+
+
+def print_report(data: Optional[Dict] = None) -> None:
+    """Skriv ut sammanfattningen som en tabell."""
+    data = data or report()
+    print(f"\n====== PROFIL ({data['wall_s']:.1f} s) ======")
+    print(f"{'funktion':<32}{'anrop':>8}{'totalt ms':>12}{'medel ms':>10}{'p99 ≤ ms':>10}{'max ms':>10}")
+    for name, f in data["functions"].items():
+        print(f"{name:<32}{f['calls']:>8}{f['total_ms']:>12.1f}{f['mean_ms']:>10.2f}"
+              f"{f['p99_ms']:>10.2f}{f['max_ms']:>10.2f}")
+    labels = {"json_parse": "JSON-parsningar", "json_write": "JSON-skrivningar", "append": "appends"}
+    for kind, e in data["io"].items():
+        print(f"{labels.get(kind, kind)}: {e['count']} st, {e['bytes'] / 1024:.1f} KB")
+
+
+def finish(target: Optional[str] = None) -> None:
+    """
+    Avsluta en mätt session: skriv ut sammanfattningen eller spara den som JSON.
+
+    Args:
+        target (str, optional): sökväg som slutar på .json = spara dit,
+            annars skriv ut. Standard: värdet i STUDIE_PROFILE
+    """
+    if not is_enabled():
+        return
+    target = target if target is not None else os.environ.get(PROFILE_ENV, "")
+    data = report()
+    if target.lower().endswith(".json"):
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"Profil sparad: {target}")
+    else:
+        print_report(data)
+
+
+def enable_from_env() -> bool:
+    """
+    Slå på mätningen om STUDIE_PROFILE är satt (och inte "0").
+
+    Returns:
+        bool: True om mätningen slogs på
+    """
+    value = os.environ.get(PROFILE_ENV, "").strip()
+    if value and value != "0":
+        enable()
+        return True
+    return False
@@ -4,41 +4,607 @@ io_utils.py – hjälpfunktioner för att läsa och skriva JSON-filer.
 Denna modul används i hela projektet för att hantera datafiler
 på ett konsekvent sätt. Den ser till att mappar finns och att
 JSON-data sparas/lästs på ett säkert sätt.
+
+Parsade dokument cachas per process. En cachepost gäller så länge filens
+(sökväg, mtime_ns, storlek) är oförändrad och skrivs om av write_json.
+Cachen rensas i LRU-ordning när den överskrider CACHE_BUDGET bytes.
+Cachade objekt lämnas aldrig ut direkt:
+- read_json() ger en egen kopia som anroparen får ändra i
+- read_json_view() ger en skrivskyddad vy utan kopiering (för läsare)
+
+Skrivningar är atomära: innehållet skrivs till en temporär fil i samma
+mapp, fsyncas och byter sedan plats med målfilen (os.replace). Ett avbrott
+mitt i en skrivning lämnar alltså antingen den gamla eller den nya filen.
+
+Inom group_commit() samlas skrivningar i minnet och skrivs ut tillsammans
+när blocket lämnas (eller när fönstret `window` har gått ut): flera
+write_json mot samma fil blir en fysisk skrivning och en fsync.
+
+Flera processer kan dela samma data/-mapp:
+- file_lock() tar ett rådgivande lås (fcntl.flock) på "<fil>.lock"
+- update_json() gör läs-ändra-skriv av en JSON-fil under låset
+- append_bytes() lägger till rader med en enda O_APPEND-skrivning (låsfritt)
+- replace_bytes() ersätter en icke-JSON-fil (t.ex. en logg) atomärt
 """
-import json
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
 from pathlib import Path
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # t.ex. Windows – låsen blir då no-op
+    fcntl = None
+
+# Max antal bytes (filstorlek) som hålls i cachen
+CACHE_BUDGET = 64 * 1024 * 1024
+
+# nyckel (absolut sökväg) → (mtime_ns, size, parsat objekt)
+_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_cache_bytes = 0
+_counters = {"hits": 0, "misses": 0}
+_lock = threading.Lock()
+
+# Valfri mätkrok, sätts av src/instrument.py: _probe(händelse, antal bytes).
+# None = avstängd (en enda jämförelse per läsning/skrivning).
+_probe = None
+
+# Group commit: absolut sökväg → (Path, data, durable) som väntar på att skrivas
+_pending: "OrderedDict[str, tuple]" = OrderedDict()
+_group = {"depth": 0, "window": None, "since": None}
+_group_lock = threading.RLock()
+
+# Fillås: låsfil → [fd, antal nästlade tagningar]. flock gäller per öppen fil,
+# så samma process får inte öppna låsfilen två gånger (det skulle låsa sig själv).
+_file_locks: dict = {}
+_file_locks_guard = threading.Lock()
+_thread_locks: dict = {}
+
+# ---------------- Skrivskyddade vyer ----------------
+
+
+class ReadOnlyDict(Mapping):
+    """Skrivskyddad vy över ett dict; nästlade listor/dicts blir också vyer."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: dict):
+        self._data = data
+
+    def __getitem__(self, key):
+        return _wrap(self._data[key])
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"ReadOnlyDict({self._data!r})"
 
 
-def write_json(path, data):
+class ReadOnlyList(Sequence):
+    """Skrivskyddad vy över en lista; nästlade listor/dicts blir också vyer."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: list):
+        self._data = data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ReadOnlyList(self._data[index])
+        return _wrap(self._data[index])
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, ReadOnlyList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ReadOnlyList({self._data!r})"
+
+
+def _wrap(obj):
+    if type(obj) is dict:
+        return ReadOnlyDict(obj)
+    if type(obj) is list:
+        return ReadOnlyList(obj)
+    return obj
+
+
+def thaw(obj):
+    """
+    Gör en vanlig, ändringsbar kopia av ett JSON-objekt eller en vy.
+
+    Args:
+        obj (any): dict/list/vy/skalärt värde
+
+    Returns:
+        En djup kopia med vanliga dict och list.
+    """
+    if isinstance(obj, ReadOnlyDict):
+        obj = obj._data
+    elif isinstance(obj, ReadOnlyList):
+        obj = obj._data
+    t = type(obj)
+    if t is dict:
+        return {k: thaw(v) for k, v in obj.items()}
+    if t is list:
+        return [thaw(v) for v in obj]
+    return obj
+
+# ---------------- Cache ----------------
+
+
+def _stat_key(p: Path):
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _cache_put(key: str, mtime_ns: int, size: int, obj) -> None:
+    global _cache_bytes
+    old = _cache.pop(key, None)
+    if old is not None:
+        _cache_bytes -= old[1]
+    if size > CACHE_BUDGET:
+        return
+    _cache[key] = (mtime_ns, size, obj)
+    _cache_bytes += size
+    while _cache_bytes > CACHE_BUDGET and _cache:
+        _, evicted = _cache.popitem(last=False)
+        _cache_bytes -= evicted[1]
+
+
+def _cache_drop(key: str) -> None:
+    # Släpp en post (anropas med _lock)
+    global _cache_bytes
+    old = _cache.pop(key, None)
+    if old is not None:
+        _cache_bytes -= old[1]
+
+
+def _cached(path):
+    """
+    Hämta parsat dokument via cachen (parsar om filen har ändrats).
+
+    Returns:
+        tuple[bool, any]: (finns filen, parsat objekt – delas, får ej ändras)
+    """
+    global _cache_bytes
+    p = Path(path)
+    key = str(p.resolve())
+    pending = _pending.get(key)
+    if pending is not None:
+        # Ej utskriven ännu (group commit) – läsare ska se senaste versionen
+        return True, pending[1]
+    sk = _stat_key(p)
+    with _lock:
+        if sk is None:
+            _cache_drop(key)
+            return False, None
+        entry = _cache.get(key)
+        if entry is not None and entry[:2] == sk:
+            _cache.move_to_end(key)
+            _counters["hits"] += 1
+            return True, entry[2]
+        _counters["misses"] += 1
+    with p.open("r", encoding="utf-8") as f:
+        obj = json.load(f)
+    if _probe is not None:
+        _probe("json_parse", sk[1])
+    with _lock:
+        _cache_put(key, sk[0], sk[1], obj)
+    return True, obj
+
+
+def cache_stats() -> dict:
+    """
+    Räknare för läs-cachen.
+
+    Returns:
+        dict: {"hits", "misses", "entries", "bytes"}
+    """
+    with _lock:
+        return {**_counters, "entries": len(_cache), "bytes": _cache_bytes}
+
+
+def clear_cache() -> None:
+    """Töm läs-cachen och nollställ räknarna."""
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
+        _counters.update(hits=0, misses=0)
+
+# ---------------- Atomära skrivningar ----------------
+
+
+def _fsync_dir(directory: Path) -> None:
+    # Gör själva namnbytet beständigt (stöds inte på alla plattformar)
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _open_temp(p: Path) -> tuple[str, int]:
+    # Unikt namn i samma mapp (os.replace kräver samma filsystem); 0o666 så
+    # att umask gäller som för en vanlig open(), och befintliga rättigheter behålls
+    p.parent.mkdir(parents=True, exist_ok=True)  # säkerställ att mappen finns
+    tmp = str(p.parent / f".{p.name}.{os.getpid()}.{secrets.token_hex(4)}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        if p.exists():
+            os.chmod(tmp, p.stat().st_mode & 0o7777)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp)
+        raise
+    return tmp, fd
+
+
+def _write_temp(p: Path, data, durable: bool) -> str:
+    """
+    Skriv data till en temporär fil bredvid p.
+
+    Returns:
+        str: sökväg till den temporära filen
+    """
+    tmp, fd = _open_temp(p)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            if _probe is not None:
+                _probe("json_write", f.tell())
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return tmp
+
+
+def _commit(items) -> None:
+    """
+    Skriv ut en eller flera filer atomärt.
+
+    Alla temporära filer skrivs och fsyncas först, sedan byts de på plats
+    och varje berörd mapp fsyncas en gång.
+
+    Args:
+        items (Iterable[tuple[Path, any, bool, bool]]): (sökväg, data, durable, cache)
+    """
+    staged = []
+    try:
+        for p, data, durable, cache in items:
+            staged.append((p, _write_temp(p, data, durable), data, durable, cache))
+    except BaseException:
+        for _, tmp, _, _, _ in staged:
+            os.unlink(tmp)
+        raise
+    dirs = set()
+    for p, tmp, data, durable, cache in staged:
+        os.replace(tmp, p)
+        if durable:
+            dirs.add(p.parent)
+        sk = _stat_key(p) if cache else None
+        with _lock:
+            if sk is not None:
+                _cache_put(str(p.resolve()), sk[0], sk[1], thaw(data))
+            else:
+                _cache_drop(str(p.resolve()))
+    for d in dirs:
+        _fsync_dir(d)
+
+
+def flush_pending() -> None:
+    """Skriv ut alla väntande skrivningar från group_commit() direkt."""
+    with _group_lock:
+        items = list(_pending.values())
+        _group["since"] = None
+        if not items:
+            return
+        try:
+            _commit(items)
+        finally:
+            _pending.clear()
+
+
+@contextmanager
+def group_commit(window=None):
+    """
+    Samla write_json-anrop och skriv ut dem tillsammans när blocket lämnas.
+
+    Upprepade skrivningar till samma fil slås ihop till den sista. Läsningar
+    inom blocket ser de väntande värdena. Block kan nästlas; utskriften sker
+    när det yttersta blocket lämnas.
+
+    Exempel:
+        with group_commit():
+            for week, items in goals.items():
+                set_goal(week, items)
+
+    Args:
+        window (float, optional): max sekunder en skrivning får vänta innan
+            den skrivs ut även om blocket inte är klart. Standard: None
+            (vänta tills blocket lämnas)
+    """
+    with _group_lock:
+        _group["depth"] += 1
+        if _group["depth"] == 1:
+            _group["window"] = window
+    try:
+        yield
+    finally:
+        with _group_lock:
+            _group["depth"] -= 1
+            if _group["depth"] == 0:
+                _group["window"] = None
+                flush_pending()
+
+# ---------------- Fillås ----------------
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Exklusivt rådgivande lås för en datafil, delat mellan processer.
+
+    Låset tas på en separat låsfil ("<fil>.lock") så att atomära namnbyten
+    av själva datafilen inte påverkar det. Låset kan tas nästlat i samma
+    tråd. Håll det så kort tid som möjligt: läs och förbered utanför,
+    skriv innanför.
+
+    Exempel:
+        with file_lock("data/plan.json"):
+            ...
+
+    Args:
+        path (str | Path): datafilen som ska skyddas
+    """
+    p = Path(path)
+    lock_path = str(p.parent.resolve() / (p.name + ".lock"))
+    with _file_locks_guard:
+        tlock = _thread_locks.setdefault(lock_path, threading.RLock())
+    with tlock:
+        entry = _file_locks.get(lock_path)
+        if entry is None:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            entry = _file_locks[lock_path] = [fd, 0]
+        entry[1] += 1
+        try:
+            yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _file_locks[lock_path]
+                if fcntl is not None:
+                    fcntl.flock(entry[0], fcntl.LOCK_UN)
+                os.close(entry[0])
+
+
+def append_bytes(path, data: bytes) -> None:
+    """
+    Lägg till data sist i en fil med en enda O_APPEND-skrivning.
+
+    Kärnan placerar hela skrivningen sist i filen, så samtidiga processer
+    kan logga utan lås utan att raderna blandas ihop.
+
+    Args:
+        path (str | Path): filen (skapas om den saknas)
+        data (bytes): hela rader, avslutade med radbrytning
+    """
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    if _probe is not None:
+        _probe("append", len(data))
+    fd = os.open(p, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            # Normalt skrivs allt på en gång; loopen fångar bara korta skrivningar
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def replace_bytes(path, data: bytes, durable=True) -> None:
+    """
+    Ersätt en fil atomärt med givna bytes (t.ex. en kompakterad JSONL-logg).
+
+    Samma väg som write_json: temporär fil i samma mapp, fsync, os.replace
+    och fsync av mappen.
+
+    Args:
+        path (str | Path): filen som ska ersättas
+        data (bytes): nytt innehåll
+        durable (bool, optional): fsynca fil och mapp. Standard: True.
+    """
+    p = Path(path)
+    tmp, fd = _open_temp(p)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, p)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    if durable:
+        _fsync_dir(p.parent)
+
+
+def update_json(path, mutate, default=None):
+    """
+    Läs-ändra-skriv av en JSON-fil under file_lock().
+
+    Filen läses om från disk under låset (inte via cachen: mtime har för grov
+    upplösning för att skilja två snabba skrivningar från olika processer åt).
+    Förbered och validera därför så mycket som möjligt före anropet.
+    Skrivningen sker direkt (även inne i group_commit()), annars skulle
+    låset släppas för tidigt.
+
+    Args:
+        path (str | Path): JSON-filen
+        mutate (Callable[[any], any]): ändrar objektet på plats och returnerar
+            ett valfritt resultat
+        default (any, optional): startvärde om filen saknas
+
+    Returns:
+        Det som mutate returnerade.
+    """
+    p = Path(path)
+    with file_lock(p):
+        with _group_lock:
+            pending = _pending.get(str(p.resolve()))
+        data = thaw(pending[1]) if pending else read_json(p, default=default, cache=False)
+        result = mutate(data)
+        with _group_lock:
+            _pending.pop(str(p.resolve()), None)
+        _commit([(p, data, True, True)])
+    return result
+
+# ---------------- Publika funktioner ----------------
+
+
+def write_json(path, data, durable=True, cache=True):
     """
     Spara ett Python-objekt (lista eller dict) till en JSON-fil.
 
+    Filen ersätts atomärt (temporär fil + os.replace), så den är aldrig
+    halvskriven. Inom group_commit() skjuts skrivningen upp. Cachen
+    uppdateras med det skrivna innehållet (om inte cache=False).
+
     Args:
         path (str | Path): sökväg till filen, ex. 'data/test.json'
         data (any): objektet som ska sparas
+        durable (bool, optional): fsynca innan namnbytet. Standard: True.
+            Stäng av för cachefiler som kan byggas om.
+        cache (bool, optional): lägg en kopia av data i läs-cachen.
+            Standard: True. Stäng av för stora filer som anroparen ändå
+            håller i minnet själv (posten släpps i stället).
 
     Returns:
         None
     """
     p = Path(path)
-    p.parent.mkdir(parents=True, exist_ok=True)  # säkerställ att mappen finns
-    with p.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    with _group_lock:
+        if _group["depth"]:
+            key = str(p.resolve())
+            old = _pending.pop(key, None)
+            # Bevara durable om någon av de sammanslagna skrivningarna krävde det
+            _pending[key] = (p, thaw(data), durable or bool(old and old[2]), cache)
+            now = time.monotonic()
+            if _group["since"] is None:
+                _group["since"] = now
+            elif _group["window"] is not None and now - _group["since"] >= _group["window"]:
+                flush_pending()
+            return
+    _commit([(p, data, durable, cache)])
 
 
-def read_json(path, default=None):
+def read_json(path, default=None, cache=True):
     """
     Läs en JSON-fil från given sökväg.
 
     Args:
         path (str | Path): sökväg till filen
         default (any, optional): returvärde om filen inte finns. Standard: None
+        cache (bool, optional): använd läs-cachen. Standard: True. Stäng av
+            för stora filer som anroparen ändå håller i minnet själv.
 
     Returns:
-        Objektet som fanns i JSON-filen, eller `default` om filen saknas.
+        Objektet som fanns i JSON-filen (en egen kopia som får ändras),
+        eller `default` om filen saknas.
     """
     p = Path(path)
-    if not p.exists():
-        return default
-    with p.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    if not cache:
+        if not p.exists():
+            return default
+        with p.open("r", encoding="utf-8") as f:
+            obj = json.load(f)
+            if _probe is not None:
+                _probe("json_parse", os.fstat(f.fileno()).st_size)
+            return obj
+    found, obj = _cached(p)
+    return thaw(obj) if found else default
+
+
+def file_digest(path) -> str:
+    """
+    Kort hash av en fils innehåll (t.ex. för att känna igen en snapshot).
+
+    Args:
+        path (str | Path): sökväg till filen
+
+    Returns:
+        str: 16 hex-tecken, eller "" om filen saknas
+    """
+    try:
+        return hashlib.sha1(Path(path).read_bytes()).hexdigest()[:16]
+    except FileNotFoundError:
+        return ""
+
+
+def read_json_digest(path, default=None):
+    """
+    Läs en JSON-fil utan cache tillsammans med hashen av dess innehåll.
+
+    Filen läses en gång, så objekt och hash hör alltid till samma version.
+
+    Args:
+        path (str | Path): sökväg till filen
+        default (any, optional): returvärde om filen inte finns. Standard: None
+
+    Returns:
+        tuple: (objektet, file_digest för samma bytes), eller (default, "")
+    """
+    try:
+        raw = Path(path).read_bytes()
+    except FileNotFoundError:
+        return default, ""
+    if _probe is not None:
+        _probe("json_parse", len(raw))
+    return json.loads(raw), hashlib.sha1(raw).hexdigest()[:16]
+
+
+def read_json_view(path, default=None):
+    """
+    Läs en JSON-fil som skrivskyddad vy (ingen kopiering vid cacheträff).
+
+    Args:
+        path (str | Path): sökväg till filen
+        default (any, optional): returvärde om filen inte finns. Standard: None
+
+    Returns:
+        ReadOnlyDict/ReadOnlyList (eller skalärt värde), eller `default`.
+    """
+    found, obj = _cached(path)
+    return _wrap(obj) if found else default
@@ -1,166 +1,668 @@
 """
 plan.py – hantering av studieplan med veckomål.
 
-Denna modul lagrar mål i data/plan.json.
+Denna modul lagrar mål per ISO-vecka ("2025-W35") i data/plan/.
 Den kan:
 - sätta nya mål för en vecka (set_goal)
 - markera en punkt som klar (mark_done)
 - beräkna progress i procent (progress)
-
-Dataformat (plan.json):
-{
-    "35": { "items": ["Läs kapitel 1", "Träna loops"], "done": [true, false] },
-    "36": { ... }
-}
+- summera flera veckor eller en termin (progress_range, semester_summary)
+- bocka av mätbara mål automatiskt (goal_status, se nedan)
+
+Veckor anges som "2025-W35", som ett datum, eller som bara veckonummer
+(35 eller "35") – då menas innevarande ISO-år.
+
+Med STUDIE_BACKEND=sqlite sparas planen i data/studie.db (plan_weeks/plan_items)
+och progress() läses från veckans räknare i stället för att planen läses in.
+
+Varje vecka är en egen fil, så mark_done skriver bara om den veckan.
+Räknarna (klara/totalt per vecka) hålls i data/plan/index.json och
+uppdateras vid varje ändring; progress och intervallsummor läses därifrån
+utan att veckornas filer öppnas. set_goal och mark_done ändrar filerna under
+fillås (io_utils.update_json), så flera processer kan dela samma data/-mapp.
+
+Mätbara mål känns igen i målets text och bockas av automatiskt när veckans
+aktivitet (src/activity.py) når målet – ingen mark_done behövs:
+- "Kör 10 quiz-frågor", "Svara på 10 frågor"  → besvarade frågor
+- "Svara rätt på 8 frågor", "8 rätt"          → rätta svar
+- "Lägg till 5 kort", "5 nya kort"            → nya kort
+- "#sql" i texten räknar bara kort med taggen sql
+Övriga mål markeras för hand som tidigare.
+
+Dataformat:
+    data/plan/2025-W35.json  { "items": ["Läs kapitel 1", "Kör 10 quiz-frågor"], "done": [true, false] }
+    data/plan/index.json     { "2025-W35": [1, 2, [["answers", 10, null]]], ... }
+                             (klara, totalt, mätbara mål som inte är markerade)
+
+En äldre plan med nycklar som "35" (data/plan.json, eller sådana veckor i
+sqlite) flyttas automatiskt till ISO-veckor första gången planen används.
+Året läses ut ur resultatloggen (året då veckan senast hade svar). Utan
+resultat används innevarande år och en varning skrivs ut; ett annat år kan
+anges före första användningen:
+    python -m src.plan --migrate --year 2025
+data/plan.json döps om till plan.legacy.json efter flytten.
 """
+from collections.abc import Mapping
+from datetime import date
 from pathlib import Path
 from typing import Any
-from src.io_utils import read_json, write_json
+import re
+from src.io_utils import file_lock, read_json, read_json_view, thaw, update_json
+from src.storage import use_sqlite
+from src import activity, sqlite_store
+from src.workspace import in_workspace
 
 PLAN_PATH = Path("data/plan.json")
+PLAN_DIR = Path("data/plan")
+
+# Terminer som (första vecka, sista vecka); HT slutar i januari året efter
+SEMESTERS = {"VT": (3, 23), "HT": (35, 2)}
+
+_WEEK = re.compile(r"^(\d{4})-?[Ww](\d{1,2})$")
+
+# Mätbara mål: (mått i activity, mönster i målets text). Ordningen spelar roll:
+# "Svara rätt på 8 frågor" ska räknas som rätta svar, inte som svar.
+_GOALS = (
+    ("correct", re.compile(r"(\d+)\s+rätt|rätt\s+på\s+(\d+)", re.I)),
+    ("cards", re.compile(r"(?:lägg\s+till|skapa)\s+(\d+)\s+(?:nya\s+)?kort|(\d+)\s+nya\s+kort", re.I)),
+    # Kräver quiz eller ett verb ("Svara på", "Kör"): "Läs 20 frågor i kapitel 3" är inget quizmål
+    ("answers", re.compile(r"(?:svara\s+på|kör)\s+(\d+)\s+(?:quiz-?\s*)?frågor|(\d+)\s+quiz-?\s*frågor"
+                           r"|(?:svara\s+på|kör)\s+(\d+)\s+quiz", re.I)),
+)
+_GOAL_TAG = re.compile(r"#([\w.+-]+)")
 
 
 # ---------------- Hjälpare ----------------
 
-def _load_plan() -> dict[str, dict[str, Any]]:
+def week_key(week: int | str | date, year: int | None = None) -> str:
     """
-    Läs in hela planen från data/plan.json.
+    Normalisera en vecka till ISO-formatet "ÅÅÅÅ-Www".
+
+    Args:
+        week (int | str | date): 35, "35", "2025-W35" eller ett datum
+        year (int, optional): år för bara veckonummer. Standard: innevarande ISO-år
 
     Returns:
-        dict[str, dict]: {"vecka": {"items": [...], "done": [...]}}
+        str: t.ex. "2025-W35"
 
     Raises:
-        ValueError: om filformatet inte är ett dict
+        ValueError: om veckan inte finns (t.ex. vecka 53 ett år som saknar den)
     """
-    data = read_json(PLAN_PATH, default={})
-    if not isinstance(data, dict):
-        raise ValueError(
-            "plan.json måste vara ett dict {vecka: {items: [...], done: [...]}}."
-        )
-    return data
+    if isinstance(week, date):
+        y, w, _ = week.isocalendar()
+        return f"{y}-W{w:02d}"
+    s = str(week).strip()
+    m = _WEEK.match(s)
+    if m:
+        y, w = int(m.group(1)), int(m.group(2))
+    elif s.isdigit():
+        y, w = (year or date.today().isocalendar()[0]), int(s)
+    else:
+        raise ValueError(f"Ogiltig vecka '{s}'. Ange t.ex. 35 eller 2025-W35.")
+    try:
+        date.fromisocalendar(y, w, 1)
+    except ValueError:
+        raise ValueError(f"Vecka {w} finns inte år {y}.") from None
+    return f"{y}-W{w:02d}"
 
 
-def _save_plan(plan: dict[str, dict[str, Any]]) -> None:
+def _week_path(w: str) -> Path:
+    return PLAN_DIR / f"{w}.json"
+
+
+def _index_path() -> Path:
+    return PLAN_DIR / "index.json"
+
+
+def parse_goal(text: str) -> dict[str, Any] | None:
     """
-    Spara hela planen till data/plan.json.
+    Känn igen ett mätbart mål i en målbeskrivning.
 
     Args:
-        plan (dict): planen som ska sparas
+        text (str): t.ex. "Kör 10 quiz-frågor #sql"
+
+    Returns:
+        dict | None: {"metric": "answers"|"correct"|"cards", "target": int,
+            "tag": str | None}, eller None om målet inte är mätbart
     """
-    write_json(PLAN_PATH, plan)
+    for metric, pattern in _GOALS:
+        m = pattern.search(text or "")
+        if m:
+            target = int(next(g for g in m.groups() if g))
+            tag = _GOAL_TAG.search(text)
+            return {"metric": metric, "target": target, "tag": tag.group(1) if tag else None}
+    return None
+
 
+def _open_goals(items, done) -> list[list]:
+    # [mått, mål, tagg] för mätbara punkter som inte är markerade för hand
+    goals = []
+    for i, item in enumerate(items):
+        if i < len(done) and done[i]:
+            continue
+        goal = parse_goal(item)
+        if goal is not None:
+            goals.append([goal["metric"], goal["target"], goal["tag"]])
+    return goals
 
-def _norm_week(week: int | str) -> str:
+
+def _counts(data: Mapping[str, Any]) -> list:
+    # [klara, totalt, öppna mätbara mål] för en veckas data
+    items = data.get("items", [])
+    done = data.get("done", [])
+    return [sum(1 for d in done[:len(items)] if d), len(items), _open_goals(items, done)]
+
+
+def _set_counts(w: str, counts: list) -> None:
+    # Anropas under veckans lås, så index och vecka ändras i samma ordning
+    def apply(index):
+        index[w] = counts
+
+    update_json(_index_path(), apply, default={})
+
+
+def _week_files() -> list[Path]:
+    if not PLAN_DIR.exists():
+        return []
+    return [p for p in PLAN_DIR.glob("*.json") if _WEEK.match(p.stem)]
+
+
+def rebuild_index() -> dict[str, list]:
     """
-    Normalisera vecka till str. Tillåter 35 eller "35".
+    Räkna om index.json från veckornas filer (om den saknas eller är trasig).
+
+    Returns:
+        dict[str, list]: {vecka: [klara, totalt, öppna mätbara mål]}
     """
-    return str(week).strip()
+    with file_lock(_index_path()):
+        index = {p.stem: _counts(read_json(p, default={}, cache=False)) for p in _week_files()}
+
+        def apply(data):
+            data.clear()
+            data.update(index)
+
+        update_json(_index_path(), apply, default={})
+    return index
+
+
+def _index() -> Mapping[str, Any]:
+    """
+    Skrivskyddad vy över räknarna (ingen kopiering vid cacheträff).
+
+    Returns:
+        Mapping[str, Any]: {vecka: [klara, totalt, öppna mätbara mål]}
+    """
+    _migrate_legacy()
+    index = read_json_view(_index_path())
+    if index is None:
+        return rebuild_index() if _week_files() else {}
+    if not isinstance(index, Mapping):
+        raise ValueError("plan/index.json måste vara ett dict {vecka: [klara, totalt]}.")
+    return index
+
+
+def _legacy_years(weeks: set[int]) -> tuple[dict[int, int], int | None]:
+    """
+    Gissa år för veckonummer utan år med hjälp av resultatloggen.
+
+    Args:
+        weeks (set[int]): veckonummer som saknar år
+
+    Returns:
+        tuple: ({vecka: senaste ISO-år med svar den veckan}, senaste ISO-år
+            med något svar alls – None om loggen är tom)
+    """
+    from src.stats import _iter_result_tuples  # undvik cirkulär import
+
+    found: dict[int, int] = {}
+    latest = None
+    for row in _iter_result_tuples():
+        try:
+            y, w, _ = date.fromisoformat(str(row[0])[:10]).isocalendar()
+        except ValueError:
+            continue
+        if latest is None or y > latest:
+            latest = y
+        if w in weeks and y > found.get(w, 0):
+            found[w] = y
+    return found, latest
+
+
+_warned: set[str] = set()
+
+
+def _warn(message: str) -> None:
+    # Varje varning skrivs en gång per process
+    if message not in _warned:
+        _warned.add(message)
+        print(f"Varning: {message}")
+
+
+def _resolve_legacy(keys, year: int | None) -> dict[str, str]:
+    """
+    Nya ISO-nycklar för veckor från en äldre plan.
+
+    Året tas från year, annars från resultatloggen (året då veckan senast
+    hade svar, annars året för det senaste svaret). Finns inga resultat
+    används innevarande år, med en varning. Ogiltiga nycklar hoppas över
+    med en varning.
+
+    Returns:
+        dict[str, str]: {gammal nyckel: "ÅÅÅÅ-Www"}
+    """
+    bare = {int(k) for k in keys if str(k).strip().isdigit()}
+    found, latest = ({}, None) if year or not bare else _legacy_years(bare)
+    if bare and not year and latest is None:
+        # Hellre innevarande år än att gömma veckor som redan finns
+        latest = date.today().isocalendar()[0]
+        _warn(f"veckorna i den gamla planen saknar år och inget år går att läsa ut "
+              f"ur resultaten – de läggs i {latest}. Ange ett annat år före första "
+              f"användningen med: python -m src.plan --migrate --year ÅÅÅÅ")
+    mapping = {}
+    for key in keys:
+        s = str(key).strip()
+        week_year = year or (found.get(int(s), latest) if s.isdigit() else None)
+        try:
+            mapping[key] = week_key(s, week_year)
+        except ValueError as e:
+            _warn(f"hoppar över veckan '{key}' i den gamla planen: {e}")
+    return mapping
+
+
+@in_workspace
+def migrate_legacy(year: int | None = None) -> int:
+    """
+    Flytta en äldre plan till ISO-veckor (körs automatiskt vid första användning).
+
+    JSON: data/plan.json (en fil, nycklar "35") blir en fil per vecka och
+    döps om till plan.legacy.json. SQLite: veckor som bara är ett nummer får
+    ISO-nyckel. Veckor som redan finns i det nya formatet skrivs inte över.
+
+    Args:
+        year (int, optional): år för alla veckonummer. Standard: härleds ur
+            resultatloggen, annars innevarande år (med en varning)
+
+    Returns:
+        int: antal flyttade veckor
+    """
+    if use_sqlite():
+        old = sqlite_store.legacy_weeks()
+        mapping = _resolve_legacy(old, year) if old else {}
+        if not mapping:
+            _checked.add(str(sqlite_store.DB_PATH))
+            return 0
+        moved = sqlite_store.rename_weeks(mapping)
+        _checked.add(str(sqlite_store.DB_PATH))
+        for key in set(mapping) - set(moved):
+            _warn(f"veckan {mapping[key]} finns redan – den gamla veckan '{key}' lämnas orörd")
+        return len(moved)
+
+    if not PLAN_PATH.exists():
+        return 0
+    with file_lock(PLAN_PATH):
+        if not PLAN_PATH.exists():  # en annan process hann före
+            return 0
+        data = read_json(PLAN_PATH, default={}, cache=False)
+        if not isinstance(data, dict):
+            raise ValueError(
+                "plan.json måste vara ett dict {vecka: {items: [...], done: [...]}}."
+            )
+        mapping = _resolve_legacy(list(data), year)
+        moved = 0
+        for key, w in mapping.items():
+            week_data = data[key]
+            if _week_path(w).exists():
+                _warn(f"veckan {w} finns redan – den gamla veckan '{key}' lämnas orörd")
+                continue
+            items = list(week_data.get("items", []))
+            done = [bool(d) for d in week_data.get("done", [])][:len(items)]
+            done += [False] * (len(items) - len(done))
+            _write_week(w, {"items": items, "done": done})
+            moved += 1
+        PLAN_PATH.replace(PLAN_PATH.with_name("plan.legacy.json"))
+    return moved
+
+
+# Databaser som redan kontrollerats i processen
+_checked: set[str] = set()
+
+
+def _migrate_legacy() -> None:
+    # Billig kontroll före varje anrop; själva flytten sker en gång
+    if use_sqlite():
+        if str(sqlite_store.DB_PATH) not in _checked:
+            migrate_legacy()
+    elif PLAN_PATH.exists():
+        migrate_legacy()
+
+
+def _write_week(w: str, week_data: dict[str, Any]) -> None:
+    # Ersätt en veckas fil och dess räknare
+    def apply(data):
+        data.clear()
+        data.update(week_data)
+
+    with file_lock(_week_path(w)):
+        update_json(_week_path(w), apply, default={})
+        _set_counts(w, _counts(week_data))
+
+
+def _load_plan() -> dict[str, dict[str, Any]]:
+    """
+    Läs in hela planen (alla veckor).
+
+    Returns:
+        dict[str, dict]: {"vecka": {"items": [...], "done": [...]}}
+    """
+    _migrate_legacy()
+    return {p.stem: read_json(p, default={}) for p in sorted(_week_files())}
+
+
+def _entries(lo: str, hi: str) -> dict[str, list]:
+    """
+    Räknarna för veckorna mellan lo och hi (inklusive).
+
+    Returns:
+        dict[str, list]: {vecka: [klara, totalt, öppna mätbara mål]}
+    """
+    if use_sqlite():
+        _migrate_legacy()
+        counts = sqlite_store.week_counts(lo, hi)
+        open_items: dict[str, list] = {}
+        for w, item in sqlite_store.open_items(lo, hi):
+            open_items.setdefault(w, []).append(item)
+        return {w: [done, total, _open_goals(open_items.get(w, []), [])]
+                for w, (done, total) in counts.items()}
+    # ISO-nycklarna sorteras i tidsordning även som strängar
+    entries = {w: c for w, c in _index().items() if lo <= w <= hi}
+    if any(len(c) < 3 for c in entries.values()):
+        # Index från före de mätbara målen – räkna om en gång
+        index = rebuild_index()
+        entries = {w: c for w, c in index.items() if lo <= w <= hi}
+    return entries
+
+
+def _summary(entries: Mapping[str, Any]) -> dict[str, Any]:
+    # Sammanställ räknarna till procent per vecka och totalt. Öppna mätbara
+    # mål räknas som klara om veckans aktivitet har nått dem.
+    weeks_activity = activity.weekly() if any(e[2] for e in entries.values()) else {}
+    weeks = {}
+    done_sum = total_sum = 0
+    for w in sorted(entries):
+        done, total, goals = entries[w]
+        week_activity = weeks_activity.get(w)
+        done += sum(1 for metric, target, tag in goals
+                    if activity.count(week_activity, metric, tag) >= target)
+        weeks[w] = {"done": done, "total": total,
+                    "progress": round(100 * done / total) if total else 0}
+        done_sum += done
+        total_sum += total
+    return {"weeks": weeks, "done": done_sum, "total": total_sum,
+            "progress": round(100 * done_sum / total_sum) if total_sum else 0}
 
 
 # ---------------- Publika funktioner ----------------
 
-def set_goal(week: int, items: list[str]) -> dict[str, Any]:
+@in_workspace
+def set_goal(week: int | str, items: list[str]) -> dict[str, Any]:
     """
     Sätt mål för en vecka.
 
     Args:
-        week (int): veckonummer, ex. 35
+        week (int | str): vecka, ex. 35 eller "2025-W35"
         items (list[str]): lista med målbeskrivningar
 
     Returns:
         dict[str, Any]: den uppdaterade veckans data (items + done-lista)
     """
-    w = _norm_week(week)
+    w = week_key(week)
     clean = [s.strip() for s in (items or []) if s and s.strip()]
     if not clean:
         raise ValueError("items måste innehålla minst en icke-tom sträng.")
 
-    plan = _load_plan()
-    plan[w] = {
+    _migrate_legacy()
+    if use_sqlite():
+        return sqlite_store.set_goal(w, clean)
+
+    week_data = {
         "items": clean,
         "done": [False] * len(clean),
     }
-    _save_plan(plan)
-    return plan[w]
+    _write_week(w, week_data)
+    return week_data
 
 
-def mark_done(week: int, item_index: int, value: bool = True) -> dict[str, Any]:
+@in_workspace
+def mark_done(week: int | str, item_index: int, value: bool = True) -> dict[str, Any]:
     """
     Markera en specifik punkt som klar/ej klar.
 
+    Bara veckans egen fil och dess räknare skrivs om.
+
     Args:
-        week (int): veckonummer
+        week (int | str): vecka, ex. 35 eller "2025-W35"
         item_index (int): index i listan items (0-baserat)
         value (bool, optional): True = klar, False = ej klar. Standard: True.
 
     Returns:
         dict[str, Any]: den uppdaterade veckans data
     """
-    w = _norm_week(week)
-    plan = _load_plan()
-    if w not in plan:
-        raise KeyError(f"Vecka {w} saknas. Sätt mål först med set_goal().")
+    w = week_key(week)
+    _migrate_legacy()
+    if use_sqlite():
+        data = sqlite_store.mark_done(w, item_index, value)
+        if data is None:
+            raise KeyError(f"Vecka {w} saknas. Sätt mål först med set_goal().")
+        return data
+
+    def apply(data):
+        # Kontrollen görs mot färsk data under låset
+        if not data:
+            raise KeyError(f"Vecka {w} saknas. Sätt mål först med set_goal().")
+
+        items = data.get("items", [])
+        done = data.get("done", [False] * len(items))
+
+        if not (0 <= item_index < len(items)):
+            raise IndexError(
+                f"item_index {item_index} ligger utanför intervallet 0..{len(items)-1}."
+            )
+
+        done[item_index] = bool(value)
+        data["done"] = done
+        return data
+
+    path = _week_path(w)
+    with file_lock(path):
+        week_data = update_json(path, apply, default={})
+        _set_counts(w, _counts(week_data))
+    return week_data
+
+
+@in_workspace
+def progress(week: int | str) -> int:
+    """
+    Beräkna hur många procent av målen som är klara för given vecka.
 
-    items = plan[w].get("items", [])
-    done = plan[w].get("done", [False] * len(items))
+    Läses från veckans räknare, inte från veckans mål. Mätbara mål
+    ("Kör 10 quiz-frågor") räknas som klara när veckans aktivitet når dem.
 
-    if not (0 <= item_index < len(items)):
-        raise IndexError(
-            f"item_index {item_index} ligger utanför intervallet 0..{len(items)-1}."
-        )
+    Args:
+        week (int | str): vecka, ex. 35 eller "2025-W35"
 
-    done[item_index] = bool(value)
-    plan[w]["done"] = done
-    _save_plan(plan)
-    return plan[w]
+    Returns:
+        int: procent (0–100). Returnerar 0 om inga mål finns.
+    """
+    w = week_key(week)
+    return _summary(_entries(w, w))["progress"]
 
 
-def progress(week: int) -> int:
+@in_workspace
+def goal_status(week: int | str) -> list[dict[str, Any]] | None:
     """
-    Beräkna hur många procent av målen som är klara för given vecka.
+    Status per punkt för en vecka, med mätbara mål utvärderade mot aktiviteten.
 
     Args:
-        week (int): veckonummer
+        week (int | str): vecka, ex. 35 eller "2025-W35"
 
     Returns:
-        int: procent (0–100). Returnerar 0 om inga mål finns.
+        list[dict] | None: {"item", "done", "goal", "count"} per punkt
+            ("goal"/"count" är None för mål som inte är mätbara),
+            eller None om veckan saknas
     """
-    w = _norm_week(week)
-    plan = _load_plan()
-    if w not in plan:
-        return 0
+    w = week_key(week)
+    data = get_week(w)
+    if data is None:
+        return None
+    week_activity = None
+    out = []
+    for item, done in zip(data["items"], data["done"]):
+        goal = parse_goal(item)
+        n = None
+        if goal is not None:
+            if week_activity is None:
+                week_activity = activity.weekly().get(w, {})
+            n = activity.count(week_activity, goal["metric"], goal["tag"])
+            done = done or n >= goal["target"]
+        out.append({"item": item, "done": bool(done), "goal": goal, "count": n})
+    return out
+
+
+@in_workspace
+def progress_range(start: int | str | date, end: int | str | date) -> dict[str, Any]:
+    """
+    Summera progress för alla veckor med mål mellan start och end (inklusive).
+
+    Args:
+        start (int | str | date): första veckan, ex. "2025-W35"
+        end (int | str | date): sista veckan, ex. "2026-W02"
 
-    items = plan[w].get("items", [])
-    done = plan[w].get("done", [False] * len(items))
+    Returns:
+        dict[str, Any]: {"weeks": {vecka: {"done", "total", "progress"}},
+            "done", "total", "progress"} – summorna över alla punkter i intervallet,
+            med uppnådda mätbara mål räknade som klara
+    """
+    lo, hi = week_key(start), week_key(end)
+    if lo > hi:
+        raise ValueError(f"Intervallet {lo}–{hi} är baklänges.")
+    return _summary(_entries(lo, hi))
 
-    if not items:
-        return 0
 
-    pct = round(100 * (sum(1 for d in done if d) / len(items)))
-    return pct
+def _semester(name: str | None) -> tuple[str, str, str]:
+    """
+    Namn, första och sista vecka för en termin.
+
+    Args:
+        name (str | None): t.ex. "HT2025" eller "VT2026". None = terminen som
+            pågår (eller senast började) i dag
 
+    Returns:
+        tuple[str, str, str]: ex. ("HT2025", "2025-W35", "2026-W02")
 
-def get_week(week: int) -> dict[str, Any] | None:
+    Raises:
+        ValueError: om namnet inte är en känd termin
+    """
+    if name is None:
+        year, week, _ = date.today().isocalendar()
+        if week >= SEMESTERS["HT"][0]:
+            term = "HT"
+        elif week <= SEMESTERS["HT"][1]:
+            term, year = "HT", year - 1
+        else:
+            term = "VT"
+    else:
+        m = re.match(r"^(VT|HT)\s*(\d{4})$", name.strip().upper())
+        if not m:
+            raise ValueError(f"Okänd termin '{name}'. Ange t.ex. HT2025 eller VT2026.")
+        term, year = m.group(1), int(m.group(2))
+    first, last = SEMESTERS[term]
+    end_year = year + 1 if last < first else year
+    return f"{term}{year}", week_key(first, year), week_key(last, end_year)
+
+
+@in_workspace
+def semester_summary(name: str | None = None) -> dict[str, Any]:
+    """
+    Progress för en hel termin (veckorna i SEMESTERS).
+
+    Args:
+        name (str, optional): t.ex. "HT2025". Standard: pågående termin
+
+    Returns:
+        dict[str, Any]: som progress_range, plus "semester", "start" och "end"
+    """
+    label, start, end = _semester(name)
+    return {"semester": label, "start": start, "end": end, **progress_range(start, end)}
+
+
+@in_workspace
+def get_week(week: int | str) -> dict[str, Any] | None:
     """
     Hämta data för en vecka.
 
     Args:
-        week (int): veckonummer
+        week (int | str): vecka, ex. 35 eller "2025-W35"
 
     Returns:
         dict[str, Any] | None: veckans data, eller None om den saknas
     """
-    w = _norm_week(week)
-    plan = _load_plan()
-    return plan.get(w)
+    w = week_key(week)
+    _migrate_legacy()
+    if use_sqlite():
+        return sqlite_store.get_week(w)
+    week_data = read_json_view(_week_path(w))
+    return None if not week_data else thaw(week_data)
 
 
+@in_workspace
 def list_weeks() -> list[str]:
     """
-    Lista alla veckonummer som finns sparade i plan.json.
+    Lista alla veckor som har mål.
+
+    Returns:
+        list[str]: veckor som "ÅÅÅÅ-Www", i tidsordning
+    """
+    _migrate_legacy()
+    weeks = sqlite_store.list_weeks() if use_sqlite() else _index().keys()
+    return sorted(weeks)
+
+
+@in_workspace
+def find_week(week: int | str | date) -> str:
+    """
+    Som week_key, men ett bara veckonummer pekar på en befintlig vecka.
+
+    "35" blir den senaste veckan 35 som har mål (t.ex. 2025-W35 när den
+    listas), och innevarande år bara om ingen sådan vecka finns.
+
+    Args:
+        week (int | str | date): 35, "35", "2025-W35" eller ett datum
 
     Returns:
-        list[str]: veckonummer som strängar (sorterade numeriskt när möjligt)
+        str: t.ex. "2025-W35"
+
+    Raises:
+        ValueError: om veckan inte går att tolka
     """
-    plan = _load_plan()
-    return sorted(plan.keys(), key=lambda x: int(x) if x.isdigit() else x)
+    s = str(week).strip()
+    if not isinstance(week, date) and s.isdigit():
+        suffix = f"-W{int(s):02d}"
+        matches = [w for w in list_weeks() if w.endswith(suffix)]
+        if matches:
+            return matches[-1]
+    return week_key(week)
+
+
+if __name__ == "__main__":
+    # Terminsöversikt: python -m src.plan [HT2025]
+    # Flytta en äldre plan: python -m src.plan --migrate [--year 2025]
+    import sys
+    args = sys.argv[1:]
+    if args and args[0] == "--migrate":
+        year = int(args[2]) if len(args) > 2 and args[1] == "--year" else None
+        print(f"Flyttade {migrate_legacy(year)} veckor.")
+        raise SystemExit(0)
+    s = semester_summary(args[0] if args else None)
+    print(f"{s['semester']} ({s['start']}–{s['end']}): {s['done']}/{s['total']} klart, {s['progress']} %")
+    for w, c in s["weeks"].items():
+        print(f"  {w}: {c['done']}/{c['total']} ({c['progress']} %)")
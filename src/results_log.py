@@ -0,0 +1,291 @@
+"""
+results_log.py – kompakt binär kolumnlogg för quiz-resultat.
+
+results.csv upprepar hela fråge- och svarstexten på varje rad. Det här
+formatet sparar i stället varje kolumn som en egen fil med fast bredd:
+
+    data/results_bin/
+        ts.i64        – tidsstämpel (epoch-sekunder, int64)
+        card.u64      – kort-id (kortets id/card_key som 64-bitars heltal)
+        correct.u8    – 1 = rätt, 0 = fel
+        given.i64     – offset i given.txt för användarens svar (-1 = saknas)
+        given.txt     – användarens svar, ett per rad (utf-8)
+        cards.jsonl   – kort-id → fråga/facit (en rad per kort, för konvertering)
+
+Kolumnerna läses med mmap/array, så aggregeringar över miljontals rader
+görs utan att bygga en dict per rad.
+
+Konvertera fram och tillbaka mot results.csv:
+    python -m src.results_log to-bin    # data/results.csv → data/results_bin/
+    python -m src.results_log to-csv    # data/results_bin/ → data/results.csv
+"""
+from __future__ import annotations
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import csv
+import json
+import mmap
+import sys
+
+from src.flashcards import card_key
+from src.stats import HEADER, RESULTS_CSV, _is_correct
+
+RESULTS_BIN = Path("data/results_bin")
+
+# kolumnfil → array-typkod (fast bredd per rad)
+COLUMNS = {"ts.i64": "q", "card.u64": "Q", "correct.u8": "B", "given.i64": "q"}
+
+
+def _ts_to_epoch(ts: str) -> int:
+    return int(datetime.fromisoformat(ts).timestamp())
+
+
+def _epoch_to_ts(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch).isoformat(timespec="seconds")
+
+
+def _card_int(row: Dict[str, Any]) -> int:
+    key = row.get("card_id") or card_key({"q": row["question"], "a": row["expected"]})
+    return int(key, 16)
+
+
+def _known_cards(root: Path) -> set[int]:
+    p = root / "cards.jsonl"
+    if not p.exists():
+        return set()
+    with p.open("r", encoding="utf-8") as f:
+        return {int(json.loads(line)["id"], 16) for line in f if line.strip()}
+
+
+def append(rows: Iterable[Dict[str, Any]], root: Optional[Path] = None) -> int:
+    """
+    Lägg till resultatrader i kolumnloggen.
+
+    Args:
+        rows (Iterable[dict]): rader i samma form som stats.load_results
+            (timestamp, question, expected, given, correct, valfritt card_id)
+        root (Path, optional): katalog för kolumnfilerna. Standard: RESULTS_BIN
+
+    Returns:
+        int: antal rader som skrevs
+    """
+    root = Path(root or RESULTS_BIN)
+    root.mkdir(parents=True, exist_ok=True)
+    cols = {name: array(code) for name, code in COLUMNS.items()}
+    known = _known_cards(root)
+    new_cards: List[str] = []
+    given_parts: List[bytes] = []
+    given_path = root / "given.txt"
+    given_off = given_path.stat().st_size if given_path.exists() else 0
+
+    for row in rows:
+        cid = _card_int(row)
+        cols["ts.i64"].append(_ts_to_epoch(row["timestamp"]))
+        cols["card.u64"].append(cid)
+        cols["correct.u8"].append(1 if _is_correct(row["correct"]) else 0)
+        given = (row.get("given") or "").replace("\n", " ")
+        if given:
+            data = (given + "\n").encode("utf-8")
+            cols["given.i64"].append(given_off)
+            given_parts.append(data)
+            given_off += len(data)
+        else:
+            cols["given.i64"].append(-1)
+        if cid not in known:
+            known.add(cid)
+            new_cards.append(json.dumps(
+                {"id": f"{cid:016x}", "q": row["question"], "a": row["expected"]},
+                ensure_ascii=False) + "\n")
+
+    n = len(cols["ts.i64"])
+    if not n:
+        return 0
+    # Textfilerna först, kolumnerna sist: en avbruten skrivning lämnar bara
+    # oanvänd text, och läsaren kortar kolumnerna till den kortaste.
+    with given_path.open("ab") as f:
+        f.write(b"".join(given_parts))
+    with (root / "cards.jsonl").open("a", encoding="utf-8") as f:
+        f.writelines(new_cards)
+    for name, arr in cols.items():
+        with (root / name).open("ab") as f:
+            arr.tofile(f)
+    return n
+
+
+def load_columns(root: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Läs kolumnerna som minnesmappade vyer (ingen kopiering, inga dicts per rad).
+
+    Args:
+        root (Path, optional): katalog för kolumnfilerna. Standard: RESULTS_BIN
+
+    Returns:
+        dict[str, memoryview]: kolumnnamn utan ändelse ("ts", "card",
+            "correct", "given") → vy med fast bredd; alla lika långa
+    """
+    root = Path(root or RESULTS_BIN)
+    views: Dict[str, Any] = {}
+    for name, code in COLUMNS.items():
+        p = root / name
+        short = name.split(".")[0]
+        if not p.exists() or p.stat().st_size == 0:
+            views[short] = memoryview(array(code))
+            continue
+        with p.open("rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        width = array(code).itemsize
+        usable = len(mm) - len(mm) % width
+        views[short] = memoryview(mm)[:usable].cast(code)
+    n = min(len(v) for v in views.values())
+    return {k: v[:n] for k, v in views.items()}
+
+
+def totals(root: Optional[Path] = None) -> Dict[str, int]:
+    """
+    Summera loggen direkt på correct-kolumnen.
+
+    Args:
+        root (Path, optional): katalog för kolumnfilerna. Standard: RESULTS_BIN
+
+    Returns:
+        dict[str, int]: total, correct, incorrect, accuracy (som stats.totals)
+    """
+    cols = load_columns(root)
+    total = len(cols["correct"])
+    correct = cols["correct"].tobytes().count(1)
+    accuracy = int(round(100 * correct / total)) if total else 0
+    return {"total": total, "correct": correct,
+            "incorrect": total - correct, "accuracy": accuracy}
+
+
+def per_card(root: Optional[Path] = None) -> Dict[str, List[int]]:
+    """
+    Antal försök och antal rätt per kort.
+
+    Args:
+        root (Path, optional): katalog för kolumnfilerna. Standard: RESULTS_BIN
+
+    Returns:
+        dict[str, list[int]]: kort-id (hex) → [försök, rätt]
+    """
+    cols = load_columns(root)
+    acc: Dict[int, List[int]] = {}
+    for cid, ok in zip(cols["card"], cols["correct"]):
+        a = acc.get(cid)
+        if a is None:
+            a = acc[cid] = [0, 0]
+        a[0] += 1
+        a[1] += ok
+    return {f"{cid:016x}": v for cid, v in acc.items()}
+
+
+def iter_rows(root: Optional[Path] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Läs tillbaka loggen som rader i samma form som stats.load_results.
+
+    Args:
+        root (Path, optional): katalog för kolumnfilerna. Standard: RESULTS_BIN
+
+    Yields:
+        dict[str, Any]: timestamp, question, expected, given, correct, card_id
+    """
+    root = Path(root or RESULTS_BIN)
+    cards: Dict[int, Dict[str, str]] = {}
+    p = root / "cards.jsonl"
+    if p.exists():
+        with p.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    c = json.loads(line)
+                    cards[int(c["id"], 16)] = c
+    cols = load_columns(root)
+    given_mm: Optional[mmap.mmap] = None
+    gp = root / "given.txt"
+    if gp.exists() and gp.stat().st_size:
+        with gp.open("rb") as f:
+            given_mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    for ts, cid, ok, off in zip(cols["ts"], cols["card"], cols["correct"], cols["given"]):
+        given = ""
+        if off >= 0 and given_mm is not None:
+            end = given_mm.find(b"\n", off)
+            given = given_mm[off:end if end >= 0 else len(given_mm)].decode("utf-8")
+        card = cards.get(cid, {})
+        yield {
+            "timestamp": _epoch_to_ts(ts),
+            "question": card.get("q", ""),
+            "expected": card.get("a", ""),
+            "given": given,
+            "correct": str(ok),
+            "card_id": f"{cid:016x}",
+        }
+
+
+def csv_to_bin(csv_path: Optional[Path] = None, root: Optional[Path] = None,
+               batch: int = 50_000) -> int:
+    """
+    Konvertera results.csv till kolumnloggen (strömmande, i batchar).
+
+    Args:
+        csv_path (Path, optional): källfil i results.csv-format. Standard: RESULTS_CSV
+        root (Path, optional): målkatalog (befintliga kolumnfiler ersätts). Standard: RESULTS_BIN
+        batch (int): antal rader per skrivning
+
+    Returns:
+        int: antal konverterade rader
+    """
+    root = Path(root or RESULTS_BIN)
+    csv_path = Path(csv_path or RESULTS_CSV)
+    for name in list(COLUMNS) + ["given.txt", "cards.jsonl"]:
+        (root / name).unlink(missing_ok=True)
+    if not csv_path.exists():
+        return 0
+    n = 0
+    buf: List[Dict[str, Any]] = []
+    with csv_path.open("r", newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 5 or [c.strip().lower() for c in row[:5]] == HEADER:
+                continue
+            buf.append({"timestamp": row[0], "question": row[1], "expected": row[2],
+                        "given": row[3], "correct": row[4],
+                        "card_id": row[5] if len(row) > 5 else ""})
+            if len(buf) >= batch:
+                n += append(buf, root)
+                buf = []
+    n += append(buf, root)
+    return n
+
+
+def bin_to_csv(root: Optional[Path] = None, csv_path: Optional[Path] = None) -> int:
+    """
+    Skriv kolumnloggen som results.csv (med header).
+
+    Args:
+        root (Path, optional): katalog för kolumnfilerna. Standard: RESULTS_BIN
+        csv_path (Path, optional): målfil (skrivs över). Standard: RESULTS_CSV
+
+    Returns:
+        int: antal skrivna rader
+    """
+    p = Path(csv_path or RESULTS_CSV)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with p.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER + ["card_id"])
+        for r in iter_rows(root):
+            w.writerow([r["timestamp"], r["question"], r["expected"], r["given"],
+                        r["correct"], r["card_id"]])
+            n += 1
+    return n
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "to-bin":
+        print(f"Konverterade {csv_to_bin()} rader till {RESULTS_BIN}/.")
+    elif cmd == "to-csv":
+        print(f"Skrev {bin_to_csv()} rader till {RESULTS_CSV}.")
+    else:
+        print("Användning: python -m src.results_log to-bin|to-csv")
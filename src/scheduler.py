@@ -0,0 +1,219 @@
+"""
+scheduler.py – spaced repetition (SM-2) med en prioritetskö över förfallodatum.
+
+Varje kort har ett schemaläggningstillstånd:
+    ease      – lätthetsfaktor (startar på 2.5, minst 1.3)
+    interval  – dagar till nästa repetition
+    reps      – antal rätt i rad
+    due       – förfallotid (epoch-sekunder)
+
+Korten ligger i en heap sorterad på due, så att hämta nästa kort och
+schemalägga om efter ett svar är O(log n) även för mycket stora lekar.
+Gamla heap-poster tas bort lat (när de hamnar överst och inte längre
+stämmer med kortets tillstånd).
+
+Tillståndet sparas inkrementellt i data/schedule.jsonl – en rad per svar:
+    {"key": "<card_key>", "ease": 2.5, "interval": 6, "reps": 2, "due": 1724450000}
+Vid inläsning vinner sista raden per kort. Filen kompakteras automatiskt
+när den har blivit mycket större än antalet kort.
+
+Flera processer kan dela loggen: varje svar är en kort append under ett
+fillås, och kompakteringen läser om filen under samma lås, så andras rader
+behålls.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List, Optional
+import heapq
+import json
+import time
+
+from src.flashcards import _load_cards, card_key
+from src.io_utils import append_bytes, file_lock, replace_bytes
+
+SCHEDULE_PATH = Path("data/schedule.jsonl")
+
+DAY = 86400
+START_EASE = 2.5
+MIN_EASE = 1.3
+
+
+def sm2(state: Dict, quality: int, now: float) -> Dict:
+    """
+    Räkna fram nytt tillstånd enligt SM-2.
+
+    Args:
+        state (dict): nuvarande tillstånd (ease, interval, reps)
+        quality (int): svarskvalitet 0–5 (under 3 = fel)
+        now (float): nuvarande tid (epoch-sekunder)
+
+    Returns:
+        dict: nytt tillstånd med ease, interval, reps och due
+    """
+    q = max(0, min(5, int(quality)))
+    ease = state.get("ease", START_EASE)
+    interval = state.get("interval", 0)
+    reps = state.get("reps", 0)
+
+    if q < 3:
+        reps = 0
+        interval = 1
+    else:
+        reps += 1
+        if reps == 1:
+            interval = 1
+        elif reps == 2:
+            interval = 6
+        else:
+            interval = round(interval * ease)
+    ease = max(MIN_EASE, ease + 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+    return {"ease": round(ease, 4), "interval": interval, "reps": reps,
+            "due": int(now + interval * DAY)}
+
+
+def _load_states(path: Path) -> tuple[Dict[str, Dict], int]:
+    # Spela upp loggen: sista raden per nyckel vinner
+    states: Dict[str, Dict] = {}
+    lines = 0
+    if not path.exists():
+        return states, lines
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue  # avbruten skrivning
+            key = row.pop("key", None)
+            if key:
+                states[key] = row
+                lines += 1
+    return states, lines
+
+
+class Scheduler:
+    """
+    SM-2-schemaläggare med en heap över förfallotid.
+
+    Exempel:
+        sched = Scheduler()
+        card = sched.next_card()
+        sched.review(card, correct=True)
+    """
+
+    def __init__(self, cards: Optional[List[Dict]] = None, path: Optional[Path] = None):
+        """
+        Args:
+            cards (list[dict], optional): korten att schemalägga. Standard: hela leken
+            path (Path, optional): fil för schemaläggningsloggen. Standard: SCHEDULE_PATH
+        """
+        self.path = Path(path or SCHEDULE_PATH)
+        self.cards: Dict[str, Dict] = {}
+        for c in (_load_cards() if cards is None else cards):
+            self.cards.setdefault(card_key(c), c)
+
+        saved, self._log_lines = _load_states(self.path)
+        # Tillstånd för kort utanför den här leken (t.ex. filtrerad quiz) behålls vid kompaktering
+        self._other = {k: v for k, v in saved.items() if k not in self.cards}
+        # Nya kort (utan sparat tillstånd) är förfallna direkt (due = 0)
+        self.states: Dict[str, Dict] = {
+            k: saved.get(k, {"ease": START_EASE, "interval": 0, "reps": 0, "due": 0})
+            for k in self.cards
+        }
+        self._seq = 0
+        self._heap: List[tuple] = []
+        self._rebuild_heap()
+
+    def _rebuild_heap(self) -> None:
+        # O(n) heapify; sekvensnumret håller insättningsordning vid lika due
+        self._heap = []
+        for key, st in self.states.items():
+            self._heap.append((st["due"], self._seq, key))
+            self._seq += 1
+        heapq.heapify(self._heap)
+
+    def _top(self) -> Optional[tuple]:
+        # Släng inaktuella poster (kortet har schemalagts om sedan posten lades in)
+        while self._heap:
+            due, _, key = self._heap[0]
+            st = self.states.get(key)
+            if st is not None and st["due"] == due:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def next_card(self) -> Optional[Dict]:
+        """
+        Kortet som förfaller först (O(log n) amorterat).
+
+        Returns:
+            dict | None: kortet, eller None om leken är tom
+        """
+        top = self._top()
+        return self.cards[top[2]] if top else None
+
+    def due_count(self, now: Optional[float] = None) -> int:
+        """
+        Antal kort som är förfallna nu.
+
+        Args:
+            now (float, optional): tidpunkt (epoch). Standard: time.time()
+
+        Returns:
+            int: antal förfallna kort
+        """
+        now = time.time() if now is None else now
+        return sum(1 for st in self.states.values() if st["due"] <= now)
+
+    def review(self, card: Dict, correct: bool | None = None, quality: int | None = None,
+               now: Optional[float] = None) -> Dict:
+        """
+        Schemalägg om ett kort efter ett svar och spara tillståndet.
+
+        Args:
+            card (dict): kortet som besvarades
+            correct (bool, optional): rätt/fel (översätts till kvalitet 4/1)
+            quality (int, optional): SM-2-kvalitet 0–5, går före correct
+            now (float, optional): tidpunkt (epoch). Standard: time.time()
+
+        Returns:
+            dict: kortets nya tillstånd
+        """
+        now = time.time() if now is None else now
+        if quality is None:
+            quality = 4 if correct else 1
+        key = card_key(card)
+        if key not in self.states:
+            self.cards[key] = card
+        state = sm2(self.states.get(key) or self._other.pop(key, {}), quality, now)
+        self.states[key] = state
+        heapq.heappush(self._heap, (state["due"], self._seq, key))
+        self._seq += 1
+        if len(self._heap) > 2 * len(self.states) + 64:
+            self._rebuild_heap()
+        self._append(key, state)
+        return state
+
+    def _append(self, key: str, state: Dict) -> None:
+        # En rad per svar; kompaktera när loggen vuxit sig mycket större än leken
+        line = (json.dumps({"key": key, **state}) + "\n").encode("utf-8")
+        with file_lock(self.path):
+            append_bytes(self.path, line)
+        self._log_lines += 1
+        if self._log_lines > max(1000, 2 * len(self.states)):
+            self.compact()
+
+    def compact(self) -> None:
+        """Skriv om loggen med en rad per kort som har ett sparat tillstånd."""
+        # Under låset läses filen om: den innehåller våra rader och andra
+        # processers, så sista raden per kort vinner precis som vid inläsning
+        with file_lock(self.path):
+            saved, _ = _load_states(self.path)
+            rows = [json.dumps({"key": k, **st}) + "\n" for k, st in saved.items()]
+            # Atomärt och fsyncat: ett avbrott lämnar den gamla eller den nya loggen
+            replace_bytes(self.path, "".join(rows).encode("utf-8"))
+        self._log_lines = len(rows)
@@ -0,0 +1,413 @@
+"""
+search.py – fulltextsökning i flashcards via ett inverterat index.
+
+Indexet mappar ord (token) från fråga, svar och taggar till kort. Orden
+normaliseras som flashcards._normalize (trim, gemener) och delas på allt
+som inte är bokstäver/siffror. Taggar indexeras dessutom exakt för filter.
+
+Frågespråk:
+    group by            – båda orden (AND)
+    group OR having     – något av leden (OR mellan AND-grupper)
+    gro*                – prefix
+    tag:sql             – bara kort med taggen "sql"
+
+Lagring (samma mönster som korten: snapshot + journal):
+    data/search.index.json     – docs (dokumentnummer → kort-id), postings
+                                 (token → dokumentnummer), tags (tagg → ...)
+    data/search.journal.jsonl  – ändringar sedan snapshoten, en per rad:
+        {"op": "add", "id": "...", "card": {...}}
+        {"op": "delete", "id": "..."}
+
+flashcards anropar index_cards/remove_cards när kort läggs till, ändras
+eller tas bort, så indexet hålls uppdaterat inkrementellt (en append per
+ändring, ingen inläsning av indexet). Saknas indexet byggs det från leken
+vid första sökningen. Postings är array("I") per token, så en fråga slår
+bara upp sina egna ord och läser aldrig igenom leken.
+"""
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+import heapq
+import json
+import re
+
+from src.flashcards import _load_cards, _normalize, get_card
+from src.io_utils import append_bytes, file_lock, read_json, replace_bytes
+from src.workspace import in_workspace
+
+SEARCH_INDEX = Path("data/search.index.json")
+SEARCH_JOURNAL = Path("data/search.journal.jsonl")
+
+# Antal journalrader innan indexet skrivs om som ny snapshot
+COMPACT_EVERY = 5000
+
+_WORD = re.compile(r"\w+")
+
+# Indexet i minnet. "snapshot" = (mtime_ns, size) för search.index.json,
+# "offset" = hur mycket av journalen som är applicerat. Borttagna/ändrade
+# kort lämnar None i "docs"; deras dokumentnummer filtreras bort vid sökning.
+def _empty_index() -> Dict:
+    return {"snapshot": None, "offset": 0, "ops": 0, "docs": [], "doc_of": {},
+            "postings": {}, "tags": {}, "vocab": None, "holes": 0}
+
+
+_index: Dict = _empty_index()
+
+# ---------------- Tokenisering ----------------
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Dela upp text i normaliserade ord.
+
+    Args:
+        text (str): fritext
+
+    Returns:
+        list[str]: ord i gemener, utan skiljetecken
+    """
+    return _WORD.findall(_normalize(text))
+
+
+def _card_tokens(card: Dict) -> Set[str]:
+    # En normalisering och en regex-körning per kort (fråga, svar och taggar ihop)
+    text = " ".join([card.get("q", ""), card.get("a", ""), *(card.get("tags") or [])])
+    return set(tokenize(text))
+
+
+def _card_tags(card: Dict) -> Set[str]:
+    return {_normalize(t) for t in card.get("tags") or [] if t and t.strip()}
+
+# ---------------- Indexet i minnet ----------------
+
+
+def _file_key(path: Path):
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _reset(docs: List[Optional[str]]) -> None:
+    _index.update(docs=docs, doc_of={cid: i for i, cid in enumerate(docs) if cid},
+                  postings={}, tags={}, vocab=None, holes=docs.count(None))
+
+
+def _add_doc(cid: str, card: Dict) -> None:
+    # Ett ändrat kort får nytt dokumentnummer; det gamla blir ett hål
+    doc_of = _index["doc_of"]
+    if cid in doc_of:
+        _remove_doc(cid)
+    doc = len(_index["docs"])
+    _index["docs"].append(cid)
+    doc_of[cid] = doc
+    postings = _index["postings"]
+    for tok in _card_tokens(card):
+        arr = postings.get(tok)
+        if arr is None:
+            arr = postings[tok] = array("I")
+            _index["vocab"] = None  # nytt ord – sorterad vokabulär byggs om vid behov
+        arr.append(doc)
+    for tag in _card_tags(card):
+        _index["tags"].setdefault(tag, array("I")).append(doc)
+
+
+def _remove_doc(cid: str) -> None:
+    doc = _index["doc_of"].pop(cid, None)
+    if doc is not None:
+        _index["docs"][doc] = None
+        _index["holes"] += 1
+
+
+def _apply_op(op: Dict) -> None:
+    if op.get("op") == "add" and op.get("id"):
+        _add_doc(op["id"], op.get("card") or {})
+    elif op.get("op") == "delete":
+        _remove_doc(op.get("id"))
+
+
+def _build() -> None:
+    """Bygg indexet från hela leken och spara det (anropas under låset)."""
+    _reset([])
+    for card in _load_cards():
+        if card.get("id"):
+            _add_doc(card["id"], card)
+    _write_snapshot()
+
+
+def _write_snapshot() -> None:
+    # Anropas under låset. Hål rensas bort (dokumenten numreras om) när de
+    # är många, annars sparas docs som de är.
+    if _index["holes"] > len(_index["docs"]) // 4:
+        remap = {}
+        docs: List[Optional[str]] = []
+        for old, cid in enumerate(_index["docs"]):
+            if cid is not None:
+                remap[old] = len(docs)
+                docs.append(cid)
+
+        def squeeze(table):
+            out = {}
+            for key, arr in table.items():
+                kept = array("I", (remap[d] for d in arr if d in remap))
+                if kept:
+                    out[key] = kept
+            return out
+
+        postings, tags = squeeze(_index["postings"]), squeeze(_index["tags"])
+        _reset(docs)
+        _index.update(postings=postings, tags=tags)
+
+    data = {
+        "docs": _index["docs"],
+        "postings": {k: v.tolist() for k, v in _index["postings"].items()},
+        "tags": {k: v.tolist() for k, v in _index["tags"].items()},
+    }
+    # replace_bytes i stället för write_json: kompakt JSON (indexet är stort)
+    # och skrivningen skjuts aldrig upp av group_commit(), så snapshoten finns
+    # på disk innan journalen töms
+    replace_bytes(SEARCH_INDEX, json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    SEARCH_JOURNAL.write_bytes(b"")
+    _index.update(snapshot=_file_key(SEARCH_INDEX), offset=0, ops=0)
+
+
+def _refresh() -> None:
+    """
+    Se till att indexet i minnet motsvarar snapshot + journal på disk.
+
+    Läser bara om snapshoten om den ändrats (t.ex. kompaktering i en annan
+    process) och applicerar annars bara nya journalrader.
+    """
+    if not SEARCH_INDEX.exists():
+        with file_lock(SEARCH_INDEX):
+            # En annan process kan ha hunnit bygga indexet medan vi väntade
+            if not SEARCH_INDEX.exists():
+                _build()
+    key = _file_key(SEARCH_INDEX)
+    journal = _file_key(SEARCH_JOURNAL)
+    journal_size = journal[1] if journal else 0
+
+    if key != _index["snapshot"] or journal_size < _index["offset"]:
+        data = read_json(SEARCH_INDEX, default={}, cache=False)
+        _reset(data.get("docs", []))
+        _index["postings"] = {k: array("I", v) for k, v in data.get("postings", {}).items()}
+        _index["tags"] = {k: array("I", v) for k, v in data.get("tags", {}).items()}
+        _index.update(snapshot=key, offset=0, ops=0)
+
+    _apply_journal()
+    if _index["ops"] >= COMPACT_EVERY:
+        with file_lock(SEARCH_INDEX):
+            # Har en annan process redan kompakterat läses det in nästa gång
+            if _file_key(SEARCH_INDEX) == _index["snapshot"]:
+                _apply_journal()  # rader som andra hann lägga till före låset
+                _write_snapshot()
+
+
+def _apply_journal() -> None:
+    # Applicera journalrader som tillkommit sedan förra anropet
+    journal = _file_key(SEARCH_JOURNAL)
+    journal_size = journal[1] if journal else 0
+    if journal_size > _index["offset"]:
+        with SEARCH_JOURNAL.open("rb") as f:
+            f.seek(_index["offset"])
+            chunk = f.read(journal_size - _index["offset"])
+        # Bara hela rader – en halvskriven sista rad tas nästa gång
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                _apply_op(json.loads(line))
+            except ValueError:
+                continue
+            _index["ops"] += 1
+        _index["offset"] += len(complete)
+
+# ---------------- Inkrementell uppdatering (anropas från flashcards) ----------------
+
+
+def _append(ops: List[Dict]) -> None:
+    if not ops:
+        return
+    payload = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+    with file_lock(SEARCH_INDEX):
+        # Finns inget index ännu byggs det från leken vid första sökningen
+        if SEARCH_INDEX.exists():
+            append_bytes(SEARCH_JOURNAL, payload.encode("utf-8"))
+
+
+def index_cards(cards: Iterable[Dict]) -> None:
+    """
+    Lägg till (eller indexera om) kort i sökindexet.
+
+    Args:
+        cards (Iterable[dict]): kort med id
+    """
+    _append([{"op": "add", "id": c["id"],
+              "card": {"q": c.get("q", ""), "a": c.get("a", ""), "tags": c.get("tags") or []}}
+             for c in cards if c.get("id")])
+
+
+def remove_cards(card_ids: Iterable[str]) -> None:
+    """
+    Ta bort kort ur sökindexet.
+
+    Args:
+        card_ids (Iterable[str]): kortens id
+    """
+    _append([{"op": "delete", "id": cid} for cid in card_ids])
+
+
+def invalidate_index() -> None:
+    """Släng sökindexet; det byggs om från leken vid nästa sökning."""
+    with file_lock(SEARCH_INDEX):
+        SEARCH_INDEX.unlink(missing_ok=True)
+        SEARCH_JOURNAL.unlink(missing_ok=True)
+        _index.update(snapshot=None, offset=0, ops=0)
+
+# ---------------- Sökning ----------------
+
+
+def _term_docs(term: str):
+    # Dokumentnummer för ett ord ("gro*" = alla ord som börjar på "gro")
+    postings = _index["postings"]
+    if not term.endswith("*"):
+        return postings.get(term, ())
+    prefix = term[:-1]
+    if _index["vocab"] is None:
+        _index["vocab"] = sorted(postings)
+    vocab = _index["vocab"]
+    docs: Set[int] = set()
+    i = bisect_left(vocab, prefix)
+    while i < len(vocab) and vocab[i].startswith(prefix):
+        docs.update(postings[vocab[i]])
+        i += 1
+    return docs
+
+
+def _intersect(docs: Set[int], other) -> Set[int]:
+    # Postinglistor är sorterade (dokument läggs alltid till sist). Är den
+    # andra listan mycket längre slås varje dokument upp med bisect i stället
+    # för att hela listan gås igenom.
+    if isinstance(other, array) and len(docs) * 16 < len(other):
+        n = len(other)
+        return {d for d in docs if (i := bisect_left(other, d)) < n and other[i] == d}
+    docs.intersection_update(other)
+    return docs
+
+
+def _parse(query: str) -> tuple[List[List[str]], List[str]]:
+    """
+    Tolka en sökfråga.
+
+    Returns:
+        tuple: (OR-grupper av AND-termer, taggfilter)
+    """
+    groups: List[List[str]] = [[]]
+    tags: List[str] = []
+    for word in query.split():
+        if word == "OR":
+            groups.append([])
+        elif word.lower().startswith("tag:"):
+            tags.append(_normalize(word[4:]))
+        else:
+            star = word.endswith("*")
+            for tok in tokenize(word):
+                groups[-1].append(tok)
+            if star and groups[-1]:
+                groups[-1][-1] += "*"
+    return [g for g in groups if g], tags
+
+
+@in_workspace
+def search_ids(query: str, tags: Optional[List[str]] = None,
+               limit: Optional[int] = None) -> List[str]:
+    """
+    Sök kort-id utan att läsa in leken.
+
+    Args:
+        query (str): sökfråga (se modulens docstring), får vara tom om tags anges
+        tags (list[str], optional): taggar som alla måste finnas på kortet
+        limit (int, optional): max antal träffar
+
+    Returns:
+        list[str]: kort-id i den ordning korten indexerades
+    """
+    _refresh()
+    groups, query_tags = _parse(query or "")
+    tags = [_normalize(t) for t in (tags or [])] + query_tags
+
+    result: Optional[Set[int]] = None
+    for group in groups:
+        # AND: börja med kortaste postinglistan och skär sedan ned
+        lists = sorted((_term_docs(t) for t in group), key=len)
+        docs = set(lists[0])
+        for other in lists[1:]:
+            if not docs:
+                break
+            docs = _intersect(docs, other)
+        result = docs if result is None else result | docs
+
+    for tag in tags:
+        tagged = _index["tags"].get(tag, ())
+        if result is None:
+            result = set(tagged)
+        else:
+            result = _intersect(result, tagged)
+    if not result:
+        return []
+
+    out: List[str] = []
+    docs_by_no = _index["docs"]
+    # Bara de första träffarna behöver sorteras (hål räknas in i marginalen)
+    if limit is not None and len(result) > 2 * limit + _index["holes"]:
+        ordered = heapq.nsmallest(limit + _index["holes"], result)
+    else:
+        ordered = sorted(result)
+    for doc in ordered:
+        cid = docs_by_no[doc]
+        if cid is not None:
+            out.append(cid)
+            if limit is not None and len(out) >= limit:
+                break
+    return out
+
+
+@in_workspace
+def search(query: str, tags: Optional[List[str]] = None, limit: int = 20) -> List[Dict]:
+    """
+    Sök kort i leken.
+
+    Exempel:
+        search("group by")            # kort med både "group" och "by"
+        search("join OR union tag:sql")
+        search("aggreg*")
+
+    Args:
+        query (str): sökfråga (se modulens docstring)
+        tags (list[str], optional): taggar som alla måste finnas på kortet
+        limit (int): max antal träffar. Standard: 20
+
+    Returns:
+        list[dict]: matchande kort
+    """
+    cards = []
+    for cid in search_ids(query, tags=tags, limit=limit):
+        card = get_card(cid)
+        if card is not None:
+            cards.append(card)
+    return cards
+
+
+@in_workspace
+def rebuild_index() -> int:
+    """
+    Bygg om sökindexet från hela leken.
+
+    Returns:
+        int: antal indexerade kort
+    """
+    with file_lock(SEARCH_INDEX):
+        _build()
+    return len(_index["doc_of"])
@@ -0,0 +1,456 @@
+"""
+server.py – quiz-tjänst över HTTP/JSON för många samtidiga användare.
+
+En asyncio-server (bara standardbiblioteket: asyncio-strömmar och en liten
+HTTP/1.1-tolk med keep-alive) ovanpå funktionerna i src/. En process på en
+kärna räcker för tusentals anrop per sekund:
+
+- Leken hålls i minnet (Deck) och läses bara om när flashcards-filerna
+  ändrats av någon annan (kontrolleras högst var REFRESH_EVERY sekund).
+- Svar rättas direkt men skrivs till resultatloggen i efterhand
+  (write-behind): de samlas i en buffert som skrivs med en enda append
+  var FLUSH_EVERY sekund eller när FLUSH_ROWS rader väntar, och alltid
+  innan statistik räknas och när servern stängs.
+- Med --users DIR får varje användare en egen arbetsyta (DIR/<användare>/,
+  se src/workspace.py) med egen lek, resultatlogg och plan. Användaren anges
+  med ?user=... eller headern X-User. Bara de senast använda användarnas
+  lekar hålls i minnet (WorkspacePool med minnesbudget); en användare som
+  släpps får sina väntande resultat skrivna först.
+
+Endpoints (JSON in och ut):
+    GET  /next?tags=sql+AND+NOT+auto      → {"id", "q", "tags"}
+    POST /answer   {"id", "given"}         → {"correct", "expected"}
+    POST /cards    {"q", "a", "tags"}      → kortet (med id)
+    GET  /stats[?since=..&until=..]        → totals()
+    GET  /plan                             → alla veckor med progress
+    GET  /plan?from=2025-W35&to=2026-W02   → progress_range
+    GET  /plan/semester[/HT2025]           → semester_summary
+    GET  /plan/<vecka>                     → {"items", "done", "progress", "status"}
+    POST /plan/<vecka>  {"items": [...]}   → set_goal
+    POST /plan/<vecka>/done {"item", "value"} → mark_done
+    (<vecka> = "2025-W35", eller bara "35" för innevarande år)
+
+Starta:
+    python -m src.server [port]            # standard 8765, bara localhost
+    python -m src.server [port] --users users   # en arbetsyta per användare
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import asyncio
+import json
+import os
+import random
+import signal
+import sys
+import time
+
+from src import flashcards
+from src.flashcards import _load_cards, _log_results, _normalize, add_card
+from src.plan import (find_week, get_week, goal_status, list_weeks, mark_done, progress,
+                      progress_range, semester_summary, set_goal, week_key)
+from src.stats import totals
+from src.storage import use_sqlite
+from src.tagfilter import TagIndex
+from src.workspace import WorkspacePool
+
+HOST = "127.0.0.1"
+PORT = 8765
+FLUSH_EVERY = 0.5
+FLUSH_ROWS = 1000
+REFRESH_EVERY = 1.0
+MAX_BODY = 1 << 20
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    """Fel som blir ett JSON-svar med given statuskod."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Deck:
+    """
+    Leken i minnet: kortlista, id → kort och taggfilter.
+
+    Läses om från lagringen bara när filerna ändrats (eller efter egna
+    tillägg, som läggs in direkt).
+    """
+
+    def __init__(self):
+        self.cards: List[Dict] = []
+        self.by_id: Dict[str, Dict] = {}
+        self._version = None
+        self._checked = 0.0
+        self._tags: Optional[TagIndex] = None
+        self._selections: Dict[str, List[int]] = {}
+        self.refresh(force=True)
+
+    @staticmethod
+    def _files_version():
+        if use_sqlite():
+            return None
+        out = []
+        # Läses via modulen: sökvägarna pekar på den aktiva arbetsytan
+        for p in (flashcards.FLASHCARDS_PATH, flashcards.FLASHCARDS_JOURNAL):
+            try:
+                st = os.stat(p)
+                out.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                out.append(None)
+        return tuple(out)
+
+    def refresh(self, force: bool = False) -> None:
+        """Läs om leken om filerna ändrats (kontrolleras högst var REFRESH_EVERY s)."""
+        now = time.monotonic()
+        if not force and now - self._checked < REFRESH_EVERY:
+            return
+        self._checked = now
+        version = self._files_version()
+        if not force and version == self._version:
+            return
+        self._version = version
+        self.cards = _load_cards()
+        self.by_id = {c["id"]: c for c in self.cards if c.get("id")}
+        self._tags = None
+        self._selections.clear()
+
+    def add(self, card: Dict) -> None:
+        """Lägg till ett kort som just sparats av den här processen."""
+        self.cards.append(card)
+        self.by_id[card["id"]] = card
+        if self._tags is not None:
+            self._tags.add(len(self.cards) - 1, card)
+        self._selections.clear()
+        # Vår egen append ska inte räknas som en ändring utifrån
+        self._version = self._files_version()
+
+    def pick(self, tags: Optional[str] = None) -> Optional[Dict]:
+        """
+        Slumpa ett kort, valfritt bland kort som matchar ett tagguttryck.
+
+        Raises:
+            ValueError: om tagguttrycket inte går att tolka
+        """
+        if not tags:
+            return random.choice(self.cards) if self.cards else None
+        positions = self._selections.get(tags)
+        if positions is None:
+            if self._tags is None:
+                self._tags = TagIndex(self.cards)
+            positions = list(TagIndex.positions(self._tags.select(tags)))
+            if len(self._selections) > 256:
+                self._selections.clear()
+            self._selections[tags] = positions
+        return self.cards[random.choice(positions)] if positions else None
+
+
+class QuizServer:
+    """
+    HTTP-servern. Håller leken och bufferten för resultat (per användare
+    om en WorkspacePool anges).
+
+    Exempel:
+        server = QuizServer()
+        asyncio.run(server.serve("127.0.0.1", 8765))
+    """
+
+    def __init__(self, pool: Optional[WorkspacePool] = None):
+        """
+        Args:
+            pool (WorkspacePool, optional): arbetsytor per användare.
+                None = en gemensam lek i data/
+        """
+        self.pool = pool
+        if pool is not None:
+            pool.on_evict = self._evicted
+        # Lek och resultatbuffert när servern inte har användare
+        self._shared: Dict = {}
+        self.requests = 0
+
+    def _state(self, extras: Dict) -> Dict:
+        # Lek + buffert för den aktiva arbetsytan (skapas vid första anropet)
+        if "deck" not in extras:
+            extras["deck"] = Deck()
+            extras["pending"] = []
+        return extras
+
+    # ---------- write-behind ----------
+
+    @staticmethod
+    def _flush_state(state: Dict) -> None:
+        # Anropas med statets arbetsyta aktiv
+        rows, state["pending"] = state.get("pending") or [], []
+        if rows:
+            _log_results(rows)
+
+    def _evicted(self, user: str, ws) -> None:
+        self._flush_state(ws.extras)
+
+    def _waiting(self) -> int:
+        if self.pool is None:
+            return len(self._shared.get("pending") or [])
+        return sum(len(ws.extras.get("pending") or []) for _, ws in self.pool.items())
+
+    def flush(self) -> None:
+        """Skriv väntande resultat, en append per arbetsyta."""
+        if self.pool is None:
+            self._flush_state(self._shared)
+            return
+        for _, ws in self.pool.items():
+            if ws.extras.get("pending"):
+                with ws:
+                    self._flush_state(ws.extras)
+
+    async def _flusher(self) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_EVERY)
+            if self._waiting():
+                self.flush()
+
+    # ---------- endpoints ----------
+
+    def _next(self, state: Dict, query: Dict) -> Tuple[int, Dict]:
+        deck = state["deck"]
+        deck.refresh()
+        tags = (query.get("tags") or [""])[0]
+        try:
+            card = deck.pick(tags)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        if card is None:
+            raise HTTPError(404, "Inga kort matchar." if tags else "Inga kort ännu.")
+        return 200, {"id": card["id"], "q": card["q"], "tags": card.get("tags") or []}
+
+    def _answer(self, state: Dict, body: Dict) -> Tuple[int, Dict]:
+        deck = state["deck"]
+        card = deck.by_id.get(body.get("id"))
+        if card is None:
+            # Kanske tillagt av en annan process – läs om (högst var REFRESH_EVERY s)
+            deck.refresh()
+            card = deck.by_id.get(body.get("id"))
+            if card is None:
+                raise HTTPError(404, "Kortet finns inte.")
+        given = str(body.get("given", ""))
+        correct = _normalize(given) == _normalize(card["a"])
+        pending = state["pending"]
+        pending.append({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "question": card["q"],
+            "expected": card["a"],
+            "given": given,
+            "correct": "1" if correct else "0",
+            "card_id": card["id"],
+        })
+        if len(pending) >= FLUSH_ROWS:
+            self._flush_state(state)
+        return 200, {"correct": correct, "expected": card["a"]}
+
+    def _add(self, state: Dict, body: Dict) -> Tuple[int, Dict]:
+        tags = body.get("tags") or []
+        if isinstance(tags, str):
+            tags = tags.split()
+        state["deck"].refresh()
+        card = add_card(body.get("q", ""), body.get("a", ""), tags=list(tags))
+        state["deck"].add(card)
+        return 201, card
+
+    def _stats(self, state: Dict, query: Dict) -> Tuple[int, Dict]:
+        self._flush_state(state)  # statistiken ska se alla svar, även de i bufferten
+        since = (query.get("since") or [None])[0]
+        until = (query.get("until") or [None])[0]
+        return 200, totals(since, until)
+
+    def _plan(self, method: str, parts: List[str], query: Dict, body: Dict) -> Tuple[int, Dict]:
+        if not parts:
+            if method != "GET":
+                raise HTTPError(405, "Använd GET /plan.")
+            start, end = (query.get("from") or [None])[0], (query.get("to") or [None])[0]
+            if start or end:
+                if not (start and end):
+                    raise HTTPError(400, "Ange både from och to, t.ex. ?from=2025-W35&to=2026-W02.")
+                return 200, progress_range(start, end)
+            return 200, {w: {**get_week(w), "progress": progress(w)} for w in list_weeks()}
+        if parts[0] == "semester" and method == "GET" and len(parts) <= 2:
+            return 200, semester_summary(parts[1] if len(parts) == 2 else None)
+        # ValueError → 400. Nya mål hamnar i innevarande år; läsning och
+        # avbockning av "35" pekar på en befintlig vecka 35
+        if method == "POST" and len(parts) == 1:
+            week = week_key(parts[0])
+        else:
+            week = find_week(parts[0])
+        if len(parts) == 1 and method == "GET":
+            data = get_week(week)
+            if data is None:
+                raise HTTPError(404, f"Vecka {week} saknas.")
+            return 200, {**data, "progress": progress(week), "status": goal_status(week)}
+        if len(parts) == 1 and method == "POST":
+            return 200, set_goal(week, body.get("items") or [])
+        if parts[1:] == ["done"] and method == "POST":
+            try:
+                return 200, mark_done(week, int(body.get("item", -1)), bool(body.get("value", True)))
+            except KeyError as e:
+                raise HTTPError(404, e.args[0])
+            except IndexError as e:
+                raise HTTPError(400, str(e))
+        raise HTTPError(405 if len(parts) <= 2 else 404, "Okänd plan-endpoint.")
+
+    def dispatch(self, method: str, target: str, body: Dict,
+                 user: Optional[str] = None) -> Tuple[int, Dict]:
+        """
+        Välj endpoint för en förfrågan.
+
+        Args:
+            method (str): HTTP-metod
+            target (str): sökväg med query, t.ex. "/next?tags=sql"
+            body (dict): JSON-kroppen
+            user (str, optional): användare (t.ex. från X-User); ?user=... går före
+
+        Returns:
+            tuple[int, dict]: (statuskod, JSON-svar)
+        """
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        if self.pool is None:
+            return self._route(self._state(self._shared), method, url.path, parts, query, body)
+        user = (query.get("user") or [user])[0]
+        if not user:
+            raise HTTPError(400, "Ange användare med ?user=... eller headern X-User.")
+        try:
+            ws = self.pool.get(user)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        with self.pool.use(user):
+            return self._route(self._state(ws.extras), method, url.path, parts, query, body)
+
+    def _route(self, state: Dict, method: str, path: str, parts: List[str],
+               query: Dict, body: Dict) -> Tuple[int, Dict]:
+        route = parts[0] if parts else ""
+        if route == "next" and method == "GET":
+            return self._next(state, query)
+        if route == "answer" and method == "POST":
+            return self._answer(state, body)
+        if route == "cards" and method == "POST":
+            return self._add(state, body)
+        if route == "stats" and method == "GET":
+            return self._stats(state, query)
+        if route == "plan":
+            return self._plan(method, parts[1:], query, body)
+        if route in ("next", "answer", "cards", "stats"):
+            raise HTTPError(405, f"{method} stöds inte för /{route}.")
+        raise HTTPError(404, f"Okänd endpoint: {path}")
+
+    # ---------- HTTP ----------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # En anslutning kan skicka många förfrågningar i rad (keep-alive)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version == "HTTP/1.1")
+                try:
+                    length = headers.get("content-length") or "0"
+                    if not (length.isascii() and length.isdigit()):
+                        # Okänd längd på kroppen: nästa förfrågan går inte att hitta
+                        keep_alive = False
+                        raise HTTPError(400, "Ogiltig Content-Length.")
+                    length = int(length)
+                    if length > MAX_BODY:
+                        keep_alive = False  # kroppen läses inte
+                        raise HTTPError(413, "För stor förfrågan.")
+                    raw = await reader.readexactly(length) if length else b""
+                    body = json.loads(raw) if raw else {}
+                    if not isinstance(body, dict):
+                        raise HTTPError(400, "Förväntade ett JSON-objekt.")
+                    self.requests += 1
+                    status, payload = self.dispatch(method, target, body, headers.get("x-user"))
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (ValueError, TypeError) as e:
+                    status, payload = 400, {"error": str(e)}
+                except asyncio.IncompleteReadError:
+                    return
+                except Exception as e:  # servern ska överleva ett fel i en endpoint
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                    + data)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            return
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = HOST, port: int = PORT, ready=None) -> None:
+        """
+        Kör servern tills den avbryts. Väntande resultat skrivs vid avslut.
+
+        Args:
+            host (str): adress att lyssna på
+            port (int): port (0 = valfri ledig)
+            ready (callable, optional): anropas med (host, port) när servern lyssnar
+        """
+        server = await asyncio.start_server(self._handle, host, port)
+        flusher = asyncio.create_task(self._flusher())
+        try:
+            # SIGTERM avslutar lika snyggt som Ctrl-C (bufferten skrivs)
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except (NotImplementedError, RuntimeError):  # pragma: no cover - t.ex. Windows
+            pass
+        addr = server.sockets[0].getsockname()
+        if ready is not None:
+            ready(addr[0], addr[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            self.flush()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    pool = None
+    if "--users" in args:
+        i = args.index("--users")
+        if i + 1 >= len(args):
+            print("Användning: python -m src.server [port] [--users MAPP]")
+            raise SystemExit(1)
+        pool = WorkspacePool(args[i + 1])
+        del args[i:i + 2]
+    port = int(args[0]) if args else PORT
+
+    def _ready(host: str, port: int) -> None:
+        mode = f", en arbetsyta per användare i {pool.base}/" if pool is not None else ""
+        print(f"Quiz-tjänsten lyssnar på http://{host}:{port}{mode} (Ctrl-C avslutar)", flush=True)
+
+    try:
+        asyncio.run(QuizServer(pool).serve(HOST, port, ready=_ready))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("\nAvslutar.")
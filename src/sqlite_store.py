@@ -0,0 +1,681 @@
+"""
+sqlite_store.py – SQLite-backend för kort, quiz-resultat och studieplan.
+
+Används när STUDIE_BACKEND=sqlite (se src/storage.py). All data ligger i
+data/studie.db med index så att vanliga operationer blir indexerade frågor
+i stället för att hela filer läses in:
+
+- cards (+ tags/card_tags som join-tabell för taggar), uid = kortets id
+  (samma id som i json-backenden, unikt index)
+- results (index på tidsstämpel och kort)
+- result_totals (en rad med löpande summor, uppdateras av en trigger)
+- plan_items + plan_weeks (per vecka: antal mål och antal klara)
+
+Databasen körs i WAL-läge så att flera läsare kan köra samtidigt som en skrivare.
+
+Migrera befintliga data/-filer:
+    python -m src.sqlite_store
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import random
+import sqlite3
+
+DB_PATH = Path("data/studie.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    id  INTEGER PRIMARY KEY,
+    uid TEXT,
+    q   TEXT NOT NULL,
+    a   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    id   INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS card_tags (
+    card_id INTEGER NOT NULL REFERENCES cards(id) ON DELETE CASCADE,
+    tag_id  INTEGER NOT NULL REFERENCES tags(id),
+    pos     INTEGER NOT NULL,
+    PRIMARY KEY (card_id, tag_id)
+);
+CREATE INDEX IF NOT EXISTS idx_card_tags_tag ON card_tags(tag_id);
+
+CREATE TABLE IF NOT EXISTS results (
+    id       INTEGER PRIMARY KEY,
+    ts       TEXT NOT NULL,
+    card_id  TEXT,
+    question TEXT NOT NULL,
+    expected TEXT NOT NULL,
+    given    TEXT NOT NULL,
+    correct  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_ts ON results(ts);
+CREATE INDEX IF NOT EXISTS idx_results_card ON results(card_id);
+
+CREATE TABLE IF NOT EXISTS result_totals (
+    id      INTEGER PRIMARY KEY CHECK (id = 1),
+    total   INTEGER NOT NULL,
+    correct INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO result_totals (id, total, correct) VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS trg_results_insert AFTER INSERT ON results
+BEGIN
+    UPDATE result_totals SET total = total + 1, correct = correct + NEW.correct
+    WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_results_delete AFTER DELETE ON results
+BEGIN
+    UPDATE result_totals SET total = total - 1, correct = correct - OLD.correct
+    WHERE id = 1;
+END;
+
+CREATE TABLE IF NOT EXISTS plan_weeks (
+    week       TEXT PRIMARY KEY,
+    total      INTEGER NOT NULL,
+    done_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS plan_items (
+    week TEXT NOT NULL REFERENCES plan_weeks(week) ON DELETE CASCADE,
+    idx  INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    done INTEGER NOT NULL,
+    PRIMARY KEY (week, idx)
+);
+"""
+
+# En öppen anslutning per databasfil och process
+_connections: Dict[str, sqlite3.Connection] = {}
+
+
+def connect(path: Path | None = None) -> sqlite3.Connection:
+    """
+    Öppna (eller återanvänd) en anslutning till databasen och skapa schemat.
+
+    Args:
+        path (Path, optional): databasfil. Standard: DB_PATH
+
+    Returns:
+        sqlite3.Connection: anslutning i WAL-läge
+    """
+    p = Path(path or DB_PATH)
+    key = str(p.resolve())
+    conn = _connections.get(key)
+    if conn is not None:
+        return conn
+    p.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(p)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    _migrate_uids(conn)
+    _connections[key] = conn
+    return conn
+
+
+class _UidLookup:
+    # `uid in lookup` via det unika indexet, för flashcards._new_id
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __contains__(self, uid: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM cards WHERE uid = ?", (uid,)
+        ).fetchone() is not None
+
+
+def _migrate_uids(conn: sqlite3.Connection) -> None:
+    """
+    Engångsmigrering: lägg till kolumnen uid och ge alla kort ett id.
+
+    Args:
+        conn (sqlite3.Connection): öppen anslutning
+    """
+    from src.flashcards import _new_id  # undvik cirkulär import
+
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(cards)")}
+    with conn:
+        if "uid" not in cols:
+            conn.execute("ALTER TABLE cards ADD COLUMN uid TEXT")
+        lookup = _UidLookup(conn)
+        for row_id, q, a in conn.execute(
+            "SELECT id, q, a FROM cards WHERE uid IS NULL ORDER BY id"
+        ).fetchall():
+            conn.execute("UPDATE cards SET uid = ? WHERE id = ?",
+                         (_new_id({"q": q, "a": a}, lookup), row_id))
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cards_uid ON cards(uid)")
+
+
+def close(path: Path | None = None) -> None:
+    """
+    Stäng anslutningen till en databas, om den är öppen.
+
+    Args:
+        path (Path, optional): databasfil. Standard: DB_PATH
+    """
+    conn = _connections.pop(str(Path(path or DB_PATH).resolve()), None)
+    if conn is not None:
+        conn.close()
+
+
+def close_all() -> None:
+    """Stäng alla öppna anslutningar (t.ex. i tester eller vid avslut)."""
+    for conn in _connections.values():
+        conn.close()
+    _connections.clear()
+
+# ---------------- Kort ----------------
+
+
+def _tag_id(conn: sqlite3.Connection, name: str) -> int:
+    row = conn.execute("SELECT id FROM tags WHERE name = ?", (name,)).fetchone()
+    if row:
+        return row[0]
+    return conn.execute("INSERT INTO tags (name) VALUES (?)", (name,)).lastrowid
+
+
+def _insert_card(conn: sqlite3.Connection, card: Dict) -> Dict:
+    # Returnerar kortet med id (nytt id om det saknas eller redan är upptaget)
+    from src.flashcards import _with_id  # undvik cirkulär import
+
+    card = _with_id(card, _UidLookup(conn))
+    row_id = conn.execute(
+        "INSERT INTO cards (uid, q, a) VALUES (?, ?, ?)", (card["id"], card["q"], card["a"])
+    ).lastrowid
+    _set_tags(conn, row_id, card.get("tags") or [])
+    return card
+
+
+def _set_tags(conn: sqlite3.Connection, card_id: int, tags: List[str]) -> None:
+    conn.execute("DELETE FROM card_tags WHERE card_id = ?", (card_id,))
+    for pos, name in enumerate(dict.fromkeys(tags)):
+        conn.execute(
+            "INSERT INTO card_tags (card_id, tag_id, pos) VALUES (?, ?, ?)",
+            (card_id, _tag_id(conn, name), pos),
+        )
+
+
+def _tags_for(conn: sqlite3.Connection, card_ids: List[int] | None = None) -> Dict[int, List[str]]:
+    # Hämta taggar för alla (eller några) kort med en fråga
+    sql = ("SELECT ct.card_id, t.name FROM card_tags ct JOIN tags t ON t.id = ct.tag_id")
+    params: tuple = ()
+    if card_ids is not None:
+        sql += f" WHERE ct.card_id IN ({','.join('?' * len(card_ids))})"
+        params = tuple(card_ids)
+    sql += " ORDER BY ct.card_id, ct.pos"
+    out: Dict[int, List[str]] = {}
+    for card_id, name in conn.execute(sql, params):
+        out.setdefault(card_id, []).append(name)
+    return out
+
+
+def load_cards() -> List[Dict]:
+    """
+    Läs alla kort i insättningsordning.
+
+    Returns:
+        list[dict]: [{"id": ..., "q": ..., "a": ..., "tags": [...]}, ...]
+    """
+    conn = connect()
+    tags = _tags_for(conn)
+    return [
+        {"id": uid, "q": q, "a": a, "tags": tags.get(row_id, [])}
+        for row_id, uid, q, a in conn.execute("SELECT id, uid, q, a FROM cards ORDER BY id")
+    ]
+
+
+def add_cards(cards: List[Dict]) -> List[Dict]:
+    """
+    Lägg till kort i en transaktion.
+
+    Args:
+        cards (list[dict]): kort med "q", "a" och "tags"
+
+    Returns:
+        list[dict]: korten med id
+    """
+    conn = connect()
+    with conn:
+        return [_insert_card(conn, card) for card in cards]
+
+
+def replace_cards(cards: List[Dict]) -> None:
+    """
+    Ersätt hela leken (motsvarar _save_cards för json-backenden).
+
+    Args:
+        cards (list[dict]): den nya leken
+    """
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM card_tags")
+        conn.execute("DELETE FROM cards")
+        for card in cards:
+            _insert_card(conn, card)
+
+
+def get_card(uid: str) -> Optional[Dict]:
+    """
+    Hämta ett kort via id (unikt index).
+
+    Args:
+        uid (str): kortets id
+
+    Returns:
+        dict | None: kortet, eller None om det inte finns
+    """
+    conn = connect()
+    row = conn.execute("SELECT id, q, a FROM cards WHERE uid = ?", (uid,)).fetchone()
+    if row is None:
+        return None
+    row_id, q, a = row
+    return {"id": uid, "q": q, "a": a, "tags": _tags_for(conn, [row_id]).get(row_id, [])}
+
+
+def update_card(card: Dict) -> bool:
+    """
+    Skriv över ett kort (matchas på card["id"]).
+
+    Args:
+        card (dict): kortet med nytt innehåll
+
+    Returns:
+        bool: False om kortet inte finns
+    """
+    conn = connect()
+    with conn:
+        row = conn.execute("SELECT id FROM cards WHERE uid = ?", (card["id"],)).fetchone()
+        if row is None:
+            return False
+        conn.execute("UPDATE cards SET q = ?, a = ? WHERE id = ?",
+                     (card["q"], card["a"], row[0]))
+        _set_tags(conn, row[0], card.get("tags") or [])
+    return True
+
+
+def delete_card(uid: str) -> bool:
+    """
+    Ta bort ett kort via id.
+
+    Args:
+        uid (str): kortets id
+
+    Returns:
+        bool: False om kortet inte finns
+    """
+    conn = connect()
+    with conn:
+        cur = conn.execute("DELETE FROM cards WHERE uid = ?", (uid,))
+    return cur.rowcount > 0
+
+
+def random_card() -> Optional[Dict]:
+    """
+    Hämta ett slumpat kort via primärnyckeln (utan att läsa hela leken).
+
+    Slumpar ett id mellan min och max och tar närmaste befintliga id uppåt.
+    Luckor efter borttagna kort ger en liten skevhet, vilket duger för quiz.
+
+    Returns:
+        dict | None: kortet (med "id"), eller None om leken är tom
+    """
+    conn = connect()
+    lo, hi = conn.execute("SELECT MIN(id), MAX(id) FROM cards").fetchone()
+    if lo is None:
+        return None
+    row = conn.execute(
+        "SELECT id, uid, q, a FROM cards WHERE id >= ? ORDER BY id LIMIT 1",
+        (random.randint(lo, hi),),
+    ).fetchone()
+    row_id, uid, q, a = row
+    return {"id": uid, "q": q, "a": a, "tags": _tags_for(conn, [row_id]).get(row_id, [])}
+
+# ---------------- Resultat ----------------
+
+
+def log_results(rows: List[Dict[str, Any]]) -> None:
+    """
+    Spara quiz-resultat.
+
+    Args:
+        rows (list[dict]): rader med timestamp, question, expected, given,
+            correct ("1"/"0" eller bool) och valfritt card_id
+    """
+    conn = connect()
+    with conn:
+        conn.executemany(
+            "INSERT INTO results (ts, card_id, question, expected, given, correct)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (r["timestamp"], r.get("card_id"), r["question"], r["expected"],
+                 r["given"], 1 if str(r["correct"]).strip() in ("1", "true", "True") else 0)
+                for r in rows
+            ],
+        )
+
+
+def load_results() -> List[Dict[str, Any]]:
+    """
+    Läs alla resultat i samma form som stats.load_results.
+
+    Returns:
+        list[dict]: rader med timestamp, question, expected, given, correct, card_id
+    """
+    conn = connect()
+    return [
+        {"timestamp": ts, "question": q, "expected": e, "given": g, "correct": str(c),
+         "card_id": cid or ""}
+        for ts, q, e, g, c, cid in conn.execute(
+            "SELECT ts, question, expected, given, correct, card_id FROM results ORDER BY id"
+        )
+    ]
+
+
+def iter_results():
+    """
+    Strömma resultat som tupler utan att bygga dicts.
+
+    Yields:
+        tuple: (timestamp, question, expected, correct som int, card_id)
+    """
+    yield from connect().execute(
+        "SELECT ts, question, expected, correct, COALESCE(card_id, '') FROM results ORDER BY id"
+    )
+
+
+def result_groups():
+    """
+    Resultat summerade per kort och timme (för stats.breakdown).
+
+    Rader utan card_id grupperas på fråga och svar.
+
+    Yields:
+        tuple: (timme "YYYY-MM-DDTHH", question, expected, antal rätt, card_id, antal)
+    """
+    yield from connect().execute(
+        "SELECT substr(ts, 1, 13), MIN(question), MIN(expected), SUM(correct), "
+        "COALESCE(card_id, ''), COUNT(*) FROM results "
+        "GROUP BY COALESCE(card_id, ''), "
+        "CASE WHEN COALESCE(card_id, '') = '' THEN question END, "
+        "CASE WHEN COALESCE(card_id, '') = '' THEN expected END, "
+        "substr(ts, 1, 13)"
+    )
+
+
+def totals() -> Dict[str, int]:
+    """
+    Summera resultat från den löpande summeringsraden (O(1)).
+
+    Returns:
+        dict[str, int]: total, correct, incorrect, accuracy
+    """
+    total, correct = connect().execute(
+        "SELECT total, correct FROM result_totals WHERE id = 1"
+    ).fetchone()
+    accuracy = int(round(100 * correct / total)) if total else 0
+    return {"total": total, "correct": correct,
+            "incorrect": total - correct, "accuracy": accuracy}
+
+
+def totals_range(since: Optional[str], until: Optional[str]) -> Dict[str, int]:
+    """
+    Summera resultat inom ett tidsintervall (använder indexet på ts).
+
+    Args:
+        since (str | None): första tidsstämpel (inklusive), ISO-format
+        until (str | None): sista tidsstämpel (inklusive), ISO-format
+
+    Returns:
+        dict[str, int]: total, correct, incorrect, accuracy
+    """
+    # Bara de gränser som är angivna blir villkor: "ts >= COALESCE(?, ts)"
+    # kan inte använda idx_results_ts och skulle läsa hela tabellen
+    sql = "SELECT COUNT(*), COALESCE(SUM(correct), 0) FROM results"
+    conds, params = [], []
+    if since is not None:
+        conds.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        conds.append("ts <= ?")
+        params.append(until)
+    if conds:
+        sql += " WHERE " + " AND ".join(conds)
+    total, correct = connect().execute(sql, params).fetchone()
+    accuracy = int(round(100 * correct / total)) if total else 0
+    return {"total": total, "correct": correct,
+            "incorrect": total - correct, "accuracy": accuracy}
+
+# ---------------- Studieplan ----------------
+
+
+def get_week(week: str) -> Optional[Dict[str, Any]]:
+    """
+    Hämta en vecka i samma form som plan.json.
+
+    Args:
+        week (str): normaliserad vecka, "ÅÅÅÅ-Www"
+
+    Returns:
+        dict | None: {"items": [...], "done": [...]} eller None
+    """
+    rows = connect().execute(
+        "SELECT item, done FROM plan_items WHERE week = ? ORDER BY idx", (week,)
+    ).fetchall()
+    if not rows:
+        return None
+    return {"items": [r[0] for r in rows], "done": [bool(r[1]) for r in rows]}
+
+
+def set_goal(week: str, items: List[str]) -> Dict[str, Any]:
+    """
+    Ersätt målen för en vecka.
+
+    Args:
+        week (str): normaliserad vecka, "ÅÅÅÅ-Www"
+        items (list[str]): rensade målbeskrivningar
+
+    Returns:
+        dict[str, Any]: veckans data
+    """
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM plan_items WHERE week = ?", (week,))
+        conn.execute(
+            "INSERT OR REPLACE INTO plan_weeks (week, total, done_count) VALUES (?, ?, 0)",
+            (week, len(items)),
+        )
+        conn.executemany(
+            "INSERT INTO plan_items (week, idx, item, done) VALUES (?, ?, ?, 0)",
+            [(week, i, item) for i, item in enumerate(items)],
+        )
+    return {"items": list(items), "done": [False] * len(items)}
+
+
+def mark_done(week: str, item_index: int, value: bool) -> Optional[Dict[str, Any]]:
+    """
+    Sätt klar-status för en punkt och uppdatera veckans räknare.
+
+    Args:
+        week (str): normaliserad vecka, "ÅÅÅÅ-Www"
+        item_index (int): index i veckans items
+        value (bool): ny status
+
+    Returns:
+        dict | None: veckans data, eller None om veckan saknas
+
+    Raises:
+        IndexError: om item_index ligger utanför veckans mål
+    """
+    conn = connect()
+    with conn:
+        row = conn.execute("SELECT total FROM plan_weeks WHERE week = ?", (week,)).fetchone()
+        if row is None:
+            return None
+        total = row[0]
+        if not (0 <= item_index < total):
+            raise IndexError(
+                f"item_index {item_index} ligger utanför intervallet 0..{total-1}."
+            )
+        old = conn.execute(
+            "SELECT done FROM plan_items WHERE week = ? AND idx = ?", (week, item_index)
+        ).fetchone()[0]
+        new = 1 if value else 0
+        if old != new:
+            conn.execute("UPDATE plan_items SET done = ? WHERE week = ? AND idx = ?",
+                         (new, week, item_index))
+            conn.execute("UPDATE plan_weeks SET done_count = done_count + ? WHERE week = ?",
+                         (new - old, week))
+    return get_week(week)
+
+
+def progress(week: str) -> int:
+    """
+    Procent klart för en vecka från veckans räknare (ingen genomsökning).
+
+    Args:
+        week (str): normaliserad vecka, "ÅÅÅÅ-Www"
+
+    Returns:
+        int: procent (0–100)
+    """
+    row = connect().execute(
+        "SELECT total, done_count FROM plan_weeks WHERE week = ?", (week,)
+    ).fetchone()
+    if not row or not row[0]:
+        return 0
+    return round(100 * row[1] / row[0])
+
+
+def week_counts(start: str, end: str) -> Dict[str, List[int]]:
+    """
+    Räknarna för alla veckor mellan start och end (inklusive), via primärnyckeln.
+
+    Args:
+        start (str): första veckan, "ÅÅÅÅ-Www"
+        end (str): sista veckan, "ÅÅÅÅ-Www"
+
+    Returns:
+        dict[str, list[int]]: {vecka: [klara, totalt]}
+    """
+    rows = connect().execute(
+        "SELECT week, done_count, total FROM plan_weeks WHERE week BETWEEN ? AND ?",
+        (start, end),
+    )
+    return {w: [done, total] for w, done, total in rows}
+
+
+def open_items(start: str, end: str) -> List[tuple]:
+    """
+    Punkter som inte är markerade klara, för veckorna mellan start och end.
+
+    Args:
+        start (str): första veckan, "ÅÅÅÅ-Www"
+        end (str): sista veckan, "ÅÅÅÅ-Www"
+
+    Returns:
+        list[tuple]: (vecka, text)
+    """
+    return connect().execute(
+        "SELECT week, item FROM plan_items WHERE week BETWEEN ? AND ? AND done = 0 ORDER BY week, idx",
+        (start, end),
+    ).fetchall()
+
+
+def legacy_weeks() -> List[str]:
+    """
+    Veckor som bara är ett nummer ("35"), från före ISO-veckorna.
+
+    Returns:
+        list[str]: veckornas nycklar
+    """
+    return [r[0] for r in connect().execute(
+        "SELECT week FROM plan_weeks WHERE week NOT LIKE '%-W%'")]
+
+
+def rename_weeks(mapping: Dict[str, str]) -> List[str]:
+    """
+    Byt nyckel på veckor (med punkter och räknare) i en transaktion.
+
+    Veckor vars nya nyckel redan finns lämnas orörda.
+
+    Args:
+        mapping (dict[str, str]): {gammal nyckel: ny nyckel}
+
+    Returns:
+        list[str]: de gamla nycklar som bytts
+    """
+    conn = connect()
+    moved = []
+    with conn:
+        for old, new in mapping.items():
+            if conn.execute("SELECT 1 FROM plan_weeks WHERE week = ?", (new,)).fetchone():
+                continue
+            # plan_items pekar på plan_weeks: ny vecka först, sedan punkterna, sist den gamla
+            conn.execute("INSERT INTO plan_weeks (week, total, done_count) "
+                         "SELECT ?, total, done_count FROM plan_weeks WHERE week = ?", (new, old))
+            conn.execute("UPDATE plan_items SET week = ? WHERE week = ?", (new, old))
+            conn.execute("DELETE FROM plan_weeks WHERE week = ?", (old,))
+            moved.append(old)
+    return moved
+
+
+def list_weeks() -> List[str]:
+    """
+    Lista alla veckor som har mål.
+
+    Returns:
+        list[str]: veckor som "ÅÅÅÅ-Www"
+    """
+    return [r[0] for r in connect().execute("SELECT week FROM plan_weeks")]
+
+# ---------------- Migrering ----------------
+
+
+def migrate() -> Dict[str, int]:
+    """
+    Importera befintliga json/csv-filer i data/ till databasen.
+
+    Filerna läses oavsett vald backend. Befintligt innehåll i databasen
+    ersätts, så kommandot kan köras om.
+
+    Returns:
+        dict[str, int]: antal importerade kort, resultat och veckor
+    """
+    # Importeras här för att undvika cirkulära importer
+    from src import flashcards, plan, stats
+    from src.storage import using_backend
+
+    # Källan är alltid json-filerna, även om STUDIE_BACKEND=sqlite redan är
+    # satt: då flyttas en äldre data/plan.json till data/plan/ först
+    with using_backend("json"):
+        cards = flashcards._load_json_cards()
+        results = stats._load_csv_results()
+        weeks = plan._load_plan()
+
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM card_tags")
+        conn.execute("DELETE FROM cards")
+        conn.execute("DELETE FROM results")
+        conn.execute("DELETE FROM plan_items")
+        conn.execute("DELETE FROM plan_weeks")
+        for card in cards:
+            _insert_card(conn, card)
+    log_results(results)
+    for week, data in weeks.items():
+        items = data.get("items", [])
+        done = data.get("done", [False] * len(items))
+        set_goal(week, items)
+        for i, d in enumerate(done[:len(items)]):
+            if d:
+                mark_done(week, i, True)
+    return {"cards": len(cards), "results": len(results), "weeks": len(weeks)}
+
+
+if __name__ == "__main__":
+    counts = migrate()
+    print(f"Importerade {counts['cards']} kort, {counts['results']} resultat "
+          f"och {counts['weeks']} veckor till {DB_PATH}.")
@@ -7,21 +7,72 @@ Läser data/results.csv (skapad av flashcards.quiz_once) och räknar:
 - antal rätt
 - antal fel
 - träffsäkerhet i procent (avrundat till heltal)
+
+totals() läser inte om hela filen varje gång: löpande summor sparas i
+data/results.stats.json tillsammans med hur många bytes av results.csv som
+redan är räknade. Nästa anrop läser bara rader som tillkommit sedan dess.
+Om filen har kortats eller skrivits om (storlek/kontrollsummor stämmer inte)
+byggs summorna om från början.
+
+totals(since=..., until=...) summerar ett tidsintervall. Ett glest index i
+data/results.days.json håller per dag byte-offset för dagens första rad och
+var dagens sista rad slutar. Frågan läser bara från första raden som kan
+ligga i intervallet till sista raden som kan göra det. Rader behöver inte
+komma i tidsordning (flera processer, buffrade svar): en sen rad för en
+tidigare dag flyttar bara fram den dagens slut. Indexet byggs på
+inkrementellt när quiz_once lägger till rader.
+
+breakdown() ger dessutom träffsäkerhet per kort, per tagg, per dag, per
+timme på dygnet samt rullande 7/30 dagar. Grupperna per kort och timme
+sparas i data/results.breakdown.json med samma checkpoint som totals(), så
+bara nya rader läses.
+
+Med STUDIE_BACKEND=sqlite läses resultaten i stället från data/studie.db.
 """
 
 from pathlib import Path
-from typing import List, Dict, Any
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Iterator, Optional
+import bisect
 import csv
+import hashlib
+import io
+from src.io_utils import read_json, write_json
+from src.storage import use_sqlite
+from src import sqlite_store
+from src.workspace import in_workspace
 
 RESULTS_CSV = Path("data/results.csv")
+STATS_CACHE = Path("data/results.stats.json")
+DAY_INDEX = Path("data/results.days.json")
+BREAKDOWN_CACHE = Path("data/results.breakdown.json")
 
+HEADER = ["timestamp", "question", "expected", "given", "correct"]
+# Antal bytes som kontrollsummeras i början av filen och före checkpointen
+_PROBE = 256
 
+
+@in_workspace
 def load_results() -> list[dict[str, Any]]:
+    """
+    Läs in alla quiz-resultat från aktiv backend.
+
+    Returns:
+        list[dict[str, Any]]: en lista med rader; tom lista om inget finns.
+    """
+    if use_sqlite():
+        return sqlite_store.load_results()
+    return _load_csv_results()
+
+
+def _load_csv_results() -> list[dict[str, Any]]:
     """
     Läs in results.csv och returnera rader som dicts.
 
     CSV-format:
-        timestamp,question,expected,given,correct
+        timestamp,question,expected,given,correct,card_id
+
+    card_id saknas i äldre rader och blir då "".
 
     Returns:
         list[dict[str, Any]]: en lista med rader; tom lista om filen saknas.
@@ -36,8 +87,7 @@ def load_results() -> list[dict[str, Any]]:
         first = next(r, None)
 
         # Kolla om första raden är header
-        header = ["timestamp", "question", "expected", "given", "correct"]
-        if first and [c.strip().lower() for c in first] != header:
+        if first and [c.strip().lower() for c in first[:5]] != HEADER:
             # Första raden är data, inte header → behandla den som data
             if len(first) >= 5:
                 rows.append({
@@ -46,6 +96,7 @@ def load_results() -> list[dict[str, Any]]:
                     "expected": first[2],
                     "given": first[3],
                     "correct": first[4],
+                    "card_id": first[5] if len(first) > 5 else "",
                 })
 
         for row in r:
@@ -57,13 +108,224 @@ def load_results() -> list[dict[str, Any]]:
                 "expected": row[2],
                 "given": row[3],
                 "correct": row[4],
+                "card_id": row[5] if len(row) > 5 else "",
             })
     return rows
 
 
-def totals() -> dict[str, int]:
+def _is_correct(value: str) -> bool:
+    return str(value).strip() in ("1", "true", "True")
+
+
+def _probe(f, offset: int) -> dict[str, str]:
+    """
+    Kontrollsummor som används för att upptäcka omskrivningar av filen.
+
+    Args:
+        f: fil öppnad i binärläge
+        offset (int): checkpointens position
+
+    Returns:
+        dict[str, str]: hash av filens början och av bytes precis före offset
+    """
+    f.seek(0)
+    head = f.read(min(_PROBE, offset))
+    f.seek(max(0, offset - _PROBE))
+    tail = f.read(offset - max(0, offset - _PROBE))
+    return {"head": hashlib.sha1(head).hexdigest(), "tail": hashlib.sha1(tail).hexdigest()}
+
+
+def _count_rows(chunk: bytes, at_start: bool) -> tuple[int, int]:
+    """
+    Räkna rader och rätta svar i en bit av results.csv.
+
+    Args:
+        chunk (bytes): hela rader (slutar med radbrytning)
+        at_start (bool): True om biten börjar i filens början (kan ha header)
+
+    Returns:
+        tuple[int, int]: (antal rader, antal rätt)
+    """
+    total = correct = 0
+    r = csv.reader(io.StringIO(chunk.decode("utf-8"), newline=""))
+    if at_start:
+        first = next(r, None)
+        if first and [c.strip().lower() for c in first[:5]] != HEADER and len(first) >= 5:
+            total += 1
+            correct += _is_correct(first[4])
+    for row in r:
+        if len(row) < 5:
+            continue
+        total += 1
+        correct += _is_correct(row[4])
+    return total, correct
+
+
+def _update_stats_cache() -> dict[str, int]:
     """
-    Summera quiz-resultat.
+    Läs bara nya rader sedan senaste checkpoint och uppdatera cachen.
+
+    Returns:
+        dict[str, int]: {"total": ..., "correct": ...}
+    """
+    if not RESULTS_CSV.exists():
+        return {"total": 0, "correct": 0}
+
+    cache = read_json(STATS_CACHE, default=None)
+    with RESULTS_CSV.open("rb") as f:
+        size = f.seek(0, io.SEEK_END)
+        valid = (
+            isinstance(cache, dict)
+            and 0 <= cache.get("offset", -1) <= size
+            and cache.get("probe") == _probe(f, cache["offset"])
+        )
+        if not valid:
+            # Ingen cache, eller filen har kortats/skrivits om → bygg om
+            cache = {"offset": 0, "total": 0, "correct": 0}
+
+        if cache["offset"] == size:
+            return cache
+
+        f.seek(cache["offset"])
+        chunk = f.read(size - cache["offset"])
+        # Bara hela rader – en halvskriven sista rad räknas nästa gång
+        chunk = chunk[:chunk.rfind(b"\n") + 1]
+        if not chunk:
+            return cache
+        total, correct = _count_rows(chunk, at_start=cache["offset"] == 0)
+        cache["total"] += total
+        cache["correct"] += correct
+        cache["offset"] += len(chunk)
+        cache["probe"] = _probe(f, cache["offset"])
+
+    # Cachen kan alltid byggas om – ingen fsync behövs
+    write_json(STATS_CACHE, cache, durable=False)
+    return cache
+
+
+def _is_day_prefix(line: bytes) -> bool:
+    # "YYYY-MM-DDT..." – rader som börjar med en tidsstämpel
+    return len(line) > 10 and line[10:11] == b"T" and line[:4].isdigit()
+
+
+def update_day_index() -> dict[str, Any]:
+    """
+    Bygg på dag-indexet med rader som tillkommit sedan förra gången.
+
+    Returns:
+        dict[str, Any]: {"offset": ..., "probe": ..., "days": {dag: byte-offset
+            för första raden}, "ends": {dag: byte-offset efter sista raden}}
+    """
+    empty: dict[str, Any] = {"offset": 0, "days": {}, "ends": {}}
+    if not RESULTS_CSV.exists():
+        return empty
+
+    index = read_json(DAY_INDEX, default=None)
+    with RESULTS_CSV.open("rb") as f:
+        size = f.seek(0, io.SEEK_END)
+        valid = (
+            isinstance(index, dict)
+            and "ends" in index  # äldre index utan dagarnas slut byggs om
+            and 0 <= index.get("offset", -1) <= size
+            and index.get("probe") == _probe(f, index["offset"])
+        )
+        if not valid:
+            index = empty
+        if index["offset"] == size:
+            return index
+
+        days, ends = index["days"], index["ends"]
+        day = None
+        pos = index["offset"]
+        f.seek(pos)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # halvskriven sista rad
+            if _is_day_prefix(line):
+                day = line[:10].decode("ascii", "replace")
+                days.setdefault(day, pos)
+            pos += len(line)
+            if day is not None:
+                # Fortsättningsrader (radbrytning i ett citerat fält) hör till raden före
+                ends[day] = pos
+        index["offset"] = pos
+        index["probe"] = _probe(f, pos)
+
+    write_json(DAY_INDEX, index, durable=False)
+    return index
+
+
+def _range_bound(value: date | datetime | str | None, end: bool) -> Optional[str]:
+    # Gör om datum/tid till en ISO-sträng som kan jämföras med tidsstämplarna
+    if value is None:
+        return None
+    s = value.isoformat() if isinstance(value, (date, datetime)) else str(value).strip()
+    if end and len(s) == 10:
+        s += "T23:59:59"  # hela sista dagen
+    return s
+
+
+def _totals_range(since: Optional[str], until: Optional[str]) -> dict[str, int]:
+    """
+    Summera rader inom [since, until] genom att hoppa via dag-indexet.
+
+    Args:
+        since (str | None): första tidsstämpel (inklusive)
+        until (str | None): sista tidsstämpel (inklusive)
+
+    Returns:
+        dict[str, int]: total, correct, incorrect, accuracy
+    """
+    if not RESULTS_CSV.exists():
+        return _acc(0, 0)
+    index = update_day_index()
+    days = sorted(index["days"])
+    # Dagarna som kan ha rader i intervallet; raderna kan ligga i vilken
+    # ordning som helst, så start = tidigaste första rad, slut = senaste slut
+    lo = bisect.bisect_left(days, since[:10]) if since else 0
+    hi = bisect.bisect_right(days, until[:10]) if until else len(days)
+    if lo >= hi:
+        return _acc(0, 0)
+    start = min(index["days"][d] for d in days[lo:]) if since else 0
+    end = max(index["ends"][d] for d in days[:hi]) if until else index["offset"]
+
+    total = correct = 0
+    with RESULTS_CSV.open("rb") as raw:
+        for row in csv.reader(_lines_between(raw, start, end)):
+            if len(row) < 5 or row[0] == "timestamp":
+                continue
+            ts = row[0]
+            if (since and ts < since) or (until and ts > until):
+                continue
+            total += 1
+            correct += _is_correct(row[4])
+    return _acc(total, correct)
+
+
+def _lines_between(f, start: int, end: int) -> Iterator[str]:
+    # Hela rader från byte start till end (båda på radgränser) som text
+    f.seek(start)
+    pos = start
+    for line in f:
+        if pos >= end:
+            return
+        pos += len(line)
+        yield line.decode("utf-8")
+
+
+@in_workspace
+def totals(since: date | datetime | str | None = None,
+           until: date | datetime | str | None = None) -> dict[str, int]:
+    """
+    Summera quiz-resultat, valfritt inom ett tidsintervall.
+
+    Utan intervall läses bara rader som lagts till sedan förra anropet.
+    Med intervall hoppar läsningen direkt till första dagen via dag-indexet.
+
+    Args:
+        since (date | datetime | str, optional): från och med (t.ex. "2025-08-18")
+        until (date | datetime | str, optional): till och med; ett datum
+            räknas som hela dagen
 
     Returns:
         dict[str, int]: {
@@ -73,11 +335,212 @@ def totals() -> dict[str, int]:
             "accuracy": procent (0–100)
         }
     """
+    if since is not None or until is not None:
+        lo, hi = _range_bound(since, False), _range_bound(until, True)
+        if use_sqlite():
+            return sqlite_store.totals_range(lo, hi)
+        return _totals_range(lo, hi)
+
+    if use_sqlite():
+        return sqlite_store.totals()
 
-    data = load_results()
-    total = len(data)
-    correct = sum(1 for d in data if str(
-        d["correct"]).strip() in ("1", "true", "True"))
+    cache = _update_stats_cache()
+    total = cache["total"]
+    correct = cache["correct"]
     incorrect = total - correct
     accuracy = int(round(100 * correct / total)) if total else 0
     return {"total": total, "correct": correct, "incorrect": incorrect, "accuracy": accuracy}
+
+
+# ---------------- Uppdelad statistik ----------------
+
+
+def _acc(total: int, correct: int) -> dict[str, int]:
+    # Samma form som totals()
+    return {
+        "total": total,
+        "correct": correct,
+        "incorrect": total - correct,
+        "accuracy": int(round(100 * correct / total)) if total else 0,
+    }
+
+
+def _iter_result_tuples() -> Iterator[tuple]:
+    """
+    Strömma resultat som (timestamp, question, expected, correct, card_id)
+    från aktiv backend.
+
+    Yields:
+        tuple: en tupel per rad, correct som 0/1, card_id "" för äldre rader
+    """
+    if use_sqlite():
+        yield from sqlite_store.iter_results()
+        return
+    if not RESULTS_CSV.exists():
+        return
+    with RESULTS_CSV.open("r", newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 5 or row[0] == "timestamp":
+                continue
+            yield (row[0], row[1], row[2], 1 if _is_correct(row[4]) else 0,
+                   row[5] if len(row) > 5 else "")
+
+
+def _add_rows(groups: dict[str, Any], rows) -> None:
+    """
+    Lägg resultatrader i grupperna per kort och per timme.
+
+    Args:
+        groups (dict): {"cards": {card_id: [antal, rätt, fråga, svar]},
+            "hours": {"YYYY-MM-DDTHH": [antal, rätt]}} – ändras på plats
+        rows: (timestamp, question, expected, correct, card_id, antal) –
+            antal > 1 för rader som redan summerats (sqlite)
+    """
+    from src.flashcards import card_key  # undvik cirkulär import
+
+    cards, hours = groups["cards"], groups["hours"]
+    legacy_ids: dict[tuple[str, str], str] = {}
+    for ts, q, a, ok, cid, n in rows:
+        if not cid:
+            # Äldre rader utan id får kortets innehålls-id
+            cid = legacy_ids.get((q, a))
+            if cid is None:
+                cid = legacy_ids[(q, a)] = card_key({"q": q, "a": a})
+        c = cards.get(cid)
+        if c is None:
+            c = cards[cid] = [0, 0, q, a]
+        c[0] += n
+        c[1] += ok
+        h = hours.get(ts[:13])
+        if h is None:
+            h = hours[ts[:13]] = [0, 0]
+        h[0] += n
+        h[1] += ok
+
+
+def _csv_rows(chunk: bytes) -> Iterator[tuple]:
+    # Rader ur en bit av results.csv i samma form som _add_rows tar emot
+    for row in csv.reader(io.StringIO(chunk.decode("utf-8"), newline="")):
+        if len(row) < 5 or row[0] == "timestamp":
+            continue
+        yield (row[0], row[1], row[2], 1 if _is_correct(row[4]) else 0,
+               row[5] if len(row) > 5 else "", 1)
+
+
+def _update_breakdown_cache() -> dict[str, Any]:
+    """
+    Grupper per kort och timme, uppdaterade med rader sedan senaste checkpoint.
+
+    Samma checkpoint som totals(): byte-offset i results.csv plus
+    kontrollsummor. Med sqlite summeras grupperna direkt i databasen.
+
+    Returns:
+        dict[str, Any]: {"cards": {...}, "hours": {...}} (se _add_rows)
+    """
+    empty: dict[str, Any] = {"offset": 0, "cards": {}, "hours": {}}
+    if use_sqlite():
+        groups = {"cards": {}, "hours": {}}
+        _add_rows(groups, sqlite_store.result_groups())
+        return groups
+    if not RESULTS_CSV.exists():
+        return empty
+
+    cache = read_json(BREAKDOWN_CACHE, default=None)
+    with RESULTS_CSV.open("rb") as f:
+        size = f.seek(0, io.SEEK_END)
+        valid = (
+            isinstance(cache, dict)
+            and 0 <= cache.get("offset", -1) <= size
+            and cache.get("probe") == _probe(f, cache["offset"])
+        )
+        if not valid:
+            cache = empty
+        if cache["offset"] == size:
+            return cache
+
+        f.seek(cache["offset"])
+        chunk = f.read(size - cache["offset"])
+        # Bara hela rader – en halvskriven sista rad räknas nästa gång
+        chunk = chunk[:chunk.rfind(b"\n") + 1]
+        if not chunk:
+            return cache
+        _add_rows(cache, _csv_rows(chunk))
+        cache["offset"] += len(chunk)
+        cache["probe"] = _probe(f, cache["offset"])
+
+    write_json(BREAKDOWN_CACHE, cache, durable=False)
+    return cache
+
+
+@in_workspace
+def breakdown(today: Optional[date] = None) -> dict[str, Any]:
+    """
+    Träffsäkerhet per kort, tagg, dag och timme samt rullande 7/30 dagar.
+
+    Resultaten grupperas per kort och per timme (t.ex. "2025-08-23T20");
+    grupperna sparas med en checkpoint, så varje anrop läser bara rader som
+    tillkommit sedan förra gången. Dag, timme på dygnet, taggar och rullande
+    fönster härleds sedan från grupperna. Kort identifieras med card_id;
+    äldre rader utan id får kortets innehålls-id (card_key), så joinen mot
+    leken går via id i båda fallen.
+
+    Args:
+        today (date, optional): sista dagen i de rullande fönstren. Standard: idag
+
+    Returns:
+        dict[str, Any]: {
+            "cards":   [{"card_id", "question", "expected", "total", ...}, ...]
+                       (sämst träffsäkerhet först),
+            "tags":    {tagg: {...}},
+            "days":    {"YYYY-MM-DD": {...}},
+            "hours":   {"HH": {...}},
+            "rolling": {"7": {...}, "30": {...}},
+        }
+    """
+    from src.flashcards import _load_cards  # undvik cirkulär import
+
+    groups = _update_breakdown_cache()
+
+    # Kort + taggar (join mot leken via id)
+    deck = {c["id"]: c for c in _load_cards() if c.get("id")}
+    cards: list[dict[str, Any]] = []
+    tag_tot: dict[str, list[int]] = {}
+    for cid, (n, k, q, a) in groups["cards"].items():
+        card = deck.get(cid)
+        if card:
+            q, a = card["q"], card["a"]
+        cards.append({"card_id": cid, "question": q, "expected": a, **_acc(n, k)})
+        for tag in (card.get("tags", []) if card else []):
+            t = tag_tot.setdefault(tag, [0, 0])
+            t[0] += n
+            t[1] += k
+    cards.sort(key=lambda r: (r["accuracy"], -r["total"]))
+
+    # Dag och timme på dygnet från timgrupperna
+    day_tot: dict[str, list[int]] = {}
+    hod_tot: dict[str, list[int]] = {}
+    for key, (n, k) in groups["hours"].items():
+        for bucket, name in ((day_tot, key[:10]), (hod_tot, key[11:13])):
+            t = bucket.setdefault(name, [0, 0])
+            t[0] += n
+            t[1] += k
+
+    today = today or date.today()
+    rolling: dict[str, dict[str, int]] = {}
+    for window in (7, 30):
+        start = (today - timedelta(days=window - 1)).isoformat()
+        end = today.isoformat()
+        n = k = 0
+        for day, (dn, dk) in day_tot.items():
+            if start <= day <= end:
+                n += dn
+                k += dk
+        rolling[str(window)] = _acc(n, k)
+
+    return {
+        "cards": cards,
+        "tags": {t: _acc(*v) for t, v in sorted(tag_tot.items())},
+        "days": {d: _acc(*v) for d, v in sorted(day_tot.items())},
+        "hours": {h: _acc(*v) for h, v in sorted(hod_tot.items())},
+        "rolling": rolling,
+    }
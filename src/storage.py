@@ -0,0 +1,72 @@
+"""
+storage.py – val av lagringsbackend för kort, quiz-resultat och studieplan.
+
+Två backends finns:
+- "json"   (standard): data/flashcards.json (+ journal), data/results.csv
+             och data/plan.json – precis som tidigare.
+- "sqlite": en databas i data/studie.db med index (se src/sqlite_store.py).
+
+Backend väljs med miljövariabeln STUDIE_BACKEND eller set_backend().
+Modulerna flashcards, stats och plan frågar use_sqlite() och skickar
+vidare anropet till sqlite_store när sqlite är valt.
+"""
+from contextlib import contextmanager
+import os
+
+BACKEND_ENV = "STUDIE_BACKEND"
+BACKENDS = ("json", "sqlite")
+
+# Satt via set_backend(); None = läs miljövariabeln
+_override: str | None = None
+
+
+def get_backend() -> str:
+    """
+    Returnera aktiv backend.
+
+    Returns:
+        str: "json" eller "sqlite"
+
+    Raises:
+        ValueError: om miljövariabeln anger en okänd backend
+    """
+    name = _override or os.environ.get(BACKEND_ENV, "json").strip().lower() or "json"
+    if name not in BACKENDS:
+        raise ValueError(f"Okänd backend '{name}'. Välj en av: {', '.join(BACKENDS)}.")
+    return name
+
+
+def set_backend(name: str | None) -> None:
+    """
+    Välj backend för resten av processen.
+
+    Args:
+        name (str | None): "json", "sqlite" eller None för att gå tillbaka
+            till miljövariabeln
+    """
+    global _override
+    if name is not None and name not in BACKENDS:
+        raise ValueError(f"Okänd backend '{name}'. Välj en av: {', '.join(BACKENDS)}.")
+    _override = name
+
+
+@contextmanager
+def using_backend(name: str):
+    """
+    Välj backend tillfälligt, t.ex. för att läsa json-filerna vid migrering.
+
+    Args:
+        name (str): "json" eller "sqlite"
+    """
+    global _override
+    previous = _override
+    set_backend(name)
+    try:
+        yield
+    finally:
+        _override = previous
+
+
+def use_sqlite() -> bool:
+    """Kort hjälpare: True om sqlite-backenden är vald."""
+    return get_backend() == "sqlite"
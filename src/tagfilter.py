@@ -0,0 +1,189 @@
+"""
+tagfilter.py – taggfilter för quiz med bitmängder per tagg.
+
+Varje tagg har en bitmängd (ett Python-int) där bit i är satt om kort
+nummer i har taggen. Ett uttryck som "sql AND NOT auto" räknas då ut med
+bitoperationer (&, |, ~) i stället för att gå igenom hela leken:
+
+    sql AND NOT auto      – kort med "sql" men utan "auto"
+    python OR sql         – kort med någon av taggarna
+    (sql OR etl) NOT auto – parenteser; ord efter varandra betyder AND
+
+Operatorerna (AND, OR, NOT) skrivs med versaler. Prioritet: NOT före AND
+före OR. Taggnamn jämförs utan hänsyn till versaler och mellanslag i kanterna.
+
+Bitmängderna hålls uppdaterade när kort läggs till, ändras eller tas bort
+(se flashcards._apply_op), så de behöver bara byggas en gång per process.
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Optional
+import re
+
+_TOKEN = re.compile(r"\(|\)|[^\s()]+")
+
+
+def _norm_tag(tag: str) -> str:
+    return " ".join((tag or "").strip().lower().split())
+
+
+class TagIndex:
+    """
+    Bitmängder per tagg över en lista av kort (position i listan = bit).
+
+    Exempel:
+        idx = TagIndex(cards)
+        for i in idx.positions(idx.select("sql AND NOT auto")):
+            print(cards[i]["q"])
+    """
+
+    def __init__(self, cards: Iterable[Optional[Dict]] = ()):
+        """
+        Args:
+            cards (Iterable[dict | None]): kort; None = borttaget kort (hål)
+        """
+        # Bygg i bytearrays och gör om till int i slutet: att OR:a in en bit
+        # i taget i ett stort int kopierar hela talet varje gång (O(n²))
+        cards = list(cards)
+        nbytes = len(cards) // 8 + 1
+        live = bytearray(nbytes)
+        maps: Dict[str, bytearray] = {}
+        for i, card in enumerate(cards):
+            if card is None:
+                continue
+            byte, bit = i >> 3, 1 << (i & 7)
+            live[byte] |= bit
+            for tag in self._tags(card):
+                m = maps.get(tag)
+                if m is None:
+                    m = maps[tag] = bytearray(nbytes)
+                m[byte] |= bit
+        self.size = len(cards)
+        self.live = int.from_bytes(live, "little")  # bit satt för varje kort som finns
+        self.bits: Dict[str, int] = {t: int.from_bytes(m, "little") for t, m in maps.items()}
+
+    @staticmethod
+    def _tags(card: Dict) -> set:
+        return {_norm_tag(t) for t in card.get("tags") or [] if t and t.strip()}
+
+    def add(self, pos: int, card: Dict) -> None:
+        """
+        Sätt bitarna för ett kort på given position.
+
+        Args:
+            pos (int): kortets position i leken
+            card (dict): kortet
+        """
+        bit = 1 << pos
+        self.live |= bit
+        self.size = max(self.size, pos + 1)
+        for tag in self._tags(card):
+            self.bits[tag] = self.bits.get(tag, 0) | bit
+
+    def remove(self, pos: int, card: Optional[Dict] = None) -> None:
+        """
+        Nollställ bitarna för ett kort.
+
+        Args:
+            pos (int): kortets position
+            card (dict, optional): kortet – då rörs bara dess taggar, annars alla
+        """
+        mask = ~(1 << pos)
+        self.live &= mask
+        tags = self._tags(card) if card is not None else list(self.bits)
+        for tag in tags:
+            if tag in self.bits:
+                self.bits[tag] &= mask
+
+    def replace(self, pos: int, old: Optional[Dict], new: Dict) -> None:
+        """Byt kortet på en position (t.ex. ändrade taggar)."""
+        self.remove(pos, old)
+        self.add(pos, new)
+
+    def tag(self, name: str) -> int:
+        """Bitmängden för en tagg (0 om ingen har den)."""
+        return self.bits.get(_norm_tag(name), 0)
+
+    def select(self, expr: str) -> int:
+        """
+        Räkna ut bitmängden för ett tagguttryck.
+
+        Args:
+            expr (str): t.ex. "sql AND NOT auto". Tomt uttryck = alla kort
+
+        Returns:
+            int: bitmängd över kortpositioner
+
+        Raises:
+            ValueError: om uttrycket inte går att tolka
+        """
+        tokens = _TOKEN.findall(expr or "")
+        if not tokens:
+            return self.live
+        parser = _Parser(tokens, self)
+        bits = parser.parse_or()
+        if parser.i != len(tokens):
+            raise ValueError(f"Oväntat '{tokens[parser.i]}' i tagguttrycket.")
+        return bits & self.live
+
+    @staticmethod
+    def positions(bits: int) -> Iterator[int]:
+        """
+        Positionerna för satta bitar, i stigande ordning.
+
+        Args:
+            bits (int): bitmängd
+
+        Yields:
+            int: position
+        """
+        # bin() och str.find körs i C – snabbare än att skifta bit för bit
+        s = bin(bits)[:1:-1]
+        i = s.find("1")
+        while i >= 0:
+            yield i
+            i = s.find("1", i + 1)
+
+
+class _Parser:
+    # Rekursiv nedstigning: or := and (OR and)* ; and := not (AND? not)* ;
+    # not := NOT not | ( or ) | tagg
+
+    def __init__(self, tokens: List[str], index: TagIndex):
+        self.tokens = tokens
+        self.i = 0
+        self.index = index
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.i] if self.i < len(self.tokens) else None
+
+    def parse_or(self) -> int:
+        bits = self.parse_and()
+        while self._peek() == "OR":
+            self.i += 1
+            bits |= self.parse_and()
+        return bits
+
+    def parse_and(self) -> int:
+        bits = self.parse_not()
+        while self._peek() not in (None, "OR", ")"):
+            if self._peek() == "AND":
+                self.i += 1
+            bits &= self.parse_not()
+        return bits
+
+    def parse_not(self) -> int:
+        tok = self._peek()
+        if tok is None:
+            raise ValueError("Tagguttrycket tar slut för tidigt.")
+        self.i += 1
+        if tok == "NOT":
+            return self.index.live & ~self.parse_not()
+        if tok == "(":
+            bits = self.parse_or()
+            if self._peek() != ")":
+                raise ValueError("Saknar ')' i tagguttrycket.")
+            self.i += 1
+            return bits
+        if tok in ("AND", "OR", ")"):
+            raise ValueError(f"Oväntat '{tok}' i tagguttrycket.")
+        return self.index.tag(tok)
@@ -0,0 +1,279 @@
+"""
+workspace.py – en datamapp per användare (arbetsyta) och en pool av öppna ytor.
+
+Som standard ligger alla filer i data/ (relativt arbetskatalogen), precis
+som tidigare. En Workspace pekar i stället ut en egen mapp, t.ex.
+users/anna/, där kortlek, resultat, plan, schemaläggning, sökindex och
+sqlite-databas hamnar.
+
+Arbetsytan skickas med explicit till API:erna:
+
+    ws = Workspace("users/anna")
+    add_card("Vad är int?", "heltal", workspace=ws)
+    totals(workspace=ws)
+
+eller gäller för ett helt block:
+
+    with ws:
+        add_card(...)
+        quiz_once()
+
+Under blocket pekar modulernas sökvägskonstanter (FLASHCARDS_PATH, PLAN_PATH
+osv.) på ytans filer, och tillståndet i minnet (kortvyn i flashcards,
+sökindexet, dubblettindexet) byts mot ytans eget. Efter blocket återställs
+föregående yta. Bytet gäller hela processen, så en yta ska vara aktiv under
+ett synkront anrop i taget (inte över en await eller mellan trådar).
+
+WorkspacePool håller många användares ytor och låter bara de senast använda
+ha sitt tillstånd kvar i minnet, inom en minnesbudget (LRU).
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+import importlib
+import re
+
+# Modul → {sökvägskonstant: filnamn i arbetsytan}
+_PATHS = {
+    "src.flashcards": {"FLASHCARDS_PATH": "flashcards.json",
+                       "FLASHCARDS_JOURNAL": "flashcards.journal.jsonl",
+                       "RESULTS_CSV": "results.csv"},
+    "src.stats": {"RESULTS_CSV": "results.csv", "STATS_CACHE": "results.stats.json",
+                  "DAY_INDEX": "results.days.json",
+                  "BREAKDOWN_CACHE": "results.breakdown.json"},
+    "src.plan": {"PLAN_PATH": "plan.json", "PLAN_DIR": "plan"},
+    "src.scheduler": {"SCHEDULE_PATH": "schedule.jsonl"},
+    "src.search": {"SEARCH_INDEX": "search.index.json", "SEARCH_JOURNAL": "search.journal.jsonl"},
+    "src.results_log": {"RESULTS_BIN": "results_bin", "RESULTS_CSV": "results.csv"},
+    "src.sqlite_store": {"DB_PATH": "studie.db"},
+    "src.activity": {"ACTIVITY_LOG": "activity.jsonl", "ACTIVITY_CACHE": "activity.stats.json"},
+}
+# Modul → {tillstånd i minnet: funktion i modulen som skapar ett tomt tillstånd}
+_STATE = {
+    "src.flashcards": {"_view": "_empty_view"},
+    "src.search": {"_index": "_empty_index"},
+    "src.dedupe": {"_online": "_empty_online"},
+}
+# Filer vars innehåll hålls i minnet när ytan är laddad (för minnesuppskattningen)
+_RESIDENT_FILES = ("flashcards.json", "flashcards.journal.jsonl",
+                   "search.index.json", "search.journal.jsonl")
+# Ungefär hur mycket större Python-objekten är än JSON-texten på disk
+RESIDENT_FACTOR = 4
+
+_USER_ID = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]{0,63}$")
+
+
+class Workspace:
+    """
+    En användares datamapp och tillståndet i minnet för den.
+
+    Exempel:
+        with Workspace("users/anna"):
+            print(totals())
+    """
+
+    def __init__(self, root):
+        """
+        Args:
+            root (str | Path): mappen där ytans filer ligger
+        """
+        self.root = Path(root)
+        # (modul, namn) → tillståndsobjekt; tomt = inget laddat i minnet
+        self._state: Dict[tuple, object] = {}
+        # Fritt utrymme för lager ovanpå (t.ex. servern) att hänga data per yta på
+        self.extras: Dict[str, object] = {}
+
+    def __repr__(self) -> str:
+        return f"Workspace({str(self.root)!r})"
+
+    def path(self, name: str) -> Path:
+        """Sökvägen till en fil i ytan, t.ex. ws.path("plan.json")."""
+        return self.root / name
+
+    @property
+    def loaded(self) -> bool:
+        """True om ytan har tillstånd i minnet."""
+        return bool(self._state) or bool(self.extras)
+
+    def footprint(self) -> int:
+        """
+        Uppskattat minne för ytans tillstånd (0 om inget är laddat).
+
+        Returns:
+            int: bytes (filstorlek på disk × RESIDENT_FACTOR)
+        """
+        if not self.loaded:
+            return 0
+        size = 0
+        for name in _RESIDENT_FILES:
+            try:
+                size += (self.root / name).stat().st_size
+            except FileNotFoundError:
+                pass
+        return size * RESIDENT_FACTOR
+
+    def unload(self) -> None:
+        """Släpp tillståndet i minnet (filerna påverkas inte)."""
+        if self in _stack:
+            raise RuntimeError("Kan inte släppa en aktiv arbetsyta.")
+        self._state.clear()
+        self.extras.clear()
+        from src import sqlite_store  # undvik cirkulär import
+        sqlite_store.close(self.path(_PATHS["src.sqlite_store"]["DB_PATH"]))
+
+    def __enter__(self) -> "Workspace":
+        _save(_current())
+        _stack.append(self)
+        _swap_in(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _save(self)
+        _stack.pop()
+        _swap_in(_current())
+
+
+# Standardytan är data/ – samma sökvägar som modulernas egna konstanter
+_default = Workspace("data")
+# Aktiva ytor, innersta sist
+_stack: List[Workspace] = []
+
+
+def _current() -> Workspace:
+    return _stack[-1] if _stack else _default
+
+
+def current() -> Workspace:
+    """Den arbetsyta som är aktiv just nu (standard: data/)."""
+    return _current()
+
+
+def _save(ws: Workspace) -> None:
+    # Spara modulernas nuvarande tillstånd i ytan innan en annan yta tar över
+    for modname, names in _STATE.items():
+        mod = importlib.import_module(modname)
+        for name in names:
+            ws._state[(modname, name)] = getattr(mod, name)
+
+
+def _swap_in(ws: Workspace) -> None:
+    # Peka om sökvägskonstanterna och lägg in ytans tillstånd (tomt om nytt)
+    for modname, consts in _PATHS.items():
+        mod = importlib.import_module(modname)
+        for const, name in consts.items():
+            setattr(mod, const, ws.root / name)
+    for modname, names in _STATE.items():
+        mod = importlib.import_module(modname)
+        for name, factory in names.items():
+            state = ws._state.get((modname, name))
+            if state is None:
+                state = ws._state[(modname, name)] = getattr(mod, factory)()
+            setattr(mod, name, state)
+
+
+def in_workspace(fn: Callable) -> Callable:
+    """
+    Dekorator: ge en funktion ett valfritt nyckelordsargument `workspace`.
+
+    Med workspace=None (standard) körs funktionen i den aktiva ytan.
+    """
+    @wraps(fn)
+    def wrapper(*args, workspace: Optional[Workspace] = None, **kwargs):
+        if workspace is None:
+            return fn(*args, **kwargs)
+        with workspace:
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+class WorkspacePool:
+    """
+    Arbetsytor per användare under en gemensam mapp, med LRU inom en minnesbudget.
+
+    Bara de senast använda ytorna har sitt tillstånd kvar i minnet. När den
+    uppskattade summan (Workspace.footprint) går över budgeten släpps de
+    som använts längst tillbaka; de läses in från disk igen nästa gång.
+
+    Exempel:
+        pool = WorkspacePool("users", budget=256 * 2**20)
+        with pool.use("anna"):
+            add_card("Vad är int?", "heltal")
+    """
+
+    def __init__(self, base, budget: int = 256 * 1024 * 1024,
+                 on_evict: Optional[Callable[[str, Workspace], None]] = None):
+        """
+        Args:
+            base (str | Path): mapp där varje användare får en undermapp
+            budget (int): minnesbudget i bytes för laddade ytor
+            on_evict (callable, optional): anropas med (användare, yta), med
+                ytan aktiv, innan dess tillstånd släpps (t.ex. för att skriva buffrar)
+        """
+        self.base = Path(base)
+        self.budget = budget
+        self.on_evict = on_evict
+        self._spaces: "OrderedDict[str, Workspace]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+
+    def get(self, user: str) -> Workspace:
+        """
+        Hämta (eller skapa) användarens yta och markera den som senast använd.
+
+        Raises:
+            ValueError: om användarnamnet inte är ett giltigt mappnamn
+        """
+        if not _USER_ID.match(user or ""):
+            raise ValueError(f"Ogiltigt användarnamn: {user!r}")
+        ws = self._spaces.get(user)
+        if ws is None:
+            ws = self._spaces[user] = Workspace(self.base / user)
+        self._spaces.move_to_end(user)
+        return ws
+
+    @contextmanager
+    def use(self, user: str) -> Iterator[Workspace]:
+        """Aktivera användarens yta för ett block; håll budgeten efteråt."""
+        ws = self.get(user)
+        try:
+            with ws:
+                yield ws
+        finally:
+            self._sizes[user] = ws.footprint()
+            self._shrink(keep=user)
+
+    def resident(self) -> List[str]:
+        """Användare vars ytor har tillstånd i minnet, äldst först."""
+        return [u for u, ws in self._spaces.items() if ws.loaded]
+
+    def items(self):
+        """(användare, yta) för alla ytor i poolen, äldst först."""
+        return list(self._spaces.items())
+
+    def memory(self) -> int:
+        """Uppskattat minne för alla laddade ytor (bytes)."""
+        return sum(self._sizes.get(u, 0) for u in self._spaces)
+
+    def evict(self, user: str) -> None:
+        """Släpp en användares tillstånd och ta bort ytan ur poolen."""
+        ws = self._spaces.pop(user, None)
+        self._sizes.pop(user, None)
+        if ws is None or ws in _stack:
+            return
+        if self.on_evict is not None and ws.loaded:
+            with ws:
+                self.on_evict(user, ws)
+        ws.unload()
+
+    def _shrink(self, keep: Optional[str] = None) -> None:
+        # Släpp de äldsta ytorna tills summan ryms i budgeten
+        total = self.memory()
+        for user in list(self._spaces):
+            if total <= self.budget:
+                break
+            if user == keep or self._spaces[user] in _stack:
+                continue
+            total -= self._sizes.get(user, 0)
+            self.evict(user)
@@ -0,0 +1,252 @@
+# tests/benchmark.py
+# Prestandamätning med syntetisk data: kortlek, resultatlogg, studieplan och
+# begreppsfiler i valfria storlekar, i en temporär data/-mapp.
+#
+# Mäter add_card, quiz_once (med påhittade svar), totals, generate_questions,
+# mark_done och dubblettsökning. För varje operation rapporteras latens
+# (p50/p90/p99/max i ms) och minnestopp (tracemalloc, ett extra anrop).
+#
+# Kör från projektroten:
+#   python -m tests.benchmark                          # 1k och 100k kort
+#   python -m tests.benchmark --sizes 1000,1000000 --out bench.json
+#   python -m tests.benchmark --baseline bench.json    # jämför, exit 1 vid regression
+#
+# Varje storlek körs i en egen process, så cachar i minnet inte läcker mellan storlekarna.
+import argparse
+import contextlib
+import csv
+import io
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from unittest import mock
+
+OPERATIONS = ("add_card", "quiz_once", "totals", "generate_questions",
+              "mark_done", "find_similar", "find_duplicates")
+# Skillnader under detta räknas som brus, oavsett procent
+NOISE_MS = 0.5
+NOISE_KB = 64
+
+# ---------------- Syntetisk data ----------------
+
+
+def make_data(n: int, repeat: int, seed: int = 1) -> None:
+    """Skriv en lek om n kort, n resultatrader, en plan och begreppsfiler till data/."""
+    rng = random.Random(seed)
+    os.makedirs("data/concepts", exist_ok=True)
+    words = [f"ord{i}" for i in range(2000)]
+    langs = ["python", "sql", "git", "bash"]
+
+    cards = []
+    for i in range(n):
+        q = " ".join(rng.choice(words) for _ in range(6)) + "?"
+        a = " ".join(rng.choice(words) for _ in range(3))
+        cards.append({"id": f"{i:016x}", "q": q, "a": a, "tags": [rng.choice(langs)]})
+    with open("data/flashcards.json", "w", encoding="utf-8") as f:
+        json.dump(cards, f, ensure_ascii=False)
+
+    now = datetime.now()
+    with open("data/results.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["timestamp", "question", "expected", "given", "correct", "card_id"])
+        for i in range(n):
+            c = cards[rng.randrange(n)]
+            ok = rng.random() < 0.7
+            ts = now - timedelta(minutes=(n - i) * 5)
+            w.writerow([ts.isoformat(timespec="seconds"), c["q"], c["a"],
+                        c["a"] if ok else "fel", "1" if ok else "0", c["id"]])
+
+    per_week = max(3, n // 1000)
+    plan = {str(week): {"items": [f"mål {i}" for i in range(per_week)], "done": [False] * per_week}
+            for week in range(1, 53)}
+    with open("data/plan.json", "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False)
+
+    # En begreppsfil per generate_questions-anrop, så att varje anrop har nya kort
+    per_file = max(10, n // 100)
+    for k in range(repeat + 1):
+        concepts = [{"term": f"term{k}_{i}", "lang": rng.choice(langs), "def": f"definition {k} {i}"}
+                    for i in range(per_file)]
+        with open(f"data/concepts/c{k}.json", "w", encoding="utf-8") as f:
+            json.dump(concepts, f, ensure_ascii=False)
+
+# ---------------- Mätning ----------------
+
+
+def percentile(sorted_samples, p: float) -> float:
+    # Närmaste rang: minsta värdet som minst p procent av mätningarna är <= än
+    k = max(0, min(len(sorted_samples) - 1, math.ceil(p / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[k]
+
+
+def measure(fn, repeat: int, memory: bool = True) -> dict:
+    """
+    Tidsmät fn(k) för k = 0..repeat-1 och mät minnestopp med ett extra anrop.
+
+    Returns:
+        dict: antal, p50/p90/p99/max/medel i ms och peak_kb
+    """
+    samples = []
+    for k in range(repeat):
+        t = time.perf_counter()
+        fn(k)
+        samples.append((time.perf_counter() - t) * 1000)
+    samples.sort()
+    out = {
+        "n": len(samples),
+        "p50_ms": percentile(samples, 50),
+        "p90_ms": percentile(samples, 90),
+        "p99_ms": percentile(samples, 99),
+        "max_ms": samples[-1],
+        "mean_ms": sum(samples) / len(samples),
+    }
+    if memory:
+        # Separat anrop: tracemalloc gör själva tidmätningen missvisande
+        tracemalloc.start()
+        fn(repeat)
+        out["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return out
+
+
+def run_size(n: int, repeat: int, ops, memory: bool) -> dict:
+    """Skapa data för n kort i en temporär mapp och mät operationerna."""
+    os.chdir(tempfile.mkdtemp(prefix=f"studie-bench-{n}-"))
+    t = time.perf_counter()
+    make_data(n, repeat)
+    print(f"=> {n} kort: data skapad på {time.perf_counter() - t:.1f} s i {os.getcwd()}", flush=True)
+
+    from src.flashcards import add_card, quiz_once, _load_cards
+    from src.generator import generate_questions
+    from src.plan import list_weeks, mark_done
+    from src.stats import totals
+    from src import dedupe
+
+    rng = random.Random(2)
+    _load_cards()  # värm upp vyn: mätningarna gäller steady state, inte första inläsningen
+    totals()
+    list_weeks()  # flyttar plan.json till en fil per vecka före mätningen
+    if "find_similar" in ops:
+        dedupe.find_similar("", "")  # bygger LSH-indexet (mäts av find_duplicates)
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    def quiz(k):
+        # Påhittat svar: rätt ungefär varannan gång
+        with quiet, mock.patch("builtins.input", side_effect=lambda _: "ord1" if k % 2 else ""):
+            quiz_once()
+
+    def total(k):
+        # En ny resultatrad före varje anrop, så att totals() får något att läsa ikapp
+        with quiet, mock.patch("builtins.input", return_value=""):
+            quiz_once()
+        totals()
+
+    cases = {
+        "add_card": lambda k: add_card(f"Bench fråga {k} {rng.random()}", f"svar {k}", tags=["bench"]),
+        "quiz_once": quiz,
+        "totals": total,
+        "generate_questions": lambda k: generate_questions(f"data/concepts/c{k}.json", workers=1),
+        "mark_done": lambda k: mark_done(rng.randint(1, 52), 0, bool(k % 2)),
+        "find_similar": lambda k: dedupe.find_similar(f"ord{k} ord{k + 1} ord{k + 2}?", "ord3"),
+        "find_duplicates": lambda k: dedupe.find_duplicates(),
+    }
+    results = {}
+    for name in ops:
+        # Helhetsoperationer över hela leken körs bara en gång
+        times = 1 if name == "find_duplicates" else repeat
+        results[name] = measure(cases[name], times, memory)
+        r = results[name]
+        peak = f"{r['peak_kb']:>10.0f} KB" if "peak_kb" in r else ""
+        print(f"   {name:<20} p50 {r['p50_ms']:>9.2f} ms  p99 {r['p99_ms']:>9.2f} ms  "
+              f"max {r['max_ms']:>9.2f} ms  {peak}", flush=True)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Jämför två körningar.
+
+    Returns:
+        list[str]: en rad per regression (p50 eller minnestopp mer än threshold sämre)
+    """
+    regressions = []
+    for size, ops in current["results"].items():
+        for name, r in ops.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if base is None:
+                continue
+            if (r["p50_ms"] > base["p50_ms"] * (1 + threshold)
+                    and r["p50_ms"] - base["p50_ms"] > NOISE_MS):
+                regressions.append(f"{size} {name}: p50 {base['p50_ms']:.2f} → {r['p50_ms']:.2f} ms")
+            if ("peak_kb" in r and "peak_kb" in base
+                    and r["peak_kb"] > base["peak_kb"] * (1 + threshold)
+                    and r["peak_kb"] - base["peak_kb"] > NOISE_KB):
+                regressions.append(f"{size} {name}: minne {base['peak_kb']:.0f} → {r['peak_kb']:.0f} KB")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prestandamätning med syntetisk data.")
+    parser.add_argument("--sizes", default="1000,100000", help="antal kort, kommaseparerat")
+    parser.add_argument("--repeat", type=int, default=50, help="mätningar per operation")
+    parser.add_argument("--ops", default=",".join(OPERATIONS), help="operationer att mäta")
+    parser.add_argument("--no-memory", action="store_true", help="hoppa över tracemalloc")
+    parser.add_argument("--out", help="spara resultatet som JSON")
+    parser.add_argument("--baseline", help="JSON från en tidigare körning att jämföra med")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="tillåten försämring, andel (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    ops = [o for o in args.ops.split(",") if o.strip()]
+    unknown = set(ops) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Okända operationer: {', '.join(sorted(unknown))}")
+
+    try:
+        import numpy  # noqa: F401
+        has_numpy = True
+    except ImportError:
+        has_numpy = False
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": has_numpy,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for n in sizes:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            report["results"][str(n)] = pool.submit(
+                run_size, n, args.repeat, ops, not args.no_memory).result()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Sparat: {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            for line in regressions:
+                print("❌", line)
+            raise SystemExit(1)
+        print(f"✅ Inga regressioner över {args.threshold:.0%} mot {args.baseline}.")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.getcwd())
+    main()
@@ -1,9 +1,9 @@
 # tests/dedupe_cards.py
 # Skript för att rensa dupes av kort. Alltså kopior.
 from pathlib import Path
-from src.io_utils import read_json, write_json
+from src.io_utils import group_commit, write_json
+from src.flashcards import _load_cards, _save_cards
 
-CARDS_PATH = Path("data/flashcards.json")
 BACKUP = Path("data/flashcards.backup.json")
 
 
@@ -12,12 +12,11 @@ def norm(s: str) -> str:
 
 
 def main():
-    cards = read_json(CARDS_PATH, default=[])
-    if not isinstance(cards, list):
+    # Läs via flashcards så att journalen (flashcards.journal.jsonl) kommer med
+    try:
+        cards = _load_cards()
+    except ValueError:
         raise SystemExit("flashcards.json måste vara en lista")
-    # Backup
-    write_json(BACKUP, cards)
-
     seen = set()
     unique = []
     for c in cards:
@@ -30,9 +29,16 @@ def main():
         # normalisera tags lite
         tags = c.get("tags", [])
         tags = sorted({t.strip() for t in tags if t and t.strip()})
-        unique.append({"q": q, "a": a, "tags": tags})
-
-    write_json(CARDS_PATH, unique)
+        # Behåll kortets id så att resultat och schemaläggning pekar rätt
+        card = {"q": q, "a": a, "tags": tags}
+        if c.get("id"):
+            card = {"id": c["id"], **card}
+        unique.append(card)
+
+    # Backup och ny snapshot skrivs ut tillsammans (backupen byter plats först)
+    with group_commit():
+        write_json(BACKUP, cards)
+        _save_cards(unique)  # ny snapshot + tömd journal
     print(f" Klart. {len(cards)} → {len(unique)} kort. Backup: {BACKUP}")
 
 
@@ -0,0 +1,94 @@
+# tests/load_quiz_server.py
+# Lasttest för quiz-tjänsten (src/server.py).
+#
+# Startar servern som egen process i en temporär mapp med en syntetisk lek,
+# kör sedan många samtidiga klienter (asyncio, keep-alive) som hämtar en fråga
+# och svarar, om och om igen. Rapporterar anrop/s och latens och kontrollerar
+# att alla svar hamnat i resultatloggen (write-behind får inte tappa något).
+#
+# Kör från projektroten:  python -m tests.load_quiz_server [klienter] [sekunder] [kort]
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from tests.benchmark import make_data, percentile
+
+
+async def request(reader, writer, method: str, path: str, body=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(port: int, until: float, latencies: list, counts: dict) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < until:
+            t = time.perf_counter()
+            status, card = await request(reader, writer, "GET", "/next")
+            latencies.append(time.perf_counter() - t)
+            assert status == 200, card
+            t = time.perf_counter()
+            status, res = await request(reader, writer, "POST", "/answer",
+                                        {"id": card["id"], "given": "ord1"})
+            latencies.append(time.perf_counter() - t)
+            assert status == 200, res
+            counts["answers"] += 1
+    finally:
+        writer.close()
+
+
+async def run(port: int, clients: int, seconds: float) -> dict:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    _, before = await request(reader, writer, "GET", "/stats")
+    latencies, counts = [], {"answers": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, start + seconds, latencies, counts) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    _, after = await request(reader, writer, "GET", "/stats")
+    writer.close()
+    latencies.sort()
+    return {"before": before, "after": after, "answers": counts["answers"],
+            "requests": len(latencies), "elapsed": elapsed, "latencies": latencies}
+
+
+def main() -> None:
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    n = int(sys.argv[3]) if len(sys.argv) > 3 else 10_000
+    root = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="studie-load-"))
+    make_data(n, 0)
+    print(f"=> {n} kort, {clients} klienter i {seconds:.0f} s ({os.getcwd()})")
+
+    env = {**os.environ, "PYTHONPATH": root}
+    server = subprocess.Popen([sys.executable, "-u", "-m", "src.server", "0"],
+                              stdout=subprocess.PIPE, text=True, env=env)
+    try:
+        line = server.stdout.readline()
+        port = int(line.rsplit(":", 1)[1].split()[0])
+        r = asyncio.run(run(port, clients, seconds))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    lat = r["latencies"]
+    print(f"{r['requests']} anrop på {r['elapsed']:.1f} s = {r['requests'] / r['elapsed']:.0f} anrop/s")
+    print(f"latens: p50 {percentile(lat, 50) * 1000:.2f} ms  p99 {percentile(lat, 99) * 1000:.2f} ms  "
+          f"max {lat[-1] * 1000:.2f} ms")
+    logged = r["after"]["total"] - r["before"]["total"]
+    if logged != r["answers"]:
+        raise SystemExit(f"❌ {r['answers']} svar skickade men {logged} loggade.")
+    print(f"✅ Test OK. Alla {logged} svar loggade.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# tests/manual_import.py
+# Massimport: skapa en stor TSV-fil och importera den i en temporär mapp.
+# Mäter hastighet och minnestopp (tracemalloc) – minnet ska inte växa med filen
+# utöver själva leken.
+#
+# Kör från projektroten:  python -m tests.manual_import [rader]
+import csv
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+os.chdir(tempfile.mkdtemp(prefix="studie-import-"))
+os.makedirs("data")
+
+with open("dump.tsv", "w", encoding="utf-8") as f:
+    f.write("#separator:tab\n#html:false\n#tags column:3\n")
+    for i in range(rows):
+        # Var tionde rad är en dubblett av en tidigare rad
+        n = i - 1 if i % 10 == 9 else i
+        f.write(f"Fråga nummer {n}\tsvar {n}\tbulk test\n")
+print(f"=> {rows} rader i {os.getcwd()}/dump.tsv")
+
+from src.importer import import_cards
+from src.flashcards import _load_cards
+
+tracemalloc.start()
+result = import_cards("dump.tsv", tags=["import"])
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+
+expected = rows - rows // 10
+cards = _load_cards()
+print(f"Klart: {result}")
+print(f"Minnestopp: {peak / 2**20:.0f} MB ({peak / max(len(cards), 1):.0f} byte per kort)")
+assert result["added"] == expected == len(cards), (result, len(cards))
+assert result["duplicates"] == rows // 10
+assert cards[0]["tags"] == ["bulk", "test", "import"]
+print("✅ Test OK.")
+
+# Ogiltiga rader ska räknas som överhoppade, inte avbryta importen halvvägs
+with open("broken.jsonl", "w", encoding="utf-8") as f:
+    for obj in ({"q": "Giltig 1", "a": "ja"}, {"q": "Taggar som tal", "a": "x", "tags": 5},
+                {"q": ["lista"], "a": "x"}, {"q": "Giltig 2", "a": "ja", "tags": "a b"}):
+        f.write(json.dumps(obj) + "\n")
+result = import_cards("broken.jsonl", progress=None)
+assert (result["added"], result["skipped"]) == (2, 2), result
+
+with open("broken.csv", "w", encoding="utf-8") as f:
+    f.write("q,a\nGiltig 3,ja\n")
+    f.write("För stort fält," + "x" * (csv.field_size_limit() + 10) + "\n")
+    f.write("Giltig 4,ja\n")
+result = import_cards("broken.csv", progress=None)
+assert (result["added"], result["skipped"]) == (2, 1), result
+assert len(_load_cards()) == expected + 4
+print("✅ Ogiltiga rader hoppas över.")
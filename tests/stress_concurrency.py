@@ -0,0 +1,98 @@
+# tests/stress_concurrency.py
+# Stresstest: flera processer skriver samtidigt mot samma data/-mapp.
+# Kontrollerar att inga kort, planändringar eller resultatrader går förlorade.
+#
+# Kör från projektroten:  python -m tests.stress_concurrency [processer] [varv]
+# Testet körs i en temporär mapp, så riktiga data/ påverkas inte.
+import csv
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+SHARED_WEEK = 1
+
+
+def own_week(n: int) -> str:
+    # En egen vecka per process, ett annat år än den delade veckan
+    return f"2031-W{n + 2:02d}"
+
+
+def worker(n: int, rounds: int, start) -> None:
+    from src import flashcards
+    from src.flashcards import add_card, _log_results
+    from src.plan import mark_done, set_goal
+
+    # Kompaktera ofta så att snapshot/journal också testas under konkurrens
+    flashcards.COMPACT_EVERY = 25
+    start.wait()
+    set_goal(own_week(n), [f"mål {i}" for i in range(rounds)])
+    for i in range(rounds):
+        card = add_card(f"P{n} fråga {i}", f"svar {i}", tags=[f"p{n}"])
+        _log_results([{
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "question": card["q"], "expected": card["a"], "given": card["a"],
+            "correct": "1", "card_id": card["id"],
+        }])
+        mark_done(SHARED_WEEK, n * rounds + i)
+        mark_done(own_week(n), i)
+
+
+def main() -> None:
+    procs = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    os.chdir(tempfile.mkdtemp(prefix="studie-stress-"))
+    print(f"=> {procs} processer × {rounds} varv i {os.getcwd()}")
+
+    from src.plan import set_goal
+    set_goal(SHARED_WEEK, [f"punkt {i}" for i in range(procs * rounds)])
+
+    start = mp.Event()
+    workers = [mp.Process(target=worker, args=(n, rounds, start)) for n in range(procs)]
+    for p in workers:
+        p.start()
+    start.set()
+    for p in workers:
+        p.join()
+    if any(p.exitcode for p in workers):
+        raise SystemExit("❌ En eller flera processer kraschade.")
+
+    from src.flashcards import _load_cards
+    from src.plan import get_week, progress, progress_range
+
+    errors = []
+    cards = _load_cards()
+    questions = {c["q"] for c in cards}
+    if len(cards) != procs * rounds or len(questions) != procs * rounds:
+        errors.append(f"kort: {len(cards)} (unika {len(questions)}), väntat {procs * rounds}")
+    if len({c["id"] for c in cards}) != len(cards):
+        errors.append("kort-id är inte unika")
+
+    with open("data/results.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    if rows[0][0] != "timestamp" or sum(1 for r in rows if r[0] == "timestamp") != 1:
+        errors.append("results.csv ska ha exakt en header, först")
+    if len(rows) - 1 != procs * rounds or any(len(r) != 6 for r in rows):
+        errors.append(f"resultatrader: {len(rows) - 1}, väntat {procs * rounds}")
+
+    if progress(SHARED_WEEK) != 100:
+        done = get_week(SHARED_WEEK)["done"]
+        errors.append(f"delad vecka: {sum(done)}/{len(done)} markerade")
+    for n in range(procs):
+        if progress(own_week(n)) != 100:
+            errors.append(f"vecka {own_week(n)}: {progress(own_week(n))} %")
+    summary = progress_range(own_week(0), own_week(procs - 1))
+    if (summary["done"], summary["total"]) != (procs * rounds, procs * rounds):
+        errors.append(f"progress_range: {summary['done']}/{summary['total']}")
+
+    if errors:
+        for e in errors:
+            print("❌", e)
+        raise SystemExit(1)
+    print(f"✅ Test OK. {len(cards)} kort, {len(rows) - 1} resultat, "
+          f"{procs * rounds} planmarkeringar – inget förlorat.")
+
+
+if __name__ == "__main__":
+    main()